@@ -0,0 +1,193 @@
+'''
+    Acumulados de avance (complejidad, completado ponderado y actividades pendientes)
+    para tareas, fases y proyectos.
+
+    Cada tarea guarda el resumen de sus actividades y el aporte que ya trasladó a su fase
+    y proyecto; al modificarse se calcula la diferencia y se aplica con F() sobre los padres,
+    por lo que consultar el avance es leer una columna. La tarea guarda además si está
+    pendiente, para listar las tareas pendientes sin agrupar sus actividades.
+'''
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F
+
+CAMPOS_APORTE = ('acum_complejidad', 'acum_completado', 'acum_pendientes')
+TOLERANCIA = 1e-6
+
+
+def _modelos(apps=None):
+    '''
+        Permite utilizar las funciones desde migraciones (modelos históricos)
+    '''
+    apps = apps or global_apps
+    return (
+        apps.get_model('seguimiento', 'Proyecto'),
+        apps.get_model('seguimiento', 'Proyecto_Fase'),
+        apps.get_model('seguimiento', 'Proyecto_Tarea'),
+        apps.get_model('seguimiento', 'Proyecto_Actividad'),
+    )
+
+def resumen_actividades(actividades):
+    '''
+        Cantidad, suma de avance y pendientes de un queryset de actividades
+    '''
+    return actividades.aggregate(
+        cantidad    = Count('id'),
+        suma        = Sum('finalizado'),
+        pendientes  = Count('id', filter=Q(finalizado__lt=100)),
+    )
+
+def es_pendiente(cantidad, pendientes):
+    '''
+        Una tarea está pendiente si no tiene actividades o alguna no ha finalizado
+    '''
+    return not cantidad or bool(pendientes)
+
+def aporte(complejidad, cantidad, suma, pendientes):
+    '''
+        Aporte de una tarea a su fase y proyecto (mismo orden que CAMPOS_APORTE).
+        Las tareas sin actividades no suman complejidad.
+    '''
+    if not cantidad:
+        return (0, 0.0, 0)
+    return (complejidad, complejidad * (suma or 0) / cantidad, pendientes or 0)
+
+def _aplicar(modelo, obj_id, delta):
+    if obj_id is None or not any(delta):
+        return
+    modelo.objects.filter(id=obj_id).update(
+        acum_complejidad= F('acum_complejidad') + delta[0],
+        acum_completado = F('acum_completado') + delta[1],
+        acum_pendientes = F('acum_pendientes') + delta[2],
+    )
+
+def _propagar(fase_id, delta):
+    Proyecto, Proyecto_Fase, _, _ = _modelos()
+    if not any(delta):
+        return
+    proyecto_id = Proyecto_Fase.objects.filter(id=fase_id).values_list('proyecto_id', flat=True).first()
+    _aplicar(Proyecto_Fase, fase_id, delta)
+    _aplicar(Proyecto, proyecto_id, delta)
+
+def actualizar_tarea(tarea_id, fase_anterior_id=None):
+    '''
+        Recalcula el resumen de la tarea y traslada la diferencia a su fase y proyecto.
+        Si la tarea cambió de fase, el aporte anterior se descuenta de la fase (y proyecto) original.
+    '''
+    _, _, Proyecto_Tarea, Proyecto_Actividad = _modelos()
+    with transaction.atomic():
+        tarea = Proyecto_Tarea.objects.select_for_update().filter(id=tarea_id)\
+            .values('complejidad', 'fase_id', *CAMPOS_APORTE).first()
+        if tarea is None:
+            return
+        resumen = resumen_actividades(Proyecto_Actividad.objects.filter(tarea_id=tarea_id))
+        nuevo   = aporte(tarea['complejidad'], resumen['cantidad'], resumen['suma'], resumen['pendientes'])
+        anterior= tuple(tarea[campo] for campo in CAMPOS_APORTE)
+
+        Proyecto_Tarea.objects.filter(id=tarea_id).update(
+            acum_actividades= resumen['cantidad'],
+            acum_finalizado = resumen['suma'] or 0,
+            pendiente       = es_pendiente(resumen['cantidad'], resumen['pendientes']),
+            **dict(zip(CAMPOS_APORTE, nuevo)),
+        )
+        if fase_anterior_id and fase_anterior_id != tarea['fase_id']:
+            _propagar(fase_anterior_id, tuple(-valor for valor in anterior))
+            _propagar(tarea['fase_id'], nuevo)
+        else:
+            _propagar(tarea['fase_id'], tuple(n - a for n, a in zip(nuevo, anterior)))
+
+def descontar_tarea(tarea_id):
+    '''
+        Retira de la fase y proyecto el aporte de una tarea que será eliminada
+    '''
+    _, _, Proyecto_Tarea, _ = _modelos()
+    with transaction.atomic():
+        tarea = Proyecto_Tarea.objects.select_for_update().filter(id=tarea_id)\
+            .values('fase_id', *CAMPOS_APORTE).first()
+        if tarea:
+            _propagar(tarea['fase_id'], tuple(-tarea[campo] for campo in CAMPOS_APORTE))
+
+def _alcance(proyecto_ids=None, apps=None):
+    '''
+        Querysets de proyectos, fases y tareas incluidos (todos si no se indican proyectos)
+    '''
+    Proyecto, Proyecto_Fase, Proyecto_Tarea, _ = _modelos(apps)
+    proyectos = Proyecto.objects.all()
+    if proyecto_ids is not None:
+        proyectos = proyectos.filter(id__in=proyecto_ids)
+    return (
+        proyectos,
+        Proyecto_Fase.objects.filter(proyecto__in=proyectos),
+        Proyecto_Tarea.objects.filter(fase__proyecto__in=proyectos),
+    )
+
+def calcular(proyecto_ids=None, apps=None):
+    '''
+        Calcula desde cero, con consultas agrupadas, los acumulados esperados.
+        Devuelve tres diccionarios {id: {campo: valor}}: tareas, fases y proyectos.
+    '''
+    _, _, _, Proyecto_Actividad = _modelos(apps)
+    proyectos, fases, tareas = _alcance(proyecto_ids, apps)
+
+    resumenes = Proyecto_Actividad.objects.filter(tarea__in=tareas).order_by().values('tarea_id')\
+        .annotate(
+            cantidad    = Count('id'),
+            suma        = Sum('finalizado'),
+            pendientes  = Count('id', filter=Q(finalizado__lt=100)),
+        )
+    resumenes = {resumen['tarea_id']: resumen for resumen in resumenes}
+
+    vacio = dict(zip(CAMPOS_APORTE, (0, 0.0, 0)))
+    esperado_proyectos  = {proyecto_id: dict(vacio) for proyecto_id in proyectos.values_list('id', flat=True)}
+    fase_proyecto       = dict(fases.values_list('id', 'proyecto_id'))
+    esperado_fases      = {fase_id: dict(vacio) for fase_id in fase_proyecto}
+    esperado_tareas     = {}
+
+    for tarea in tareas.values('id', 'complejidad', 'fase_id').iterator():
+        resumen = resumenes.get(tarea['id'], {})
+        cantidad, suma = resumen.get('cantidad', 0), resumen.get('suma') or 0
+        valores = dict(zip(CAMPOS_APORTE, aporte(tarea['complejidad'], cantidad, suma, resumen.get('pendientes', 0))))
+        esperado_tareas[tarea['id']] = {'acum_actividades': cantidad, 'acum_finalizado': suma,
+            'pendiente': es_pendiente(cantidad, resumen.get('pendientes', 0)), **valores}
+
+        for destino in (esperado_fases[tarea['fase_id']], esperado_proyectos[fase_proyecto[tarea['fase_id']]]):
+            for campo, valor in valores.items():
+                destino[campo] += valor
+
+    return esperado_tareas, esperado_fases, esperado_proyectos
+
+def reconstruir(proyecto_ids=None, apps=None, batch_size=500):
+    '''
+        Sobrescribe los acumulados con los valores calculados desde cero.
+        Devuelve la cantidad de registros actualizados.
+    '''
+    Proyecto, Proyecto_Fase, Proyecto_Tarea, _ = _modelos(apps)
+    total = 0
+    with transaction.atomic():
+        for modelo, esperados in zip((Proyecto_Tarea, Proyecto_Fase, Proyecto), calcular(proyecto_ids, apps)):
+            if not esperados:
+                continue
+            # los modelos históricos (migraciones) pueden no tener todos los campos
+            existentes = {campo.name for campo in modelo._meta.get_fields()}
+            campos  = [campo for campo in next(iter(esperados.values())) if campo in existentes]
+            objetos = [modelo(id=obj_id, **{campo: valores[campo] for campo in campos}) for obj_id, valores in esperados.items()]
+            modelo.objects.bulk_update(objetos, campos, batch_size=batch_size)
+            total += len(objetos)
+    return total
+
+def verificar(proyecto_ids=None, apps=None):
+    '''
+        Compara los acumulados almacenados con los calculados.
+        Devuelve una lista de (modelo, id, campo, almacenado, esperado) con las diferencias.
+    '''
+    diferencias = []
+    for queryset, esperados in zip(reversed(_alcance(proyecto_ids, apps)), calcular(proyecto_ids, apps)):
+        if not esperados:
+            continue
+        campos = list(next(iter(esperados.values())))
+        for almacenado in queryset.values('id', *campos).iterator():
+            for campo in campos:
+                esperado = esperados[almacenado['id']][campo]
+                if abs(almacenado[campo] - esperado) > TOLERANCIA:
+                    diferencias.append((queryset.model.__name__, almacenado['id'], campo, almacenado[campo], esperado))
+    return diferencias
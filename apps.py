@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SeguimientoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'seguimiento'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,82 @@
+'''
+    Árbol fase / tarea / actividad de un proyecto como documento JSON.
+
+    Se construye con consultas planas de values() (proyecto, fases, tareas, etiquetas de las
+    tareas y actividades), sin instanciar modelos; el avance se lee de los acumulados.
+    La versión de los datos del proyecto (ver versiones.py) sirve como ETag del documento.
+'''
+from .models import Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad
+from .versiones import version_proyecto
+
+
+def _porcentaje(completado, complejidad):
+    return round(completado/complejidad, 4) if complejidad > 0 else 0.0
+
+def version_arbol(proyecto_id):
+    datos = version_proyecto(proyecto_id)
+    return f'{proyecto_id}-{datos[0]}' if datos else None
+
+def arbol_proyecto(proyecto_id):
+    '''
+        Diccionario con el proyecto y sus fases, cada fase con sus tareas y cada tarea con
+        sus etiquetas y actividades; None si el proyecto no existe
+    '''
+    proyecto = Proyecto.objects.filter(id=proyecto_id).values('id', 'nombre', 'finicio', 'ffin', 'publico',
+        'estado__descripcion', 'acum_complejidad', 'acum_completado', 'acum_pendientes').first()
+    if proyecto is None:
+        return None
+
+    fases = {}
+    for fase in Proyecto_Fase.objects.filter(proyecto_id=proyecto_id).order_by('correlativo')\
+            .values('id', 'correlativo', 'descripcion', 'cerrado', 'acum_complejidad', 'acum_completado', 'acum_pendientes'):
+        fases[fase['id']] = {
+            'id':           fase['id'],
+            'correlativo':  fase['correlativo'],
+            'descripcion':  fase['descripcion'],
+            'cerrado':      fase['cerrado'],
+            'completado':   _porcentaje(fase['acum_completado'], fase['acum_complejidad']),
+            'pendientes':   fase['acum_pendientes'],
+            'tareas':       [],
+        }
+
+    tareas = {}
+    for tarea in Proyecto_Tarea.objects.filter(proyecto_id=proyecto_id).order_by('-prioridad', 'descripcion')\
+            .values('id', 'descripcion', 'prioridad', 'complejidad', 'fase_id', 'acum_actividades', 'acum_finalizado',
+                'acum_pendientes'):
+        tareas[tarea['id']] = {
+            'id':           tarea['id'],
+            'descripcion':  tarea['descripcion'],
+            'prioridad':    tarea['prioridad'],
+            'complejidad':  tarea['complejidad'],
+            'finalizado':   round(tarea['acum_finalizado']/tarea['acum_actividades'], 2) if tarea['acum_actividades'] else 0,
+            'pendientes':   tarea['acum_pendientes'],
+            'etiquetas':    [],
+            'actividades':  [],
+        }
+        fases[tarea['fase_id']]['tareas'].append(tareas[tarea['id']])
+
+    for tarea_id, etiqueta in Proyecto_Tarea.etiqueta.through.objects.filter(proyecto_tarea__proyecto_id=proyecto_id)\
+            .order_by('proyecto_etiqueta__descripcion').values_list('proyecto_tarea_id', 'proyecto_etiqueta__descripcion'):
+        tareas[tarea_id]['etiquetas'].append(etiqueta)
+
+    for actividad in Proyecto_Actividad.objects.filter(proyecto_id=proyecto_id).order_by('finalizado', 'creacion')\
+            .values('id', 'descripcion', 'creacion', 'finalizado', 'tarea_id', 'responsable__username'):
+        tareas[actividad['tarea_id']]['actividades'].append({
+            'id':           actividad['id'],
+            'descripcion':  actividad['descripcion'],
+            'creacion':     actividad['creacion'],
+            'finalizado':   actividad['finalizado'],
+            'responsable':  actividad['responsable__username'],
+        })
+
+    return {
+        'id':           proyecto['id'],
+        'nombre':       proyecto['nombre'],
+        'estado':       proyecto['estado__descripcion'],
+        'publico':      proyecto['publico'],
+        'finicio':      proyecto['finicio'],
+        'ffin':         proyecto['ffin'],
+        'completado':   _porcentaje(proyecto['acum_completado'], proyecto['acum_complejidad']),
+        'pendientes':   proyecto['acum_pendientes'],
+        'fases':        list(fases.values()),
+    }
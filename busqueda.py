@@ -0,0 +1,238 @@
+'''
+    Búsqueda de texto en proyectos, fases, tareas, actividades y comentarios.
+
+    Cada objeto tiene un Busqueda_Documento con su texto plano normalizado (minúsculas, sin
+    acentos ni HTML), que se actualiza al guardar o eliminar el objeto (ver signals.py).
+    - En PostgreSQL la búsqueda utiliza tsvector/tsquery sobre el documento, con índice GIN.
+    - En otros motores (SQLite) se mantiene el índice invertido Busqueda_Termino; cada término
+      de la consulta se busca como prefijo sobre el índice (termino, documento).
+    Los resultados se ordenan por relevancia y se limitan a los proyectos visibles por el usuario.
+'''
+import re, unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import (Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, Comentario,
+    Busqueda_Documento, Busqueda_Termino)
+from .texto import texto_plano
+from .visibilidad import filtro_visible
+
+CONFIGURACION_FTS   = 'spanish'
+PESO_TITULO         = 3
+LONGITUD_TERMINO    = 60
+_palabra = re.compile(r'\w+')
+
+TIPOS = {
+    'P': Proyecto,
+    'F': Proyecto_Fase,
+    'T': Proyecto_Tarea,
+    'A': Proyecto_Actividad,
+    'C': Comentario,
+}
+
+
+def normalizar(texto):
+    '''
+        Minúsculas y sin acentos
+    '''
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+def terminos(texto):
+    '''
+        Términos de un texto ya normalizado (se descartan los de un caracter)
+    '''
+    return [palabra[:LONGITUD_TERMINO] for palabra in _palabra.findall(texto) if len(palabra) > 1]
+
+def usa_nativa():
+    return connection.vendor == 'postgresql' and getattr(settings, 'SEGUIMIENTO_BUSQUEDA_NATIVA', True)
+
+def vector_busqueda():
+    '''
+        Expresión del tsvector; el índice GIN de la migración utiliza la misma expresión
+    '''
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector('titulo_normal', weight='A', config=CONFIGURACION_FTS) + \
+        SearchVector('texto_normal', weight='B', config=CONFIGURACION_FTS)
+
+def contenido(tipo, obj):
+    '''
+        (titulo, texto, proyecto_id, fase_id) del objeto, o None si no se puede ubicar su proyecto
+    '''
+    if tipo == 'P':
+        return obj.nombre, texto_plano(obj.descripcion), obj.id, None
+    if tipo == 'F':
+        return obj.descripcion, '', obj.proyecto_id, obj.id
+    if tipo == 'T':
+        return obj.descripcion, '', obj.proyecto_id, obj.fase_id
+    if tipo == 'A':
+        return obj.descripcion, texto_plano(obj.resolucion), obj.proyecto_id, obj.tarea.fase_id
+    if tipo == 'C':
+        if not obj.proyecto_id:
+            return None
+        return obj.get_objeto() or '', texto_plano(obj.descripcion), obj.proyecto_id, None
+    return None
+
+def _terminos_documento(documento):
+    pesos = Counter()
+    for termino in terminos(documento.titulo_normal):
+        pesos[termino] += PESO_TITULO
+    for termino in terminos(documento.texto_normal):
+        pesos[termino] += 1
+    return [Busqueda_Termino(documento=documento, termino=termino, peso=peso) for termino, peso in pesos.items()]
+
+def _documento(tipo, obj):
+    datos = contenido(tipo, obj)
+    if datos is None:
+        return None
+    titulo, texto, proyecto_id, fase_id = datos
+    return Busqueda_Documento(tipo=tipo, obj_uuid=obj.id, titulo=titulo[:180], proyecto_id=proyecto_id,
+        fase_id=fase_id, titulo_normal=normalizar(titulo)[:180], texto_normal=normalizar(texto))
+
+def indexar(tipo, obj):
+    '''
+        Crea o actualiza el documento del objeto (y sus términos)
+    '''
+    nuevo = _documento(tipo, obj)
+    with transaction.atomic():
+        if nuevo is None:
+            eliminar(tipo, obj.id)
+            return None
+        documento, _ = Busqueda_Documento.objects.update_or_create(tipo=tipo, obj_uuid=obj.id, defaults={
+            'titulo':           nuevo.titulo,
+            'titulo_normal':    nuevo.titulo_normal,
+            'texto_normal':     nuevo.texto_normal,
+            'proyecto_id':      nuevo.proyecto_id,
+            'fase_id':          nuevo.fase_id,
+        })
+        if not usa_nativa():
+            Busqueda_Termino.objects.filter(documento=documento).delete()
+            Busqueda_Termino.objects.bulk_create(_terminos_documento(documento))
+    return documento
+
+def indexar_lote(tipo, objetos):
+    '''
+        indexar para varios objetos del mismo tipo (p.ej. luego de un bulk_update, que no emite señales)
+    '''
+    with transaction.atomic():
+        Busqueda_Documento.objects.filter(tipo=tipo, obj_uuid__in=[obj.id for obj in objetos]).delete()
+        return _guardar_lote([documento for documento in (_documento(tipo, obj) for obj in objetos) if documento])
+
+def eliminar(tipo, obj_id):
+    Busqueda_Documento.objects.filter(tipo=tipo, obj_uuid=obj_id).delete()
+
+def mover_actividades(tarea):
+    '''
+        Actualiza fase y proyecto de los documentos de las actividades de una tarea que cambió de fase
+    '''
+    Busqueda_Documento.objects.filter(tipo='A', obj_uuid__in=Proyecto_Actividad.objects.filter(tarea=tarea).values('id'))\
+        .update(fase_id=tarea.fase_id, proyecto_id=tarea.proyecto_id)
+
+def reindexar_fase(fase):
+    '''
+        Documentos de las tareas y actividades de una fase que cambió de proyecto
+    '''
+    indexar_lote('T', list(Proyecto_Tarea.objects.filter(fase=fase)))
+    indexar_lote('A', list(Proyecto_Actividad.objects.select_related('tarea').filter(tarea__fase=fase)))
+
+def _objetos(tipo, proyecto_ids=None):
+    modelo = TIPOS[tipo]
+    rutas = {'P': 'id', 'F': 'proyecto_id', 'T': 'proyecto_id', 'A': 'proyecto_id', 'C': 'proyecto_id'}
+    relaciones = {'A': ('tarea', )}
+    objetos = modelo.objects.select_related(*relaciones.get(tipo, ())).order_by()
+    if proyecto_ids is not None:
+        objetos = objetos.filter(**{f'{rutas[tipo]}__in': proyecto_ids})
+    if tipo == 'C':
+        objetos = objetos.filter(proyecto__isnull=False)
+    return objetos
+
+def reindexar(proyecto_ids=None, tamano_lote=500):
+    '''
+        Reconstruye los documentos (y términos) de los proyectos indicados, o de todos.
+        Devuelve la cantidad de documentos indexados.
+    '''
+    total = 0
+    with transaction.atomic():
+        documentos = Busqueda_Documento.objects.all()
+        if proyecto_ids is not None:
+            documentos = documentos.filter(proyecto_id__in=proyecto_ids)
+        documentos.delete()
+
+        for tipo in TIPOS:
+            lote = []
+            objetos = _objetos(tipo, proyecto_ids).iterator(chunk_size=tamano_lote)
+            if tipo == 'C':
+                objetos = _comentarios_resueltos(objetos, tamano_lote)
+            for obj in objetos:
+                documento = _documento(tipo, obj)
+                if documento is not None:
+                    lote.append(documento)
+                if len(lote) >= tamano_lote:
+                    total += _guardar_lote(lote)
+                    lote = []
+            total += _guardar_lote(lote)
+    return total
+
+def _comentarios_resueltos(comentarios, tamano_lote):
+    '''
+        Resuelve por lotes el objeto de cada comentario (su etiqueta forma parte del título)
+    '''
+    lote = []
+    for comentario in comentarios:
+        lote.append(comentario)
+        if len(lote) >= tamano_lote:
+            yield from Comentario.resolver_objetos(lote)
+            lote = []
+    yield from Comentario.resolver_objetos(lote)
+
+def _guardar_lote(documentos):
+    if not documentos:
+        return 0
+    Busqueda_Documento.objects.bulk_create(documentos)
+    if not usa_nativa():
+        Busqueda_Termino.objects.bulk_create(
+            [termino for documento in documentos for termino in _terminos_documento(documento)], batch_size=2000)
+    return len(documentos)
+
+def buscar(usuario, consulta, tipos=None, limite=50):
+    '''
+        Documentos que contienen todos los términos de la consulta (como prefijo), ordenados
+        por relevancia, con el atributo puntaje. Únicamente de proyectos visibles por el usuario.
+    '''
+    palabras = list(dict.fromkeys(terminos(normalizar(consulta))))
+    if not palabras:
+        return []
+
+    documentos = Busqueda_Documento.objects.select_related('proyecto').filter(filtro_visible(usuario, 'proyecto'))
+    if tipos:
+        documentos = documentos.filter(tipo__in=tipos)
+
+    if usa_nativa():
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        tsquery = SearchQuery(' & '.join(f'{palabra}:*' for palabra in palabras),
+            search_type='raw', config=CONFIGURACION_FTS)
+        return list(documentos.annotate(vector=vector_busqueda()).filter(vector=tsquery)\
+            .annotate(puntaje=SearchRank(F('vector'), tsquery)).order_by('-puntaje', 'titulo')[:limite])
+
+    coincidencias = {}
+    filtro = Q()
+    for indice, palabra in enumerate(palabras):
+        condicion = Q(termino__gte=palabra, termino__lt=palabra + '\uffff')
+        coincidencias[f'c{indice}'] = Count('id', filter=condicion)
+        filtro |= condicion
+
+    puntajes = Busqueda_Termino.objects.filter(filtro, documento__in=documentos).order_by()\
+        .values('documento_id').annotate(
+            puntaje = Sum('peso') + Sum('peso', filter=Q(termino__in=palabras), default=0),
+            **coincidencias,
+        ).filter(**{f'{campo}__gt': 0 for campo in coincidencias})\
+        .order_by('-puntaje').values_list('documento_id', 'puntaje')[:limite]
+    puntajes = dict(puntajes)
+
+    resultados = list(Busqueda_Documento.objects.select_related('proyecto').filter(id__in=puntajes))
+    for documento in resultados:
+        documento.puntaje = puntajes[documento.id]
+    return sorted(resultados, key=lambda documento: (-documento.puntaje, documento.titulo))
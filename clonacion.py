@@ -0,0 +1,80 @@
+'''
+    Clonación de un proyecto utilizado como plantilla.
+
+    Se copian etiquetas, objetivos, metas, fases, tareas (complejidad, prioridad y etiquetas)
+    en un proyecto nuevo, dentro de una transacción. Los registros de origen se leen con
+    values() (una consulta por modelo) y se insertan con bulk_create por lotes, con su
+    historial; los ids nuevos se asignan en memoria y un diccionario por modelo traduce
+    los ids de origen (fase de cada tarea, etiquetas de cada tarea).
+    Las actividades no se copian, por lo que los acumulados del proyecto nuevo inician en cero.
+'''
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from . import busqueda, versiones
+from .models import (Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Etiqueta, Proyecto_Objetivo,
+    Proyecto_Meta, Proyecto_Usuario)
+
+LOTE_CLONACION = 500
+
+
+def _copiar(modelo, registros, usuario, fecha, **valores):
+    '''
+        Crea una copia de cada registro (dict de values()) con un id nuevo.
+        Devuelve ({id origen: id nuevo}, objetos creados)
+    '''
+    ids, objetos = {}, []
+    for registro in registros:
+        origen_id = registro.pop('id')
+        ids[origen_id] = uuid.uuid4()
+        objetos.append(modelo(id=ids[origen_id], **registro, **valores))
+    if objetos:
+        bulk_create_with_history(objetos, modelo, batch_size=LOTE_CLONACION, default_user=usuario, default_date=fecha)
+    return ids, objetos
+
+def clonar(origen, nombre, usuario, finicio=None, ffin=None):
+    '''
+        Crea el proyecto nombre con la estructura de origen. Si se indica finicio (sin ffin)
+        se conserva la duración del origen. El usuario se asigna al proyecto nuevo.
+    '''
+    finicio = finicio or origen.finicio
+    ffin    = ffin or finicio + (origen.ffin - origen.finicio)
+    ahora   = timezone.now()
+
+    with transaction.atomic():
+        proyecto = Proyecto(nombre=nombre, descripcion=origen.descripcion, enlace_cloud=origen.enlace_cloud,
+            finicio=finicio, ffin=ffin, publico=origen.publico, lider_id=origen.lider_id, estado_id=origen.estado_id,
+            tipo_id=origen.tipo_id, origen_id=origen.origen_id, pm_id=origen.pm_id)
+        proyecto._history_user = usuario
+        proyecto.save()
+        Proyecto_Usuario(proyecto=proyecto, usuario=usuario).save()
+
+        for modelo in (Proyecto_Objetivo, Proyecto_Meta):
+            _copiar(modelo, modelo.objects.filter(proyecto=origen).values('id', 'descripcion'),
+                usuario, ahora, proyecto=proyecto)
+        etiquetas = _copiar(Proyecto_Etiqueta, Proyecto_Etiqueta.objects.filter(proyecto=origen)\
+            .values('id', 'descripcion', 'vigente'), usuario, ahora, proyecto=proyecto)[0]
+        fases, nuevas_fases = _copiar(Proyecto_Fase, Proyecto_Fase.objects.filter(proyecto=origen)\
+            .values('id', 'correlativo', 'descripcion'), usuario, ahora, proyecto=proyecto)
+
+        tareas = list(Proyecto_Tarea.objects.filter(proyecto=origen)\
+            .values('id', 'descripcion', 'prioridad', 'complejidad', 'fase_id'))
+        for tarea in tareas:
+            tarea['fase_id'] = fases[tarea['fase_id']]
+        tareas, nuevas_tareas = _copiar(Proyecto_Tarea, tareas, usuario, ahora, proyecto=proyecto)
+
+        Enlace = Proyecto_Tarea.etiqueta.through
+        enlaces = Enlace.objects.filter(proyecto_tarea__proyecto=origen)\
+            .values_list('proyecto_tarea_id', 'proyecto_etiqueta_id')
+        Enlace.objects.bulk_create([Enlace(proyecto_tarea_id=tareas[tarea_id], proyecto_etiqueta_id=etiquetas[etiqueta_id])
+            for tarea_id, etiqueta_id in enlaces.iterator() if etiqueta_id in etiquetas], batch_size=LOTE_CLONACION)
+
+        # bulk_create no emite señales: los documentos de búsqueda de fases y tareas se crean aquí
+        for tipo, objetos in (('F', nuevas_fases), ('T', nuevas_tareas)):
+            for inicio in range(0, len(objetos), LOTE_CLONACION):
+                busqueda.indexar_lote(tipo, objetos[inicio:inicio+LOTE_CLONACION])
+        versiones.incrementar(proyecto.id)
+    return proyecto
@@ -0,0 +1,162 @@
+'''
+    Intérprete de la caja de búsqueda de las listas.
+
+    Sintaxis: términos separados por espacios, todos deben cumplirse.
+        palabra  "frase con espacios"          texto libre
+        clave:valor  clave:"valor con espacios"  filtro (ver ESQUEMAS)
+        -clave:valor  -palabra                  negación
+    Las fechas aceptan AAAA-MM-DD, rangos AAAA-MM-DD..AAAA-MM-DD (extremos opcionales)
+    y comparaciones >, >=, <, <=.
+
+    Cada filtro se traduce a un Q sobre joins de las relaciones a uno; las relaciones a muchos
+    (etiquetas, responsables de las actividades de una tarea) se evalúan con EXISTS, por lo
+    que el resultado no tiene duplicados y no requiere DISTINCT.
+'''
+import re
+from datetime import date
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils.translation import gettext as _
+
+from .models import (Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, Proyecto_Etiqueta)
+
+_termino = re.compile(r'(-?)(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+
+
+def interpretar(texto):
+    '''
+        Lista de (negado, clave, valor); clave es None para texto libre
+    '''
+    terminos = []
+    for negado, clave, frase, palabra in _termino.findall(texto or ''):
+        valor = (frase if frase is not None and palabra == '' else palabra).strip()
+        if valor:
+            terminos.append((negado == '-', clave.lower() if clave else None, valor))
+    return terminos
+
+def filtrar(queryset, texto, esquema):
+    '''
+        Aplica la consulta al queryset con el esquema indicado (nombre en ESQUEMAS).
+        Devuelve (queryset, errores); los términos con error se ignoran.
+    '''
+    filtros, errores = [], []
+    campos = ESQUEMAS[esquema]
+    for negado, clave, valor in interpretar(texto):
+        funcion = campos.get(clave or 'texto')
+        if funcion is None:
+            errores.append(_('Filtro desconocido: ') + clave)
+            continue
+        try:
+            filtro = funcion(valor)
+        except ValueError as ex:
+            errores.append(f'{clave}: {ex}')
+            continue
+        filtros.append(~filtro if negado else filtro)
+    if filtros:
+        queryset = queryset.filter(reduce(and_, filtros))
+    return queryset, errores
+
+
+#CONSTRUCTORES DE FILTROS
+def texto(*campos):
+    return lambda valor: reduce(or_, [Q(**{f'{campo}__icontains': valor}) for campo in campos])
+
+def existe(consulta, relacion, filtro):
+    '''
+        EXISTS sobre una relación a muchos; relacion es el campo del queryset interno
+        que apunta al registro externo (OuterRef('pk'))
+    '''
+    return lambda valor: Exists(consulta.filter(**{relacion: OuterRef('pk')}).filter(filtro(valor)))
+
+def usuario(ruta):
+    return lambda valor: Q(**{f'{ruta}__username__iexact': valor}) | \
+        Q(**{f'{ruta}__first_name__icontains': valor}) | Q(**{f'{ruta}__last_name__icontains': valor})
+
+def prioridad(ruta):
+    def filtro(valor):
+        if valor.isdigit():
+            return Q(**{ruta: int(valor)})
+        valores = [numero for numero, nombre in Proyecto_Tarea.PRIORIDADES if valor.lower() in nombre.lower()]
+        if not valores:
+            raise ValueError(_('prioridad no válida'))
+        return Q(**{f'{ruta}__in': valores})
+    return filtro
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(_('fecha no válida (AAAA-MM-DD)'))
+
+def fecha(ruta):
+    def filtro(valor):
+        for operador, lookup in (('>=', 'gte'), ('<=', 'lte'), ('>', 'gt'), ('<', 'lt')):
+            if valor.startswith(operador):
+                return Q(**{f'{ruta}__{lookup}': _fecha(valor[len(operador):])})
+        if '..' in valor:
+            inicio, fin = valor.split('..', 1)
+            rango = Q()
+            if inicio:
+                rango &= Q(**{f'{ruta}__gte': _fecha(inicio)})
+            if fin:
+                rango &= Q(**{f'{ruta}__lte': _fecha(fin)})
+            return rango
+        return Q(**{ruta: _fecha(valor)})
+    return filtro
+
+def estado(pendiente, completado, ruta_proyecto):
+    '''
+        estado:pendiente / estado:completado, o la descripción del estado del proyecto
+    '''
+    def filtro(valor):
+        if valor.lower() in ('pendiente', 'pendientes'):
+            return pendiente
+        if valor.lower() in ('completado', 'completada', 'completados', 'completadas', 'finalizado', 'finalizada'):
+            return completado
+        return Q(**{f'{ruta_proyecto}__estado__descripcion__iexact': valor})
+    return filtro
+
+def comentario_objeto(valor):
+    objetos = (
+        ('P', Proyecto.objects.filter(Q(nombre__icontains=valor)|Q(descripcion__icontains=valor))),
+        ('F', Proyecto_Fase.objects.filter(descripcion__icontains=valor)),
+        ('T', Proyecto_Tarea.objects.filter(descripcion__icontains=valor)),
+        ('A', Proyecto_Actividad.objects.filter(descripcion__icontains=valor)),
+    )
+    return reduce(or_, [Q(tipo=tipo) & Exists(consulta.filter(id=OuterRef('obj_uuid'))) for tipo, consulta in objetos])
+
+
+ESQUEMAS = {
+    'tarea': {
+        'texto':        texto('descripcion'),
+        'tarea':        texto('descripcion'),
+        'fase':         texto('fase__descripcion'),
+        'proyecto':     texto('proyecto__nombre', 'proyecto__descripcion'),
+        'etiqueta':     existe(Proyecto_Etiqueta.objects.all(), 'proyecto_tarea', texto('descripcion')),
+        'responsable':  existe(Proyecto_Actividad.objects.all(), 'tarea', usuario('responsable')),
+        'prioridad':    prioridad('prioridad'),
+        'estado':       estado(Q(pendiente=True), Q(pendiente=False), 'proyecto'),
+        'creacion':     fecha('creacion'),
+    },
+    'actividad': {
+        'texto':        texto('descripcion', 'tarea__descripcion'),
+        'actividad':    texto('descripcion'),
+        'tarea':        texto('tarea__descripcion'),
+        'fase':         texto('tarea__fase__descripcion'),
+        'proyecto':     texto('proyecto__nombre', 'proyecto__descripcion'),
+        'etiqueta':     lambda valor: Exists(Proyecto_Etiqueta.objects.filter(
+                            proyecto_tarea=OuterRef('tarea_id'), descripcion__icontains=valor)),
+        'responsable':  usuario('responsable'),
+        'prioridad':    prioridad('tarea__prioridad'),
+        'estado':       estado(Q(finalizado__lt=100), Q(finalizado=100), 'proyecto'),
+        'creacion':     fecha('creacion'),
+    },
+    'comentario': {
+        'texto':        texto('descripcion'),
+        'usuario':      usuario('usuario'),
+        'objeto':       comentario_objeto,
+        'creacion':     fecha('creacion__date'),
+    },
+}
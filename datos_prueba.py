@@ -0,0 +1,167 @@
+'''
+    Generación de datos sintéticos con volúmenes configurables (comando generar_datos y
+    mediciones de rendimiento, ver rendimiento.py).
+
+    Las cantidades de fases, etiquetas, usuarios asignados y comentarios son por proyecto, las
+    tareas por fase y las actividades por tarea. historial es la cantidad de modificaciones
+    adicionales de cada actividad (cada una agrega un registro histórico). Los objetos se
+    insertan con bulk_create por lotes, con su historial, proyecto por proyecto; al final se
+    reconstruyen acumulados e índice de búsqueda. Identificadores, nombres y textos se derivan
+    del generador aleatorio: con la misma semilla (en una base sin esos datos) se repiten, las
+    fechas son relativas al día de la generación.
+'''
+import random, uuid
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from . import acumulados, busqueda, versiones
+from .models import (Estado, Proyecto, Proyecto_Usuario, Proyecto_Etiqueta, Proyecto_Fase, Proyecto_Tarea,
+    Proyecto_Actividad, Comentario)
+
+LOTE_GENERACION = 1000
+PALABRAS = ('análisis', 'diseño', 'revisión', 'migración', 'servidor', 'base de datos', 'interfaz', 'reporte',
+    'integración', 'pruebas', 'documentación', 'capacitación', 'despliegue', 'seguridad', 'respaldo', 'usuarios',
+    'contabilidad', 'inventario', 'facturación', 'planilla', 'correo', 'red', 'licencias', 'proveedor')
+
+ESCALA = {
+    'proyectos':    5,
+    'fases':        4,
+    'tareas':       10,
+    'actividades':  5,
+    'etiquetas':    8,
+    'usuarios':     5,
+    'comentarios':  10,
+    'historial':    1,
+}
+
+
+def _id(rnd):
+    return uuid.UUID(int=rnd.getrandbits(128), version=4)
+
+def _texto(rnd, minimo=2, maximo=5):
+    return ' '.join(rnd.choice(PALABRAS) for _ in range(rnd.randint(minimo, maximo))).capitalize()
+
+def _insertar(objetos, modelo, usuario, fecha):
+    if objetos:
+        bulk_create_with_history(objetos, modelo, batch_size=LOTE_GENERACION, default_user=usuario, default_date=fecha)
+
+def _usuarios(cantidad, prefijo):
+    '''
+        Usuarios prefijo_0000 .. (se reutilizan los existentes)
+    '''
+    Usuario = get_user_model()
+    nombres = [f'{prefijo}_{n:04d}' for n in range(cantidad)]
+    existentes = set(Usuario.objects.filter(username__in=nombres).values_list('username', flat=True))
+    nuevos = []
+    for nombre in nombres:
+        if nombre not in existentes:
+            usuario = Usuario(username=nombre)
+            usuario.set_unusable_password()
+            nuevos.append(usuario)
+    Usuario.objects.bulk_create(nuevos, batch_size=LOTE_GENERACION)
+    return list(Usuario.objects.filter(username__in=nombres).order_by('username'))
+
+def _proyecto(rnd, nombre, estado, usuarios, escala, usuario, ahora):
+    '''
+        Crea un proyecto con su estructura; devuelve (proyecto, cantidad de registros por modelo)
+    '''
+    finicio  = date.today() - timedelta(days=rnd.randint(30, 720))
+    proyecto = Proyecto(id=_id(rnd), nombre=nombre, descripcion=_texto(rnd, 5, 15), finicio=finicio,
+        ffin=finicio + timedelta(days=rnd.randint(180, 1080)), publico=rnd.random() < 0.7, estado=estado,
+        lider=rnd.choice(usuarios))
+    _insertar([proyecto], Proyecto, usuario, ahora)
+
+    asignados = rnd.sample(usuarios, min(escala['usuarios'], len(usuarios)))
+    _insertar([Proyecto_Usuario(id=_id(rnd), proyecto=proyecto, usuario=asignado) for asignado in asignados],
+        Proyecto_Usuario, usuario, ahora)
+
+    etiquetas = [Proyecto_Etiqueta(id=_id(rnd), proyecto=proyecto, descripcion=f'{rnd.choice(PALABRAS)} {n}')
+        for n in range(escala['etiquetas'])]
+    _insertar(etiquetas, Proyecto_Etiqueta, usuario, ahora)
+
+    fases = [Proyecto_Fase(id=_id(rnd), proyecto=proyecto, correlativo=n, descripcion=f'Fase {n:02d}: {_texto(rnd, 1, 3)}')
+        for n in range(1, escala['fases'] + 1)]
+    _insertar(fases, Proyecto_Fase, usuario, ahora)
+
+    tareas, enlaces = [], []
+    for fase in fases:
+        for n in range(escala['tareas']):
+            tarea = Proyecto_Tarea(id=_id(rnd), fase=fase, proyecto=proyecto, descripcion=f'{_texto(rnd)} {n}',
+                prioridad=rnd.choice((10, 20, 30)), complejidad=rnd.randint(1, 20))
+            tareas.append(tarea)
+            for etiqueta in rnd.sample(etiquetas, min(rnd.randint(0, 3), len(etiquetas))):
+                enlaces.append((tarea.id, etiqueta.id))
+    _insertar(tareas, Proyecto_Tarea, usuario, ahora)
+    Enlace = Proyecto_Tarea.etiqueta.through
+    Enlace.objects.bulk_create([Enlace(proyecto_tarea_id=tarea_id, proyecto_etiqueta_id=etiqueta_id)
+        for tarea_id, etiqueta_id in enlaces], batch_size=LOTE_GENERACION)
+
+    actividades = []
+    for tarea in tareas:
+        for n in range(escala['actividades']):
+            actividades.append(Proyecto_Actividad(id=_id(rnd), tarea=tarea, proyecto=proyecto, descripcion=_texto(rnd),
+                resolucion=f'<p>{_texto(rnd, 5, 30)}</p>' if rnd.random() < 0.3 else '',
+                creacion=finicio + timedelta(days=rnd.randint(0, 365)), finalizado=rnd.choice((0, 0, 25, 50, 75, 100)),
+                responsable=rnd.choice(asignados) if asignados else None))
+    _insertar(actividades, Proyecto_Actividad, usuario, ahora)
+
+    for n in range(escala['historial']):
+        for actividad in actividades:
+            actividad.finalizado = min(100, actividad.finalizado + rnd.choice((0, 25, 50)))
+        bulk_update_with_history(actividades, Proyecto_Actividad, ['finalizado'], batch_size=LOTE_GENERACION,
+            default_user=usuario, default_date=ahora + timedelta(seconds=n + 1))
+
+    objetos = {'P': [proyecto], 'F': fases, 'T': tareas, 'A': actividades}
+    tipos   = [tipo for tipo, lista in objetos.items() if lista]
+    comentarios = []
+    for n in range(escala['comentarios']):
+        tipo    = rnd.choice(tipos)
+        objeto  = rnd.choice(objetos[tipo])
+        comentarios.append(Comentario(id=_id(rnd), descripcion=f'<p>{_texto(rnd, 3, 20)}</p>', tipo=tipo, obj_id=str(objeto.id),
+            obj_uuid=objeto.id, proyecto=proyecto, usuario=rnd.choice(asignados or usuarios)))
+    Comentario.objects.bulk_create(comentarios, batch_size=LOTE_GENERACION)
+
+    return proyecto, {
+        'proyectos':    1,
+        'fases':        len(fases),
+        'tareas':       len(tareas),
+        'actividades':  len(actividades),
+        'etiquetas':    len(etiquetas),
+        'comentarios':  len(comentarios),
+        'historial':    len(actividades) * escala['historial'],
+    }
+
+def generar(usuario=None, semilla=None, prefijo='sintetico', **escala):
+    '''
+        Crea los datos con las cantidades de ESCALA (modificables por parámetro).
+        Devuelve (ids de los proyectos creados, cantidad de registros por modelo)
+    '''
+    desconocidos = set(escala) - set(ESCALA)
+    if desconocidos:
+        raise ValueError(f'Cantidades desconocidas: {", ".join(sorted(desconocidos))}')
+    escala  = {**ESCALA, **escala}
+    rnd     = random.Random(semilla)
+    lote    = f'{rnd.getrandbits(32):08x}'     # los nombres de proyecto son únicos
+    ahora   = timezone.now()
+    totales = dict.fromkeys(('proyectos', 'fases', 'tareas', 'actividades', 'etiquetas', 'comentarios', 'historial'), 0)
+
+    with transaction.atomic():
+        estado   = Estado.objects.get_or_create(descripcion=f'{prefijo} en curso'[:30])[0]
+        usuarios = _usuarios(max(escala['usuarios'], 1) * 2, prefijo)
+
+        proyecto_ids = []
+        for n in range(escala['proyectos']):
+            proyecto, cantidades = _proyecto(rnd, f'{prefijo} {lote} {n:05d}', estado, usuarios, escala, usuario, ahora)
+            proyecto_ids.append(proyecto.id)
+            for modelo, cantidad in cantidades.items():
+                totales[modelo] += cantidad
+
+        # bulk_create no emite señales: acumulados, índice de búsqueda y versión se actualizan aquí
+        acumulados.reconstruir(proyecto_ids)
+        busqueda.reindexar(proyecto_ids)
+        versiones.incrementar(*proyecto_ids)
+    return proyecto_ids, totales
@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from django import forms
-from django.db.models import Max, Q
+from django.db.models import Max
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext as _
 
@@ -11,6 +11,8 @@ from usuarios.models import Usuario
 from .models import (Proyecto, Proyecto_Usuario, Proyecto_Objetivo, 
     Proyecto_Meta, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, 
     Proyecto_Etiqueta, Comentario)
+from .importacion import EXTENSIONES
+from .visibilidad import proyectos_visibles
 
 
 class DateInput(forms.DateInput):
@@ -200,17 +202,21 @@ class Proyecto_Comentario_ModelForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(**kwargs)
 
+    def clean_obj_id(self):
+        obj_id = self.cleaned_data['obj_id']
+        if obj_id and Comentario.convertir_uuid(obj_id) is None:
+            raise ValidationError(_('El objeto comentado no es válido'))
+        return obj_id
+
 class Proyecto_Reporte_Avances(forms.Form):
     proyecto= forms.ChoiceField(label=_('Proyecto'), required=True)
     
     def __init__(self, *args, **kwargs):
-        usr_id = kwargs.pop('usuario')
+        usuario = kwargs.pop('usuario')
         super().__init__(**kwargs)
-        
-        proys = Proyecto_Usuario.objects.filter(usuario_id=usr_id).values_list('proyecto')
-        
+
         try:
-            self.fields['proyecto'].choices = elementos_combo(Proyecto.objects.filter(Q(publico=True)|Q(id__in=proys), estado__bloquea=False)\
+            self.fields['proyecto'].choices = elementos_combo(proyectos_visibles(usuario).filter(estado__bloquea=False)\
                 .values_list('id', 'nombre'))
         except:
             pass
@@ -221,13 +227,11 @@ class Proyecto_Reportes_Actividades(forms.Form):
     ffin    = forms.DateField(label=_('Fecha Fin'))
     
     def __init__(self, *args, **kwargs):
-        usr_id = kwargs.pop('usuario')
+        usuario = kwargs.pop('usuario')
         super().__init__(**kwargs)
-        
-        proys   = Proyecto_Usuario.objects.filter(usuario_id=usr_id).values_list('proyecto')
 
         try:
-            self.fields['proyecto'].choices = elementos_combo(Proyecto.objects.filter(Q(publico=True)|Q(id__in=proys), estado__bloquea=False)\
+            self.fields['proyecto'].choices = elementos_combo(proyectos_visibles(usuario).filter(estado__bloquea=False)\
                 .values_list('id', 'nombre'))
             #self.fields['usuario'].choices  = elementos_combo(None)
             self.fields['fini'].widget      = DateInput(format='%Y-%m-%d')
@@ -235,5 +239,34 @@ class Proyecto_Reportes_Actividades(forms.Form):
         except:
             pass
 
+class Proyecto_Clonacion_Form(forms.Form):
+    nombre  = forms.CharField(label=_('Nombre'), max_length=90, required=True)
+    finicio = forms.DateField(label=_('Fecha Inicio'), required=False, widget=DateInput(format='%Y-%m-%d'),
+        help_text=_('Si no se indica se conservan las fechas del proyecto original'))
+
+    def clean_nombre(self):
+        nombre = self.cleaned_data['nombre']
+        if Proyecto.objects.filter(nombre=nombre).exists():
+            raise ValidationError(_('Ya existe un proyecto con este nombre'))
+        return nombre
+
+class Proyecto_Importacion_Form(forms.Form):
+    proyecto= forms.ChoiceField(label=_('Proyecto'), required=True)
+    archivo = forms.FileField(label=_('Archivo (XLSX o CSV)'), required=True)
+    crear_etiquetas = forms.BooleanField(label=_('Crear etiquetas inexistentes'), required=False, initial=True)
+
+    def __init__(self, *args, **kwargs):
+        usuario = kwargs.pop('usuario')
+        super().__init__(*args, **kwargs)
+
+        self.fields['proyecto'].choices = elementos_combo(proyectos_visibles(usuario).filter(estado__bloquea=False)\
+            .values_list('id', 'nombre'))
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(EXTENSIONES):
+            raise ValidationError(_('El archivo debe ser XLSX o CSV'))
+        return archivo
+
 
 
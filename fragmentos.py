@@ -0,0 +1,67 @@
+'''
+    Cache del HTML de las tareas de una fase (accordion_for_fase.html).
+
+    La llave del fragmento combina la fase, su versión, los permisos que utiliza la plantilla,
+    la fecha y la configuración de expiración (de estas depende si el proyecto es modificable).
+    La versión de cada fase se guarda en el mismo cache: al modificar la fase, sus tareas, sus
+    actividades o el proyecto se descarta (signals.py, al confirmar la transacción) y la siguiente
+    solicitud genera otra, por lo que una fase sin cambios se atiende sin consultar la base de datos.
+    Los fragmentos que ya no se utilizan expiran en SEGUIMIENTO_FRAGMENTO_TTL segundos (900 por defecto).
+'''
+import hashlib, uuid
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Proyecto_Fase, Proyecto_Tarea, conf
+
+PREFIJO = 'seguimiento_fragmento'
+PERMISOS_ACCORDION = ('add_comentario', 'change_proyecto_fase', 'delete_proyecto_fase',
+    'change_proyecto_actividad', 'delete_proyecto_actividad', 'view_proyecto_actividad')
+
+
+def get_ttl():
+    return getattr(settings, 'SEGUIMIENTO_FRAGMENTO_TTL', 900)
+
+def _llave_version(fase_id):
+    return f'{PREFIJO}_version_{fase_id}'
+
+def _llave_generacion():
+    return f'{PREFIJO}_generacion'
+
+def _version(llave):
+    '''
+        Valor vigente de una llave de versión, o uno nuevo si fue descartada
+    '''
+    version = cache.get(llave)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(llave, version, None):
+            version = cache.get(llave, version)
+    return version
+
+def invalidar(*fase_ids):
+    llaves = [_llave_version(fase_id) for fase_id in set(fase_ids) if fase_id]
+    if llaves:
+        transaction.on_commit(lambda: cache.delete_many(llaves))
+
+def invalidar_tareas(*tarea_ids):
+    tarea_ids = [tarea_id for tarea_id in tarea_ids if tarea_id]
+    if tarea_ids:
+        invalidar(*Proyecto_Tarea.objects.filter(id__in=tarea_ids).values_list('fase_id', flat=True))
+
+def invalidar_proyecto(proyecto_id):
+    invalidar(*Proyecto_Fase.objects.filter(proyecto_id=proyecto_id).values_list('id', flat=True))
+
+def invalidar_todo():
+    transaction.on_commit(lambda: cache.delete(_llave_generacion()))
+
+def permisos(usuario, nombres=PERMISOS_ACCORDION):
+    return ''.join('1' if usuario.has_perm(f'seguimiento.{nombre}') else '0' for nombre in nombres)
+
+def llave_accordion(usuario, fase_id):
+    partes = (str(fase_id), _version(_llave_version(fase_id)), _version(_llave_generacion()), permisos(usuario),
+        date.today(), conf.get_value('seguimiento', 'proy_expira'))
+    return f'{PREFIJO}_accordion_' + hashlib.blake2b(repr(partes).encode(), digest_size=16).hexdigest()
@@ -0,0 +1,321 @@
+'''
+    Importación de fases, tareas y actividades desde un archivo XLSX o CSV.
+
+    El archivo se lee fila por fila (openpyxl en modo read_only, o csv) y cada fila se valida
+    contra los datos del proyecto, cargados una sola vez: fases (correlativo y descripción),
+    tareas, etiquetas y usuarios asignados. Si alguna fila tiene errores no se importa nada;
+    de lo contrario fases, etiquetas, tareas, sus etiquetas y actividades se insertan con
+    bulk_create por lotes, junto con su historial. Como bulk_create no emite señales, los
+    acumulados del proyecto y el índice de búsqueda se actualizan al final.
+
+    La primera fila es el encabezado (sin importar mayúsculas ni acentos), con las columnas:
+        fase, correlativo, tarea, prioridad, complejidad, etiquetas, actividad, creacion,
+        finalizado, responsable
+    Son obligatorias fase y tarea; las filas sin actividad únicamente crean la fase y la tarea.
+    Las etiquetas se separan por comas y el responsable se indica con su nombre de usuario.
+'''
+import csv, io, logging, os
+from datetime import date, datetime
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from simple_history.utils import bulk_create_with_history
+
+from . import acumulados, busqueda, fragmentos, versiones
+from .models import (Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, Proyecto_Etiqueta,
+    Proyecto_Usuario)
+
+LOTE_IMPORTACION    = 500
+LONGITUD_DESCRIPCION= 180
+EXTENSIONES         = ('.xlsx', '.csv')
+COLUMNAS            = ('fase', 'correlativo', 'tarea', 'prioridad', 'complejidad', 'etiquetas', 'actividad',
+    'creacion', 'finalizado', 'responsable')
+OBLIGATORIAS        = ('fase', 'tarea')
+
+logger = logging.getLogger(__name__)
+
+
+#LECTURA
+def _valor(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(texto, dialecto)
+    except UnicodeDecodeError:
+        raise ValueError(_('El archivo CSV debe estar codificado en UTF-8'))
+    except csv.Error as ex:
+        raise ValueError(_('El archivo CSV no es válido: ') + str(ex))
+    finally:
+        texto.detach()
+
+def _filas_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError(_('Para importar archivos XLSX se requiere openpyxl'))
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception:
+        logger.info('importacion: archivo XLSX no válido', exc_info=True)
+        raise ValueError(_('El archivo XLSX no es válido'))
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+def leer_filas(archivo, nombre):
+    '''
+        (número de fila, {columna: valor}) de cada fila con datos, sin cargar el archivo completo.
+        Los valores son texto, salvo las fechas de un XLSX.
+    '''
+    extension = os.path.splitext(nombre or '')[1].lower()
+    if extension not in EXTENSIONES:
+        raise ValueError(_('El archivo debe ser XLSX o CSV'))
+
+    columnas = None
+    for numero, fila in enumerate(_filas_xlsx(archivo) if extension == '.xlsx' else _filas_csv(archivo), start=1):
+        valores = [_valor(valor) for valor in fila]
+        if columnas is None:
+            columnas = [busqueda.normalizar(str(valor)) for valor in valores]
+            faltantes = [columna for columna in OBLIGATORIAS if columna not in columnas]
+            if faltantes:
+                raise ValueError(_('Faltan columnas en el encabezado: ') + ', '.join(faltantes))
+            continue
+        datos = {columna: valor for columna, valor in zip(columnas, valores) if columna in COLUMNAS and valor != ''}
+        if datos:
+            yield numero, datos
+
+
+#VALIDACION
+def _entero(valor, minimo, maximo, mensaje):
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ValueError(mensaje)
+    if not minimo <= numero <= maximo:
+        raise ValueError(mensaje)
+    return numero
+
+def _prioridad(valor):
+    if valor.isdigit() and int(valor) in dict(Proyecto_Tarea.PRIORIDADES):
+        return int(valor)
+    for numero, nombre in Proyecto_Tarea.PRIORIDADES:
+        if busqueda.normalizar(valor) == busqueda.normalizar(nombre):
+            return numero
+    raise ValueError(_('Prioridad no válida'))
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(_('Fecha de creación no válida (AAAA-MM-DD)'))
+
+def _descripcion(valor, campo):
+    if len(valor) > LONGITUD_DESCRIPCION:
+        raise ValueError(_('%(campo)s excede %(longitud)s caracteres') % {'campo': campo, 'longitud': LONGITUD_DESCRIPCION})
+    return valor
+
+
+class Importacion:
+    '''
+        Datos existentes del proyecto y objetos nuevos validados, fila por fila
+    '''
+    def __init__(self, proyecto, usuario, crear_etiquetas=True):
+        self.proyecto       = proyecto
+        self.usuario        = usuario
+        self.crear_etiquetas= crear_etiquetas
+        self.hoy            = timezone.localdate()
+        self.errores        = []
+        self.filas          = 0
+
+        fases = list(Proyecto_Fase.objects.filter(proyecto=proyecto))
+        self.fases          = {fase.descripcion: fase for fase in fases}
+        self.correlativos   = {fase.correlativo for fase in fases}
+        fases = {fase.id: fase for fase in fases}
+        self.tareas         = {}
+        for tarea in Proyecto_Tarea.objects.filter(proyecto=proyecto):
+            tarea.fase = fases[tarea.fase_id]
+            self.tareas[(tarea.fase_id, tarea.descripcion)] = tarea
+        self.etiquetas      = {etiqueta.descripcion.casefold(): etiqueta
+            for etiqueta in Proyecto_Etiqueta.objects.filter(proyecto=proyecto)}
+        self.usuarios       = {username.casefold(): usuario_id for username, usuario_id in
+            Proyecto_Usuario.objects.filter(proyecto=proyecto).values_list('usuario__username', 'usuario_id')}
+
+        self.nuevas_fases       = []
+        self.nuevas_tareas      = []
+        self.nuevas_etiquetas   = []
+        self.nuevas_actividades = []
+        self.enlaces            = set()
+
+    def _interpretar(self, fila):
+        '''
+            Valores de la fila ya convertidos; lanza ValueError con todos los problemas encontrados
+        '''
+        datos, problemas = {}, []
+        validaciones = (
+            ('fase',        lambda v: _descripcion(v, _('Fase'))),
+            ('correlativo', lambda v: _entero(v, 1, 32767, _('Correlativo no válido'))),
+            ('tarea',       lambda v: _descripcion(v, _('Tarea'))),
+            ('prioridad',   _prioridad),
+            ('complejidad', lambda v: _entero(v, 1, 100, _('La complejidad debe ser un entero de 1 a 100'))),
+            ('actividad',   lambda v: _descripcion(v, _('Actividad'))),
+            ('creacion',    _fecha),
+            ('finalizado',  lambda v: _entero(v, 0, 100, _('El avance debe ser un entero de 0 a 100'))),
+        )
+        for columna, funcion in validaciones:
+            if columna in fila:
+                try:
+                    datos[columna] = funcion(fila[columna])
+                except ValueError as ex:
+                    problemas.append(str(ex))
+        for columna in OBLIGATORIAS:
+            if columna not in fila:
+                problemas.append(_('Falta el valor de %(columna)s') % {'columna': columna})
+
+        datos['etiquetas'] = [etiqueta.strip() for etiqueta in fila.get('etiquetas', '').split(',') if etiqueta.strip()]
+        for etiqueta in datos['etiquetas']:
+            if len(etiqueta) > LONGITUD_DESCRIPCION:
+                problemas.append(_('Etiqueta demasiado larga: ') + etiqueta[:30])
+            elif etiqueta.casefold() not in self.etiquetas and not self.crear_etiquetas:
+                problemas.append(_('La etiqueta no existe: ') + etiqueta)
+        if 'responsable' in fila:
+            datos['responsable_id'] = self.usuarios.get(fila['responsable'].casefold())
+            if datos['responsable_id'] is None:
+                problemas.append(_('El responsable no está asignado al proyecto: ') + fila['responsable'])
+        if 'actividad' not in fila and any(columna in fila for columna in ('creacion', 'finalizado', 'responsable')):
+            problemas.append(_('Indica datos de actividad sin su descripción'))
+
+        fase = self.fases.get(datos.get('fase'))
+        correlativo = datos.get('correlativo')
+        if fase is None:
+            if correlativo in self.correlativos:
+                problemas.append(_('El correlativo %(correlativo)s ya existe en el proyecto') % {'correlativo': correlativo})
+        else:
+            if correlativo and correlativo != fase.correlativo:
+                problemas.append(_('La fase existe con el correlativo %(correlativo)s') % {'correlativo': fase.correlativo})
+            if fase.cerrado:
+                problemas.append(_('La fase está cerrada'))
+
+        if problemas:
+            raise ValueError(problemas)
+        return fase, datos
+
+    def validar(self, numero, fila):
+        '''
+            Registra los objetos nuevos de la fila, o sus errores
+        '''
+        self.filas += 1
+        try:
+            fase, datos = self._interpretar(fila)
+        except ValueError as ex:
+            self.errores.extend({'fila': numero, 'error': problema} for problema in ex.args[0])
+            return
+        if self.errores:
+            # ya no se importará nada, únicamente se continúa validando
+            return
+
+        if fase is None:
+            fase = Proyecto_Fase(proyecto=self.proyecto, descripcion=datos['fase'],
+                correlativo=datos.get('correlativo') or max(self.correlativos, default=0) + 1)
+            self.fases[fase.descripcion] = fase
+            self.correlativos.add(fase.correlativo)
+            self.nuevas_fases.append(fase)
+
+        tarea = self.tareas.get((fase.id, datos['tarea']))
+        if tarea is None:
+            tarea = Proyecto_Tarea(fase=fase, proyecto=self.proyecto, descripcion=datos['tarea'], prioridad=datos.get('prioridad', 10),
+                complejidad=datos.get('complejidad', 1))
+            self.tareas[(fase.id, tarea.descripcion)] = tarea
+            self.nuevas_tareas.append(tarea)
+
+        for descripcion in datos['etiquetas']:
+            etiqueta = self.etiquetas.get(descripcion.casefold())
+            if etiqueta is None:
+                etiqueta = Proyecto_Etiqueta(proyecto=self.proyecto, descripcion=descripcion)
+                self.etiquetas[descripcion.casefold()] = etiqueta
+                self.nuevas_etiquetas.append(etiqueta)
+            self.enlaces.add((tarea.id, etiqueta.id))
+
+        if 'actividad' in datos:
+            self.nuevas_actividades.append(Proyecto_Actividad(tarea=tarea, proyecto=self.proyecto, descripcion=datos['actividad'],
+                creacion=datos.get('creacion', self.hoy), finalizado=datos.get('finalizado', 0),
+                responsable_id=datos.get('responsable_id')))
+
+    def guardar(self):
+        '''
+            Inserta los objetos nuevos por lotes (con su historial) y actualiza acumulados e índice de búsqueda
+        '''
+        ahora = timezone.now()
+        with transaction.atomic():
+            for modelo, objetos in ((Proyecto_Fase, self.nuevas_fases), (Proyecto_Etiqueta, self.nuevas_etiquetas),
+                    (Proyecto_Tarea, self.nuevas_tareas), (Proyecto_Actividad, self.nuevas_actividades)):
+                if objetos:
+                    bulk_create_with_history(objetos, modelo, batch_size=LOTE_IMPORTACION,
+                        default_user=self.usuario, default_date=ahora)
+                if modelo is Proyecto_Tarea:
+                    Enlace = Proyecto_Tarea.etiqueta.through
+                    Enlace.objects.bulk_create([Enlace(proyecto_tarea_id=tarea_id, proyecto_etiqueta_id=etiqueta_id)
+                        for tarea_id, etiqueta_id in self.enlaces], batch_size=LOTE_IMPORTACION, ignore_conflicts=True)
+
+            acumulados.reconstruir([self.proyecto.id])
+            versiones.incrementar(self.proyecto.id)
+            fragmentos.invalidar_proyecto(self.proyecto.id)
+            for tipo, objetos in (('F', self.nuevas_fases), ('T', self.nuevas_tareas), ('A', self.nuevas_actividades)):
+                for inicio in range(0, len(objetos), LOTE_IMPORTACION):
+                    busqueda.indexar_lote(tipo, objetos[inicio:inicio+LOTE_IMPORTACION])
+
+    def resumen(self):
+        return {
+            'filas':        self.filas,
+            'fases':        len(self.nuevas_fases),
+            'tareas':       len(self.nuevas_tareas),
+            'etiquetas':    len(self.nuevas_etiquetas),
+            'actividades':  len(self.nuevas_actividades),
+        }
+
+
+def importar(proyecto, archivo, nombre, usuario, crear_etiquetas=True):
+    '''
+        Importa el archivo (nombre determina el formato) al proyecto.
+        Devuelve (resumen, errores); si hay errores no se importa nada.
+        errores es una lista de {'fila', 'error'}, con fila None para errores del archivo.
+    '''
+    if not proyecto.get_modificable():
+        return None, [{'fila': None, 'error': _('El proyecto no permite modificaciones')}]
+    try:
+        with transaction.atomic():
+            # una importación a la vez por proyecto (correlativos y descripciones únicos)
+            Proyecto.objects.select_for_update().only('id').get(id=proyecto.id)
+            importacion = Importacion(proyecto, usuario, crear_etiquetas)
+            for numero, fila in leer_filas(archivo, nombre):
+                importacion.validar(numero, fila)
+            if not importacion.filas:
+                return None, [{'fila': None, 'error': _('El archivo no contiene filas para importar')}]
+            if importacion.errores:
+                return None, importacion.errores
+            importacion.guardar()
+    except ValueError as ex:
+        return None, [{'fila': None, 'error': str(ex)}]
+    except IntegrityError:
+        logger.warning('importacion: conflicto al guardar en el proyecto %s', proyecto.id, exc_info=True)
+        return None, [{'fila': None, 'error': _('Los datos del proyecto cambiaron durante la importación, intente nuevamente')}]
+    return importacion.resumen(), []
@@ -0,0 +1,219 @@
+'''
+    Instrumentación de consultas a la base de datos, para detectar consultas repetidas (N+1).
+
+    Registro (execute_wrapper de Django) anota cada consulta con su duración, su huella (el SQL
+    sin valores, con las listas IN reducidas) y su origen: la función de la aplicación más
+    cercana en la pila (vista, método del modelo, ...) y el nodo de plantilla que la provocó.
+    - InstrumentacionMiddleware: en DEBUG (o con SEGUIMIENTO_INSTRUMENTACION = True) agrega a la
+      respuesta los encabezados X-Seguimiento-Consultas, -Tiempo-BD, -Duplicadas y -Presupuesto
+      y registra (logging, seguimiento.instrumentacion) una línea por solicitud: debug, o warning
+      con el detalle de las consultas si se supera el presupuesto. Sin DEBUG no se instala.
+    - presupuesto(n): declara el máximo de consultas de una vista (solicitud completa).
+    - presupuesto_consultas: decorador / administrador de contexto para pruebas, falla si el
+      bloque supera el máximo indicado o, sin indicarlo, el declarado por las vistas solicitadas.
+'''
+import logging, os, re, sys, time
+from contextlib import ContextDecorator, ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger      = logging.getLogger(__name__)
+_activos    = ContextVar('seguimiento_instrumentacion', default=())
+_directorio = os.path.dirname(os.path.abspath(__file__))
+_archivo    = os.path.abspath(__file__)
+_literales  = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_listas     = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_espacios   = re.compile(r'\s+')
+
+
+def huella(sql):
+    '''
+        SQL sin valores: consultas que solo difieren en parámetros tienen la misma huella
+    '''
+    sql = _literales.sub('?', sql)
+    sql = _listas.sub('(...)', sql)
+    return _espacios.sub(' ', sql).strip()
+
+def origen(frame):
+    '''
+        (código, plantilla) que originan la consulta: 'archivo.py:línea función' de la primera
+        función de la aplicación en la pila y 'plantilla:línea' del nodo en renderizado (o None)
+    '''
+    codigo = plantilla = None
+    while frame is not None and (codigo is None or plantilla is None):
+        archivo = frame.f_code.co_filename
+        if codigo is None and archivo.startswith(_directorio) and archivo != _archivo:
+            codigo = f'{os.path.relpath(archivo, _directorio)}:{frame.f_lineno} {frame.f_code.co_name}'
+        if plantilla is None and frame.f_code.co_name == 'render_annotated':
+            nodo = frame.f_locals.get('self')
+            nodo_origen, token = getattr(nodo, 'origin', None), getattr(nodo, 'token', None)
+            if nodo_origen is not None:
+                plantilla = f'{nodo_origen.template_name}:{getattr(token, "lineno", "?")}'
+        frame = frame.f_back
+    return codigo, plantilla
+
+
+class Registro:
+    '''
+        Consultas ejecutadas (en todas las conexiones del hilo) mientras está activo
+    '''
+    def __init__(self):
+        self.consultas      = []
+        self.presupuestos   = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            codigo, plantilla = origen(sys._getframe(1))
+            self.consultas.append({
+                'sql':          sql,
+                'huella':       huella(sql),
+                'duracion':     duracion,
+                'codigo':       codigo,
+                'plantilla':    plantilla,
+            })
+
+    def __enter__(self):
+        self._pila = ExitStack()
+        for conexion in connections.all():
+            self._pila.enter_context(conexion.execute_wrapper(self))
+        self._token = _activos.set(_activos.get() + (self, ))
+        return self
+
+    def __exit__(self, *exc):
+        _activos.reset(self._token)
+        self._pila.close()
+        return False
+
+    @property
+    def cantidad(self):
+        return len(self.consultas)
+
+    @property
+    def tiempo_ms(self):
+        return round(sum(consulta['duracion'] for consulta in self.consultas) * 1000, 2)
+
+    @property
+    def presupuesto(self):
+        '''
+            Suma de los presupuestos declarados por las vistas ejecutadas (None si ninguna declaró)
+        '''
+        return sum(maximo for _, maximo in self.presupuestos) if self.presupuestos else None
+
+    def duplicadas(self):
+        '''
+            {huella: [consultas]} de las huellas ejecutadas más de una vez
+        '''
+        grupos = {}
+        for consulta in self.consultas:
+            grupos.setdefault(consulta['huella'], []).append(consulta)
+        return {llave: grupo for llave, grupo in grupos.items() if len(grupo) > 1}
+
+    def detalle(self):
+        '''
+            Texto con las consultas agrupadas por huella (las más repetidas primero) y sus orígenes
+        '''
+        grupos = {}
+        for consulta in self.consultas:
+            grupos.setdefault(consulta['huella'], []).append(consulta)
+        lineas = [f'{self.cantidad} consultas, {self.tiempo_ms} ms']
+        for llave, grupo in sorted(grupos.items(), key=lambda item: -len(item[1])):
+            lineas.append(f'{len(grupo)}x {llave[:300]}')
+            origenes = {(consulta['codigo'], consulta['plantilla']) for consulta in grupo}
+            for codigo, plantilla in sorted(origenes, key=str):
+                lineas.append(f'    {codigo or "?"}' + (f' ({plantilla})' if plantilla else ''))
+        return '\n'.join(lineas)
+
+    def verificar(self, maximo=None, duplicadas=None, tiempo_ms=None):
+        '''
+            AssertionError si se supera alguno de los límites (maximo None: el presupuesto declarado)
+        '''
+        maximo  = self.presupuesto if maximo is None else maximo
+        errores = []
+        if maximo is not None and self.cantidad > maximo:
+            errores.append(f'{self.cantidad} consultas, presupuesto {maximo}')
+        repetidas = sum(len(grupo) - 1 for grupo in self.duplicadas().values())
+        if duplicadas is not None and repetidas > duplicadas:
+            errores.append(f'{repetidas} consultas repetidas (misma huella), máximo {duplicadas}')
+        if tiempo_ms is not None and self.tiempo_ms > tiempo_ms:
+            errores.append(f'{self.tiempo_ms} ms en base de datos, máximo {tiempo_ms} ms')
+        if errores:
+            raise AssertionError('; '.join(errores) + '\n' + self.detalle())
+
+
+def presupuesto(consultas):
+    '''
+        Declara el máximo de consultas de una vista (incluida la plantilla). Se verifica con
+        presupuesto_consultas() en pruebas y se informa en el encabezado X-Seguimiento-Presupuesto.
+        En vistas basadas en clases: method_decorator(presupuesto(n), name='dispatch')
+    '''
+    def decorador(vista):
+        nombre = getattr(vista, '__qualname__', repr(vista))
+
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            for registro in _activos.get():
+                registro.presupuestos.append((nombre, consultas))
+            return vista(*args, **kwargs)
+        envoltura.presupuesto_consultas = consultas
+        return envoltura
+    return decorador
+
+
+class presupuesto_consultas(ContextDecorator):
+    '''
+        Para pruebas: falla si el bloque (o la función decorada) ejecuta más de maximo consultas
+        (por defecto el presupuesto declarado por las vistas solicitadas), más de duplicadas
+        consultas con una huella repetida o más de tiempo_ms en la base de datos.
+        Devuelve el Registro, para inspeccionar las consultas.
+    '''
+    def __init__(self, maximo=None, duplicadas=None, tiempo_ms=None):
+        self.maximo     = maximo
+        self.duplicadas = duplicadas
+        self.tiempo_ms  = tiempo_ms
+
+    def __enter__(self):
+        self.registro = Registro().__enter__()
+        return self.registro
+
+    def __exit__(self, tipo, *exc):
+        self.registro.__exit__(tipo, *exc)
+        if tipo is None:
+            self.registro.verificar(self.maximo, self.duplicadas, self.tiempo_ms)
+        return False
+
+
+class InstrumentacionMiddleware:
+    '''
+        Consultas por solicitud en encabezados de la respuesta y una línea en el log.
+        Únicamente con DEBUG o SEGUIMIENTO_INSTRUMENTACION = True.
+    '''
+    def __init__(self, get_response):
+        if not getattr(settings, 'SEGUIMIENTO_INSTRUMENTACION', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with Registro() as registro:
+            response = self.get_response(request)
+        repetidas = sum(len(grupo) - 1 for grupo in registro.duplicadas().values())
+        response['X-Seguimiento-Consultas'] = str(registro.cantidad)
+        response['X-Seguimiento-Tiempo-BD'] = f'{registro.tiempo_ms}ms'
+        response['X-Seguimiento-Duplicadas'] = str(repetidas)
+        linea = f'[consultas] {request.method} {request.path} {response.status_code}: {registro.cantidad} consultas, ' \
+            f'{registro.tiempo_ms} ms, {repetidas} repetidas'
+        if registro.presupuesto is not None:
+            response['X-Seguimiento-Presupuesto'] = str(registro.presupuesto)
+            linea += f', presupuesto {registro.presupuesto}'
+            if registro.cantidad > registro.presupuesto:
+                logger.warning('%s EXCEDIDO\n%s', linea, registro.detalle())
+                return response
+        logger.debug(linea)
+        return response
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from seguimiento import datos_prueba
+
+
+class Command(BaseCommand):
+    help = 'Genera proyectos con fases, tareas, actividades, etiquetas, comentarios e historial sintéticos'
+
+    def add_arguments(self, parser):
+        ayudas = {
+            'proyectos':    'Cantidad de proyectos',
+            'fases':        'Fases por proyecto',
+            'tareas':       'Tareas por fase',
+            'actividades':  'Actividades por tarea',
+            'etiquetas':    'Etiquetas por proyecto',
+            'usuarios':     'Usuarios asignados por proyecto',
+            'comentarios':  'Comentarios por proyecto',
+            'historial':    'Modificaciones adicionales (registros históricos) por actividad',
+        }
+        for nombre, ayuda in ayudas.items():
+            parser.add_argument(f'--{nombre}', type=int, default=datos_prueba.ESCALA[nombre], 
+                help=f'{ayuda} (por defecto {datos_prueba.ESCALA[nombre]})')
+        parser.add_argument('--semilla', type=int, 
+            help='Semilla para repetir los datos (identificadores, nombres y textos)')
+        parser.add_argument('--prefijo', default='sintetico', 
+            help='Prefijo de los nombres de proyectos, usuarios y estado')
+
+    def handle(self, *args, **options):
+        escala = {nombre: options[nombre] for nombre in datos_prueba.ESCALA}
+        proyecto_ids, totales = datos_prueba.generar(semilla=options['semilla'], prefijo=options['prefijo'], **escala)
+        for modelo, total in totales.items():
+            self.stdout.write(f'{modelo}: {total}')
+        self.stdout.write(self.style.SUCCESS(f'{len(proyecto_ids)} proyectos generados'))
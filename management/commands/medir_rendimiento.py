@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seguimiento import datos_prueba, rendimiento
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo, consultas y memoria de las vistas principales con datos sintéticos, en la base de pruebas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', default=','.join(str(escala) for escala in rendimiento.ESCALAS), 
+            help='Cantidades de proyectos a generar, separadas por comas')
+        parser.add_argument('--repeticiones', type=int, default=rendimiento.REPETICIONES, 
+            help='Solicitudes por vista para calcular la mediana del tiempo')
+        for nombre in ('fases', 'tareas', 'actividades', 'etiquetas', 'usuarios', 'comentarios', 'historial'):
+            parser.add_argument(f'--{nombre}', type=int, default=datos_prueba.ESCALA[nombre], 
+                help=f'Cantidad de {nombre} (ver generar_datos)')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--keepdb', action='store_true', 
+            help='Conserva la base de pruebas entre ejecuciones (como manage.py test --keepdb)')
+        parser.add_argument('--salida', 
+            help='Archivo donde se escribe el resumen JSON (por defecto la salida estándar)')
+        parser.add_argument('--base', 
+            help='Resumen JSON de referencia; falla si hay regresiones')
+        parser.add_argument('--tolerancia', type=float, default=rendimiento.TOLERANCIA, 
+            help='Aumento relativo de tiempo y memoria aceptado respecto a la base')
+
+    def handle(self, *args, **options):
+        try:
+            escalas = [int(escala) for escala in options['escalas'].split(',') if escala.strip()]
+        except ValueError:
+            raise CommandError('--escalas debe ser una lista de enteros separados por comas')
+        escala = {nombre: options[nombre] for nombre in datos_prueba.ESCALA if nombre != 'proyectos'}
+        resumen = rendimiento.ejecutar(escalas, options['repeticiones'], options['semilla'], options['keepdb'], **escala)
+
+        texto = json.dumps(resumen, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(texto)
+            self.stdout.write(self.style.SUCCESS(f'Resumen escrito en {options["salida"]}'))
+        else:
+            self.stdout.write(texto)
+
+        if options['base']:
+            with open(options['base'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+            regresiones = rendimiento.comparar(resumen, base, options['tolerancia'])
+            for escala, vista, metrica, anterior, actual in regresiones:
+                self.stderr.write(f'{escala} proyectos, {vista}: {metrica} {anterior} -> {actual}')
+            if regresiones:
+                raise CommandError(f'{len(regresiones)} regresiones respecto a {options["base"]}')
+            self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la base'))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from seguimiento import reportes
+
+
+class Command(BaseCommand):
+    help = 'Genera los reportes pendientes (alternativa a los hilos del proceso web)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', 
+            help='Continúa esperando nuevos trabajos')
+        parser.add_argument('--intervalo', type=int, default=5, 
+            help='Segundos entre revisiones de la cola en modo continuo')
+        parser.add_argument('--reiniciar', type=int, metavar='MINUTOS', 
+            help='Devuelve a pendiente los trabajos en proceso desde hace más de MINUTOS')
+        parser.add_argument('--limpiar', type=int, metavar='DIAS', 
+            help='Elimina los archivos generados hace más de DIAS')
+
+    def handle(self, *args, **options):
+        if options['reiniciar'] is not None:
+            total = reportes.reiniciar_interrumpidos(options['reiniciar'])
+            self.stdout.write(f'{total} trabajos devueltos a pendiente')
+        if options['limpiar'] is not None:
+            total = reportes.limpiar_archivos(options['limpiar'])
+            self.stdout.write(f'{total} archivos eliminados')
+
+        while True:
+            total = reportes.procesar_pendientes()
+            if total:
+                self.stdout.write(self.style.SUCCESS(f'{total} reportes procesados'))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
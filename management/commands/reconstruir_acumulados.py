@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from seguimiento import acumulados, fragmentos, versiones
+
+
+class Command(BaseCommand):
+    help = 'Verifica y reconstruye los acumulados de avance de tareas, fases y proyectos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proyecto', action='append', dest='proyectos', 
+            help='Id del proyecto a procesar (se puede repetir, por defecto todos)')
+        parser.add_argument('--verificar', action='store_true', 
+            help='Únicamente verifica, sin modificar los acumulados')
+
+    def handle(self, *args, **options):
+        proyectos = options['proyectos']
+        diferencias = acumulados.verificar(proyectos)
+        for modelo, obj_id, campo, almacenado, esperado in diferencias:
+            self.stdout.write(f'{modelo} {obj_id}: {campo} = {almacenado} (esperado {esperado})')
+
+        if options['verificar']:
+            if diferencias:
+                raise CommandError(f'{len(diferencias)} acumulados con diferencias')
+            self.stdout.write(self.style.SUCCESS('Acumulados correctos'))
+            return
+
+        total = acumulados.reconstruir(proyectos)
+        if diferencias:
+            # los valores mostrados cambiaron: se invalidan las respuestas en cache
+            if proyectos:
+                versiones.incrementar(*proyectos)
+            else:
+                versiones.incrementar(id__isnull=False)
+            fragmentos.invalidar_todo()
+        restantes = acumulados.verificar(proyectos)
+        if restantes:
+            raise CommandError(f'{len(restantes)} acumulados con diferencias luego de reconstruir')
+        self.stdout.write(self.style.SUCCESS(f'{total} registros reconstruidos ({len(diferencias)} diferencias corregidas)'))
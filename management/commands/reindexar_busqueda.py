@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from seguimiento import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de proyectos, fases, tareas, actividades y comentarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proyecto', action='append', dest='proyectos', 
+            help='Id del proyecto a procesar (se puede repetir, por defecto todos)')
+
+    def handle(self, *args, **options):
+        total = busqueda.reindexar(options['proyectos'])
+        self.stdout.write(self.style.SUCCESS(f'{total} documentos indexados'))
@@ -0,0 +1,104 @@
+'''
+    Actualización masiva de actividades (avance, responsable y resolución).
+
+    Todos los cambios se validan antes de aplicar cualquiera; luego se guardan con
+    bulk_update y su historial con un solo bulk_create, dentro de una transacción.
+    Como bulk_update no emite señales, los acumulados de las tareas afectadas y el
+    índice de búsqueda se actualizan explícitamente.
+'''
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from simple_history.utils import bulk_update_with_history
+
+from . import acumulados, busqueda, fragmentos, versiones
+from .models import Proyecto_Actividad, Proyecto_Usuario
+from .visibilidad import filtro_visible
+
+CAMPOS_MASIVOS = ('finalizado', 'responsable', 'resolucion')
+LOTE_MASIVO = 500
+
+
+def _validar_cambio(cambio):
+    '''
+        (id, valores) de un cambio, o lanza ValueError
+    '''
+    if not isinstance(cambio, dict):
+        raise ValueError(_('Formato no válido'))
+    try:
+        actividad_id = uuid.UUID(str(cambio.get('id')))
+    except ValueError:
+        raise ValueError(_('Id no válido'))
+
+    valores = {campo: cambio[campo] for campo in CAMPOS_MASIVOS if campo in cambio}
+    if not valores:
+        raise ValueError(_('Sin cambios'))
+    if 'finalizado' in valores:
+        finalizado = valores['finalizado']
+        if isinstance(finalizado, bool) or not isinstance(finalizado, int) or not 0 <= finalizado <= 100:
+            raise ValueError(_('El avance debe ser un entero de 0 a 100'))
+    if 'resolucion' in valores and not isinstance(valores['resolucion'], str):
+        raise ValueError(_('La resolución debe ser texto'))
+    return actividad_id, valores
+
+def actualizar_actividades(cambios, usuario):
+    '''
+        cambios: lista de {id, finalizado?, responsable?, resolucion?}.
+        Devuelve (cantidad actualizada, errores); si hay errores no se aplica ningún cambio.
+        errores es una lista de {'id', 'error'}.
+    '''
+    errores, validos = [], {}
+    for cambio in cambios:
+        try:
+            actividad_id, valores = _validar_cambio(cambio)
+        except ValueError as ex:
+            errores.append({'id': cambio.get('id') if isinstance(cambio, dict) else None, 'error': str(ex)})
+            continue
+        validos.setdefault(actividad_id, {}).update(valores)
+
+    actividades = Proyecto_Actividad.objects.select_related('tarea', 'proyecto__estado')\
+        .filter(filtro_visible(usuario, 'proyecto')).in_bulk(list(validos))
+
+    proyectos = {actividad.proyecto_id: actividad.proyecto for actividad in actividades.values()}
+    asignados = set(Proyecto_Usuario.objects.filter(proyecto_id__in=list(proyectos))\
+        .values_list('proyecto_id', 'usuario_id'))
+    asignados = {(proyecto_id, str(usuario_id)) for proyecto_id, usuario_id in asignados}
+    modificables = {proyecto_id: proyecto.get_modificable() for proyecto_id, proyecto in proyectos.items()}
+
+    for actividad_id, valores in validos.items():
+        actividad = actividades.get(actividad_id)
+        if actividad is None:
+            errores.append({'id': str(actividad_id), 'error': _('Actividad no encontrada')})
+            continue
+        proyecto_id = actividad.proyecto_id
+        if not modificables[proyecto_id]:
+            errores.append({'id': str(actividad_id), 'error': _('El proyecto no permite modificaciones')})
+            continue
+        responsable = valores.get('responsable')
+        if responsable is not None and (proyecto_id, str(responsable)) not in asignados:
+            errores.append({'id': str(actividad_id), 'error': _('El responsable no está asignado al proyecto')})
+    if errores:
+        return 0, errores
+
+    ahora = timezone.now()
+    campos = set()
+    for actividad_id, valores in validos.items():
+        actividad = actividades[actividad_id]
+        for campo, valor in valores.items():
+            setattr(actividad, 'responsable_id' if campo == 'responsable' else campo, valor)
+            campos.add(campo)
+        actividad.actualizacion = ahora
+
+    modificadas = [actividades[actividad_id] for actividad_id in validos]
+    with transaction.atomic():
+        bulk_update_with_history(modificadas, Proyecto_Actividad, sorted(campos) + ['actualizacion'],
+            batch_size=LOTE_MASIVO, default_user=usuario, default_date=ahora)
+        for tarea_id in {actividad.tarea_id for actividad in modificadas}:
+            acumulados.actualizar_tarea(tarea_id)
+        if 'resolucion' in campos:
+            busqueda.indexar_lote('A', modificadas)
+        versiones.incrementar(*{actividad.proyecto_id for actividad in modificadas})
+        fragmentos.invalidar(*{actividad.tarea.fase_id for actividad in modificadas})
+    return len(modificadas), []
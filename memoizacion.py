@@ -0,0 +1,95 @@
+'''
+    Caches para valores que se consultan repetidamente al construir una página:
+    - ConfiguracionCache: valores de Configuracion por proceso, con tiempo de expiración.
+    - memo_solicitud: valores calculados una sola vez por solicitud (requiere CacheSolicitudMiddleware).
+'''
+import time
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+
+from usuarios.personal_views import Configuracion
+
+_solicitud = ContextVar('seguimiento_memo_solicitud', default=None)
+
+
+class ConfiguracionCache:
+    '''
+        Misma interfaz de Configuracion (get_value) con cache por proceso.
+        SEGUIMIENTO_CONFIGURACION_TTL (segundos, 300 por defecto) define la vigencia de cada valor.
+    '''
+    def __init__(self, ttl=None):
+        self.configuracion = Configuracion()
+        self.ttl = ttl
+        self._valores = {}
+        self._lock = Lock()
+
+    def get_ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'SEGUIMIENTO_CONFIGURACION_TTL', 300)
+
+    def get_value(self, seccion, llave):
+        ahora = time.monotonic()
+        registro = self._valores.get((seccion, llave))
+        if registro and registro[1] > ahora:
+            return registro[0]
+        valor = self.configuracion.get_value(seccion, llave)
+        with self._lock:
+            self._valores[(seccion, llave)] = (valor, ahora + self.get_ttl())
+        return valor
+
+    def invalidar(self, seccion=None, llave=None):
+        '''
+            Descarta un valor, una sección completa o (sin argumentos) todo el cache
+        '''
+        with self._lock:
+            if seccion is None:
+                self._valores.clear()
+            else:
+                for clave in [c for c in self._valores if c[0]==seccion and llave in (None, c[1])]:
+                    del self._valores[clave]
+
+
+def memo_solicitud(llave, calcular):
+    '''
+        Devuelve el valor memorizado para la solicitud actual o lo calcula.
+        Fuera de una solicitud (o sin el middleware) siempre calcula.
+    '''
+    memo = _solicitud.get()
+    if memo is None:
+        return calcular()
+    if llave not in memo:
+        memo[llave] = calcular()
+    return memo[llave]
+
+def invalidar_solicitud(llave=None, espacio=None):
+    '''
+        Descarta una llave, todas las llaves de un espacio (primer elemento de la tupla) o todo
+    '''
+    memo = _solicitud.get()
+    if memo is None:
+        return
+    if llave is not None:
+        memo.pop(llave, None)
+    elif espacio is not None:
+        for clave in [c for c in memo if isinstance(c, tuple) and c[0]==espacio]:
+            del memo[clave]
+    else:
+        memo.clear()
+
+
+class CacheSolicitudMiddleware:
+    '''
+        Habilita memo_solicitud durante cada solicitud
+    '''
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _solicitud.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _solicitud.reset(token)
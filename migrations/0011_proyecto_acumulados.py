@@ -0,0 +1,111 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, Q
+
+CAMPOS_APORTE = ('acum_complejidad', 'acum_completado', 'acum_pendientes')
+
+
+def calcular_acumulados(apps, schema_editor):
+    '''
+        Acumulados iniciales con una consulta agrupada por actividades. Se mantiene aquí
+        (y no en acumulados.py) para que la migración no dependa del código actual.
+        Las tareas sin actividades no aportan: conservan los valores por defecto (0).
+    '''
+    Proyecto            = apps.get_model('seguimiento', 'Proyecto')
+    Proyecto_Fase       = apps.get_model('seguimiento', 'Proyecto_Fase')
+    Proyecto_Tarea      = apps.get_model('seguimiento', 'Proyecto_Tarea')
+    Proyecto_Actividad  = apps.get_model('seguimiento', 'Proyecto_Actividad')
+
+    resumenes = Proyecto_Actividad.objects.order_by().values('tarea_id').annotate(
+        cantidad    = Count('id'),
+        suma        = Sum('finalizado'),
+        pendientes  = Count('id', filter=Q(finalizado__lt=100)),
+    )
+    resumenes = {resumen['tarea_id']: resumen for resumen in resumenes}
+    fase_proyecto = dict(Proyecto_Fase.objects.values_list('id', 'proyecto_id'))
+
+    tareas, fases, proyectos = [], {}, {}
+    for tarea in Proyecto_Tarea.objects.values('id', 'complejidad', 'fase_id').iterator():
+        resumen = resumenes.get(tarea['id'])
+        if resumen is None:
+            continue
+        suma    = resumen['suma'] or 0
+        aporte  = (tarea['complejidad'], tarea['complejidad'] * suma / resumen['cantidad'], resumen['pendientes'])
+        tareas.append(Proyecto_Tarea(id=tarea['id'], acum_actividades=resumen['cantidad'], acum_finalizado=suma,
+            **dict(zip(CAMPOS_APORTE, aporte))))
+        for destino in (fases.setdefault(tarea['fase_id'], [0, 0.0, 0]),
+                proyectos.setdefault(fase_proyecto[tarea['fase_id']], [0, 0.0, 0])):
+            for posicion, valor in enumerate(aporte):
+                destino[posicion] += valor
+
+    Proyecto_Tarea.objects.bulk_update(tareas, ('acum_actividades', 'acum_finalizado') + CAMPOS_APORTE, batch_size=500)
+    for modelo, acumulados in ((Proyecto_Fase, fases), (Proyecto, proyectos)):
+        modelo.objects.bulk_update([modelo(id=obj_id, **dict(zip(CAMPOS_APORTE, valores)))
+            for obj_id, valores in acumulados.items()], CAMPOS_APORTE, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0010_historicalproyecto_etiqueta_proyecto_etiqueta_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='acum_complejidad',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Complejidad acumulada'),
+        ),
+        migrations.AddField(
+            model_name='proyecto',
+            name='acum_completado',
+            field=models.FloatField(default=0, editable=False, verbose_name='Completado acumulado'),
+        ),
+        migrations.AddField(
+            model_name='proyecto',
+            name='acum_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Actividades pendientes'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_fase',
+            name='acum_complejidad',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Complejidad acumulada'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_fase',
+            name='acum_completado',
+            field=models.FloatField(default=0, editable=False, verbose_name='Completado acumulado'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_fase',
+            name='acum_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Actividades pendientes'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_tarea',
+            name='acum_actividades',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Actividades'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_tarea',
+            name='acum_finalizado',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Suma de avance'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_tarea',
+            name='acum_complejidad',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Complejidad acumulada'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_tarea',
+            name='acum_completado',
+            field=models.FloatField(default=0, editable=False, verbose_name='Completado acumulado'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_tarea',
+            name='acum_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Actividades pendientes'),
+        ),
+        migrations.RunPython(calcular_acumulados, migrations.RunPython.noop),
+    ]
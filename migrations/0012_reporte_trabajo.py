@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('seguimiento', '0011_proyecto_acumulados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reporte_Trabajo',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('A', 'Avances'), ('C', 'Actividades')], max_length=1, verbose_name='Tipo')),
+                ('estado', models.CharField(choices=[('P', 'Pendiente'), ('E', 'En proceso'), ('F', 'Finalizado'), ('X', 'Error')], default='P', max_length=1, verbose_name='Estado')),
+                ('fini', models.DateField(blank=True, null=True, verbose_name='Fecha Inicio')),
+                ('ffin', models.DateField(blank=True, null=True, verbose_name='Fecha Fin')),
+                ('version', models.CharField(blank=True, max_length=40, verbose_name='Versión de datos')),
+                ('archivo', models.CharField(blank=True, max_length=80, verbose_name='Archivo')),
+                ('nombre', models.CharField(blank=True, max_length=150, verbose_name='Nombre')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('creacion', models.DateTimeField(auto_now_add=True, verbose_name='Creación')),
+                ('finalizacion', models.DateTimeField(blank=True, null=True, verbose_name='Finalización')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='seguimiento.proyecto', verbose_name='Proyecto')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'creacion'], name='idx_rt_estado_creacion')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('seguimiento', '0012_reporte_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='proyecto_usuario',
+            index=models.Index(fields=['usuario', 'proyecto'], name='idx_pu_usuario_proyecto'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def asignar_objetivos(apps, schema_editor):
+    '''
+        obj_uuid y proyecto de los comentarios existentes (un lote por tipo)
+    '''
+    Comentario  = apps.get_model('seguimiento', 'Comentario')
+    rutas = {
+        'P': (apps.get_model('seguimiento', 'Proyecto'), 'id'),
+        'F': (apps.get_model('seguimiento', 'Proyecto_Fase'), 'proyecto_id'),
+        'T': (apps.get_model('seguimiento', 'Proyecto_Tarea'), 'fase__proyecto_id'),
+        'A': (apps.get_model('seguimiento', 'Proyecto_Actividad'), 'tarea__fase__proyecto_id'),
+    }
+    comentarios = []
+    for comentario in Comentario.objects.only('id', 'tipo', 'obj_id').iterator():
+        try:
+            comentario.obj_uuid = uuid.UUID(comentario.obj_id)
+        except (TypeError, ValueError):
+            continue
+        comentarios.append(comentario)
+
+    for tipo, (modelo, ruta) in rutas.items():
+        grupo = [comentario for comentario in comentarios if comentario.tipo == tipo]
+        ids = list({comentario.obj_uuid for comentario in grupo})
+        proyectos = {}
+        for inicio in range(0, len(ids), 500):
+            proyectos.update(modelo.objects.filter(id__in=ids[inicio:inicio+500]).values_list('id', ruta))
+        for comentario in grupo:
+            comentario.proyecto_id = proyectos.get(comentario.obj_uuid)
+
+    Comentario.objects.bulk_update(comentarios, ['obj_uuid', 'proyecto'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0013_proyecto_usuario_idx_pu_usuario_proyecto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comentario',
+            name='obj_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, verbose_name='Objeto'),
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='proyecto',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='seguimiento.proyecto', verbose_name='Proyecto'),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['tipo', 'obj_uuid'], name='idx_co_tipo_objeto'),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['proyecto', '-creacion'], name='idx_co_proyecto_creacion'),
+        ),
+        migrations.RunPython(asignar_objetivos, migrations.RunPython.noop),
+    ]
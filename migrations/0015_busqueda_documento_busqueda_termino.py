@@ -0,0 +1,63 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:05
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def crear_indice_fts(apps, schema_editor):
+    '''
+        Índice GIN sobre el tsvector de busqueda.vector_busqueda (únicamente PostgreSQL)
+    '''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex
+    from seguimiento.busqueda import vector_busqueda
+    Busqueda_Documento = apps.get_model('seguimiento', 'Busqueda_Documento')
+    schema_editor.add_index(Busqueda_Documento, GinIndex(vector_busqueda(), name='idx_bd_fts'))
+
+def eliminar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS idx_bd_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0014_comentario_proyecto_obj_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Busqueda_Documento',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('P', 'Proyecto'), ('F', 'Fase'), ('T', 'Tarea'), ('A', 'Actividad'), ('C', 'Comentario')], max_length=1, verbose_name='Tipo')),
+                ('obj_uuid', models.UUIDField(verbose_name='Objeto')),
+                ('titulo', models.CharField(blank=True, max_length=180, verbose_name='Título')),
+                ('titulo_normal', models.CharField(blank=True, max_length=180, verbose_name='Título normalizado')),
+                ('texto_normal', models.TextField(blank=True, verbose_name='Texto normalizado')),
+                ('actualizacion', models.DateTimeField(auto_now=True, verbose_name='Actualización')),
+                ('fase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='seguimiento.proyecto_fase', verbose_name='Fase')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='seguimiento.proyecto', verbose_name='Proyecto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'obj_uuid'), name='unq_bd_tipo_objeto')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Busqueda_Termino',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('termino', models.CharField(max_length=60, verbose_name='Término')),
+                ('peso', models.FloatField(default=1, verbose_name='Peso')),
+                ('documento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='seguimiento.busqueda_documento', verbose_name='Documento')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['termino', 'documento'], name='idx_bt_termino_documento')],
+                'constraints': [models.UniqueConstraint(fields=('documento', 'termino'), name='unq_bt_documento_termino')],
+            },
+        ),
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0015_busqueda_documento_busqueda_termino'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión de datos'),
+        ),
+        migrations.AddField(
+            model_name='proyecto',
+            name='version_fecha',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Último cambio'),
+        ),
+    ]
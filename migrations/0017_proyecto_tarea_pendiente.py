@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:20
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def marcar_pendientes(apps, schema_editor):
+    '''
+        El campo se agrega como pendiente: se desmarcan las tareas con actividades, todas finalizadas.
+        Se mantiene aquí (y no en acumulados.py) para que la migración no dependa del código actual.
+    '''
+    Proyecto_Tarea      = apps.get_model('seguimiento', 'Proyecto_Tarea')
+    Proyecto_Actividad  = apps.get_model('seguimiento', 'Proyecto_Actividad')
+    actividades = Proyecto_Actividad.objects.filter(tarea=OuterRef('pk'))
+    Proyecto_Tarea.objects.filter(Exists(actividades)).exclude(Exists(actividades.filter(finalizado__lt=100)))\
+        .update(pendiente=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0016_proyecto_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto_tarea',
+            name='pendiente',
+            field=models.BooleanField(default=True, editable=False, help_text='Sin actividades o con actividades sin finalizar', verbose_name='Pendiente'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_tarea',
+            index=models.Index(fields=['pendiente', '-prioridad', 'creacion'], name='idx_pt_pendiente_prioridad'),
+        ),
+        migrations.RunPython(marcar_pendientes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0017_proyecto_tarea_pendiente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='proyecto_actividad',
+            index=models.Index(fields=['tarea', 'finalizado', 'creacion'], name='idx_pa_tarea_finalizado'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_actividad',
+            index=models.Index(fields=['responsable', 'finalizado'], name='idx_pa_responsable_finalizado'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_actividad',
+            index=models.Index(fields=['creacion'], name='idx_pa_creacion'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_actividad',
+            index=models.Index(condition=models.Q(('finalizado__lt', 100)), fields=['responsable', 'tarea'], name='idx_pa_pendiente_responsable'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_fase',
+            index=models.Index(fields=['proyecto', 'descripcion'], name='idx_pf_proyecto_descripcion'),
+        ),
+    ]
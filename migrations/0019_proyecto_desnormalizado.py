@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def asignar_proyecto(apps, schema_editor):
+    Proyecto_Fase = apps.get_model('seguimiento', 'Proyecto_Fase')
+    Proyecto_Tarea = apps.get_model('seguimiento', 'Proyecto_Tarea')
+    Proyecto_Actividad = apps.get_model('seguimiento', 'Proyecto_Actividad')
+    Proyecto_Tarea.objects.update(proyecto_id=Subquery(
+        Proyecto_Fase.objects.filter(id=OuterRef('fase_id')).values('proyecto_id')[:1]))
+    Proyecto_Actividad.objects.update(proyecto_id=Subquery(
+        Proyecto_Tarea.objects.filter(id=OuterRef('tarea_id')).values('proyecto_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0018_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto_tarea',
+            name='proyecto',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Proyecto de la fase (se asigna al guardar)', null=True, on_delete=django.db.models.deletion.RESTRICT, to='seguimiento.proyecto', verbose_name='Proyecto'),
+        ),
+        migrations.AddField(
+            model_name='proyecto_actividad',
+            name='proyecto',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Proyecto de la tarea (se asigna al guardar)', null=True, on_delete=django.db.models.deletion.RESTRICT, to='seguimiento.proyecto', verbose_name='Proyecto'),
+        ),
+        migrations.RunPython(asignar_proyecto, migrations.RunPython.noop),
+    ]
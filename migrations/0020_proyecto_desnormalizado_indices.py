@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # separada de 0019: en PostgreSQL no se puede alterar la tabla con verificaciones
+    # de llaves foráneas pendientes en la misma transacción que la asignación
+
+    dependencies = [
+        ('seguimiento', '0019_proyecto_desnormalizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='proyecto_tarea',
+            name='proyecto',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Proyecto de la fase (se asigna al guardar)', on_delete=django.db.models.deletion.RESTRICT, to='seguimiento.proyecto', verbose_name='Proyecto'),
+        ),
+        migrations.AlterField(
+            model_name='proyecto_actividad',
+            name='proyecto',
+            field=models.ForeignKey(db_index=False, editable=False, help_text='Proyecto de la tarea (se asigna al guardar)', on_delete=django.db.models.deletion.RESTRICT, to='seguimiento.proyecto', verbose_name='Proyecto'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_tarea',
+            index=models.Index(fields=['proyecto', '-prioridad'], name='idx_pt_proyecto_prioridad'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_actividad',
+            index=models.Index(fields=['proyecto', 'finalizado'], name='idx_pa_proyecto_finalizado'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto_actividad',
+            index=models.Index(fields=['proyecto', 'creacion'], name='idx_pa_proyecto_creacion'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def asignar_inicio(apps, schema_editor):
+    # los trabajos en proceso antes de la migración se cuentan desde su creación
+    Reporte_Trabajo = apps.get_model('seguimiento', 'Reporte_Trabajo')
+    Reporte_Trabajo.objects.filter(estado='E').update(inicio=F('creacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0020_proyecto_desnormalizado_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporte_trabajo',
+            name='inicio',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Inicio'),
+        ),
+        migrations.RunPython(asignar_inicio, migrations.RunPython.noop),
+    ]
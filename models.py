@@ -1,13 +1,11 @@
 import uuid
 from datetime import date
-from functools import reduce
-from operator import add
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Max, Sum, Avg, F
+from django.db import models, transaction
+from django.db.models import Max, Sum, Avg, F, Q
 from django.db.models.constraints import UniqueConstraint
 from django.utils.translation import gettext as _
 from django.urls import reverse_lazy
@@ -15,9 +13,10 @@ from django.urls import reverse_lazy
 from django_ckeditor_5.fields import CKEditor5Field
 from simple_history.models import HistoricalRecords
 
-from usuarios.personal_views import Configuracion
+from .memoizacion import ConfiguracionCache, memo_solicitud
+from .texto import texto_plano
 
-conf = Configuracion()
+conf = ConfiguracionCache()
 
 class Estado(models.Model):
     '''
@@ -164,7 +163,14 @@ class Proyecto(models.Model):
     tipo    = models.ForeignKey(Tipo_Proyecto, verbose_name=_('Tipo de proyecto'), blank=True, null=True, on_delete=models.RESTRICT)
     origen  = models.ForeignKey(Origen_Proyecto, verbose_name=_('Origen de proyecto'), blank=True, null=True, on_delete=models.RESTRICT)
     pm      = models.ForeignKey(PM_Proyecto, verbose_name=_('Project Manager'), blank=True, null=True, on_delete=models.RESTRICT)
-    history = HistoricalRecords(excluded_fields=['creacion', 'actualizacion'], user_model=settings.AUTH_USER_MODEL)
+
+    acum_complejidad= models.PositiveIntegerField(_('Complejidad acumulada'), default=0, editable=False)
+    acum_completado = models.FloatField(_('Completado acumulado'), default=0, editable=False)
+    acum_pendientes = models.PositiveIntegerField(_('Actividades pendientes'), default=0, editable=False)
+    version = models.PositiveIntegerField(_('Versión de datos'), default=0, editable=False)
+    version_fecha   = models.DateTimeField(_('Último cambio'), blank=True, null=True, editable=False)
+    history = HistoricalRecords(excluded_fields=['creacion', 'actualizacion', 'acum_complejidad', 'acum_completado', 
+        'acum_pendientes', 'version', 'version_fecha'], user_model=settings.AUTH_USER_MODEL)
 
     class Meta:
         permissions = [
@@ -172,9 +178,18 @@ class Proyecto(models.Model):
             ("reportes", "Permite visualizar las opciones de reportería"),
         ]
 
+    # se actualizan con F() (acumulados.py, versiones.py); una instancia cargada antes no debe sobrescribirlos
+    CAMPOS_DERIVADOS = ('acum_complejidad', 'acum_completado', 'acum_pendientes', 'version', 'version_fecha')
+
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_DERIVADOS]
+        super().save(*args, **kwargs)
+
     def clean(self):
         errores = []
         if (self.finicio >= self.ffin):
@@ -184,15 +199,10 @@ class Proyecto(models.Model):
 
     @property
     def get_porcentaje_completado(self):
-        try:
-            tareas = Proyecto_Tarea.objects.filter(proyecto_actividad__isnull=True)
-            queryset = Proyecto_Tarea.objects.filter(fase__proyecto=self).exclude(id__in=tareas)
-            total_complejidad = queryset.aggregate(total=Sum('complejidad'))['total']
-            total_completado    = reduce(add, [obj.complejidad * obj.finalizado for obj in queryset])
-            porcentaje = total_completado/total_complejidad if total_completado and total_complejidad > 0 else 0.0
-        except Exception as ex:
-            print(f'error en Proyecto.get_porcentaje_completado: {ex}')
-            porcentaje = 0
+        '''
+            Lectura del acumulado (ver acumulados.py), ponderado por la complejidad de las tareas
+        '''
+        porcentaje = self.acum_completado/self.acum_complejidad if self.acum_complejidad > 0 else 0.0
         return round(porcentaje, 4)
 
     def get_tipo_permiso(self):
@@ -207,8 +217,9 @@ class Proyecto(models.Model):
         return f'{self.finicio} - {self.ffin}'
 
     def get_resumen(self, max_length=60):
-        suspensivos = '...' if len(self.descripcion) > max_length else ''
-        resumen = self.descripcion[:max_length].replace("\n", "")
+        descripcion = texto_plano(self.descripcion).strip()
+        suspensivos = '...' if len(descripcion) > max_length else ''
+        resumen = descripcion[:max_length].replace("\n", " ")
         return f'{resumen}{suspensivos}'
 
     def get_have_url(self):
@@ -216,10 +227,21 @@ class Proyecto(models.Model):
             return True
         return False
         
+    @staticmethod
+    def es_modificable(proyecto_id):
+        '''
+            get_modificable a partir del id, sin cargar el proyecto si ya se evaluó en la solicitud
+        '''
+        return memo_solicitud(('modificable', proyecto_id), 
+            lambda: Proyecto.objects.select_related('estado').get(id=proyecto_id).calcular_modificable())
+
     def get_modificable(self):
         '''
             Determina si el estado del proyecto permite modificaciones sobre los objetos dependientes
         '''
+        return memo_solicitud(('modificable', self.id), self.calcular_modificable)
+
+    def calcular_modificable(self):
         try:
             proy_expira = int(conf.get_value('seguimiento', 'proy_expira'))
         except Exception as ex:
@@ -228,6 +250,13 @@ class Proyecto(models.Model):
 
         return not (proy_expira and self.ffin < date.today()) and not self.estado.bloquea
 
+    def clonar(self, nombre, usuario, finicio=None, ffin=None):
+        '''
+            Proyecto nuevo con las fases, tareas, etiquetas, objetivos y metas de este (ver clonacion.py)
+        '''
+        from .clonacion import clonar
+        return clonar(self, nombre, usuario, finicio, ffin)
+
     def get_usuarios(self):
         return list(Proyecto_Usuario.objects.filter(proyecto=self))
 
@@ -243,6 +272,12 @@ class Proyecto(models.Model):
     def url_update(self):
         return reverse_lazy('seguimiento:update_proyecto', kwargs={'pk': self.id})
 
+    def url_clonar(self):
+        return reverse_lazy('seguimiento:clonar_proyecto', kwargs={'pk': self.id})
+
+    def url_arbol(self):
+        return reverse_lazy('seguimiento:arbol_proyecto', kwargs={'pk': self.id})
+
     def url_delete(self):
         if self.proyecto_fase_set.count() > 0:
             return None
@@ -258,6 +293,11 @@ class Proyecto_Usuario(models.Model):
     
     history = HistoricalRecords(excluded_fields=[], user_model=settings.AUTH_USER_MODEL)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'proyecto'], name='idx_pu_usuario_proyecto'),
+        ]
+
     def __str__(self):
         return self.usuario
 
@@ -316,12 +356,12 @@ class Proyecto_Objetivo(models.Model):
         return _('Si') if self.alcanzado else _('No')
 
     def url_update(self):
-        if self.proyecto.get_modificable() and not self.alcanzado:
+        if not self.alcanzado and Proyecto.es_modificable(self.proyecto_id):
             return reverse_lazy('seguimiento:update_proyectoobjetivo', kwargs={'pk': self.id})
         return None
 
     def url_delete(self):
-        if self.proyecto.get_modificable() and not self.alcanzado:
+        if not self.alcanzado and Proyecto.es_modificable(self.proyecto_id):
             return reverse_lazy('seguimiento:delete_proyectoobjetivo', kwargs={'pk': self.id})
         return None
 
@@ -346,12 +386,12 @@ class Proyecto_Meta(models.Model):
         return _('Si') if self.alcanzado else _('No')
 
     def url_update(self):
-        if self.proyecto.get_modificable() and not self.alcanzado:
+        if not self.alcanzado and Proyecto.es_modificable(self.proyecto_id):
             return reverse_lazy('seguimiento:update_proyectometa', kwargs={'pk': self.id})
         return None
 
     def url_delete(self):
-        if self.proyecto.get_modificable() and not self.alcanzado:
+        if not self.alcanzado and Proyecto.es_modificable(self.proyecto_id):
             return reverse_lazy('seguimiento:delete_proyectometa', kwargs={'pk': self.id})
         return None
 
@@ -367,38 +407,40 @@ class Proyecto_Fase(models.Model):
 
     proyecto= models.ForeignKey(Proyecto, verbose_name=_('Proyecto'), on_delete=models.RESTRICT)
 
-    history = HistoricalRecords(excluded_fields=['correlativo', 'creacion'], user_model=settings.AUTH_USER_MODEL)
+    acum_complejidad= models.PositiveIntegerField(_('Complejidad acumulada'), default=0, editable=False)
+    acum_completado = models.FloatField(_('Completado acumulado'), default=0, editable=False)
+    acum_pendientes = models.PositiveIntegerField(_('Actividades pendientes'), default=0, editable=False)
+
+    history = HistoricalRecords(excluded_fields=['correlativo', 'creacion', 'acum_complejidad', 'acum_completado', 
+        'acum_pendientes'], user_model=settings.AUTH_USER_MODEL)
     
     class Meta:
         constraints = [
             UniqueConstraint(fields=['correlativo', 'proyecto'], name='unq_pf_correlativo_proyecto'),
             UniqueConstraint(fields=['descripcion', 'proyecto'], name='unq_pf_descripcion_proyecto'),
         ]
+        indexes = [
+            models.Index(fields=['proyecto', 'descripcion'], name='idx_pf_proyecto_descripcion'),
+        ]
 
     def __str__(self, max_length=60):
         return f'{self.descripcion}'
 
     @property
     def get_porcentaje_completado(self):
-        try:
-            tareas = Proyecto_Tarea.objects.filter(proyecto_actividad__isnull=True)
-            queryset = Proyecto_Tarea.objects.filter(fase=self).exclude(id__in=tareas)
-
-            total_complejidad   = queryset.aggregate(total=Sum('complejidad'))['total']
-            total_completado    = reduce(add, [obj.complejidad * obj.finalizado for obj in queryset])
-            porcentaje = total_completado/total_complejidad if total_completado and total_complejidad > 0 else 0.0
-        except Exception as ex:
-            print(f'error en Proyecto_Fase.get_porcentaje_completado: {ex}')
-            porcentaje = 0
+        '''
+            Lectura del acumulado (ver acumulados.py), ponderado por la complejidad de las tareas
+        '''
+        porcentaje = self.acum_completado/self.acum_complejidad if self.acum_complejidad > 0 else 0.0
         return round(porcentaje, 4)
 
     def url_update(self):
-        if self.proyecto.get_modificable():
+        if Proyecto.es_modificable(self.proyecto_id):
             return reverse_lazy('seguimiento:update_proyectofase', kwargs={'pk': self.id})
         return None
 
     def url_delete(self):
-        if self.proyecto.get_modificable() and Proyecto_Tarea.objects.filter(fase=self).count()==0:
+        if Proyecto.es_modificable(self.proyecto_id) and Proyecto_Tarea.objects.filter(fase=self).count()==0:
             return reverse_lazy('seguimiento:delete_proyectofase', kwargs={'pk': self.id})
         return None
 
@@ -421,18 +463,41 @@ class Proyecto_Tarea(models.Model):
 
     fase    = models.ForeignKey(Proyecto_Fase, verbose_name=_('Fase'), on_delete=models.RESTRICT)
     etiqueta= models.ManyToManyField(Proyecto_Etiqueta, verbose_name=_('etiqueta'), blank=True)
+    proyecto= models.ForeignKey(Proyecto, verbose_name=_('Proyecto'), editable=False, db_index=False, 
+        on_delete=models.RESTRICT, help_text=_('Proyecto de la fase (se asigna al guardar)'))
 
-    history = HistoricalRecords(excluded_fields=['creacion', 'actualizacion'], user_model=settings.AUTH_USER_MODEL)
+    acum_actividades= models.PositiveIntegerField(_('Actividades'), default=0, editable=False)
+    acum_finalizado = models.PositiveIntegerField(_('Suma de avance'), default=0, editable=False)
+    acum_complejidad= models.PositiveIntegerField(_('Complejidad acumulada'), default=0, editable=False)
+    acum_completado = models.FloatField(_('Completado acumulado'), default=0, editable=False)
+    acum_pendientes = models.PositiveIntegerField(_('Actividades pendientes'), default=0, editable=False)
+    pendiente   = models.BooleanField(_('Pendiente'), default=True, editable=False, 
+        help_text=_('Sin actividades o con actividades sin finalizar'))
+
+    history = HistoricalRecords(excluded_fields=['creacion', 'actualizacion', 'acum_actividades', 'acum_finalizado', 
+        'acum_complejidad', 'acum_completado', 'acum_pendientes', 'pendiente', 'proyecto'], user_model=settings.AUTH_USER_MODEL)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pendiente', '-prioridad', 'creacion'], name='idx_pt_pendiente_prioridad'),
+            models.Index(fields=['proyecto', '-prioridad'], name='idx_pt_proyecto_prioridad'),
+        ]
 
     def __str__(self, max_length=60):
         return f'{self.descripcion}'
+
+    def save(self, *args, **kwargs):
+        # los acumulados de fase y proyecto se actualizan (signals.py) dentro de la misma transacción;
+        # al cambiar de fase el proyecto de las actividades también se actualiza ahí
+        self.proyecto_id = self.fase.proyecto_id
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def url_proyecto(self):
-        return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.fase.proyecto.id})
+        return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.proyecto_id})
 
     def url_detail(self):
-        fase = self.fase
-        return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': fase.proyecto.id, 'faseactiva': fase.id})
+        return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.proyecto_id, 'faseactiva': self.fase_id})
         
     def url_update(self):
         if self.fase.proyecto.get_modificable():
@@ -440,12 +505,12 @@ class Proyecto_Tarea(models.Model):
         return None
 
     def url_delete(self):
-        if Proyecto_Actividad.objects.filter(tarea=self).count()==0 and self.fase.proyecto.get_modificable():
+        if self.acum_actividades==0 and self.fase.proyecto.get_modificable():
             return reverse_lazy('seguimiento:delete_proyectotarea', kwargs={'pk': self.id})
         return None
 
     def get_cantidad_actividades(self):
-        return Proyecto_Actividad.objects.filter(tarea=self).count()
+        return self.acum_actividades
 
     def get_actividades(self):
         return Proyecto_Actividad.objects.filter(tarea=self).order_by('finalizado', 'creacion')
@@ -461,9 +526,9 @@ class Proyecto_Tarea(models.Model):
 
     @property
     def finalizado(self):
-        if Proyecto_Actividad.objects.filter(tarea=self).count()==0:
+        if self.acum_actividades==0:
             return 0
-        return Proyecto_Actividad.objects.filter(tarea=self).aggregate(Avg('finalizado'))['finalizado__avg']
+        return self.acum_finalizado/self.acum_actividades
 
     @property
     def get_prioridad(self):
@@ -483,12 +548,31 @@ class Proyecto_Actividad(models.Model):
 
     responsable = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name=_('Responsable'), null=True, on_delete=models.RESTRICT)
     tarea       = models.ForeignKey(Proyecto_Tarea, verbose_name=_('Tarea'), on_delete=models.RESTRICT)
+    proyecto    = models.ForeignKey(Proyecto, verbose_name=_('Proyecto'), editable=False, db_index=False, 
+        on_delete=models.RESTRICT, help_text=_('Proyecto de la tarea (se asigna al guardar)'))
     
-    history = HistoricalRecords(excluded_fields=['actualizacion'], user_model=settings.AUTH_USER_MODEL)
+    history = HistoricalRecords(excluded_fields=['actualizacion', 'proyecto'], user_model=settings.AUTH_USER_MODEL)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tarea', 'finalizado', 'creacion'], name='idx_pa_tarea_finalizado'),
+            models.Index(fields=['responsable', 'finalizado'], name='idx_pa_responsable_finalizado'),
+            models.Index(fields=['creacion'], name='idx_pa_creacion'),
+            # parcial: únicamente en motores que lo soportan (PostgreSQL, SQLite)
+            models.Index(fields=['responsable', 'tarea'], condition=Q(finalizado__lt=100), name='idx_pa_pendiente_responsable'),
+            models.Index(fields=['proyecto', 'finalizado'], name='idx_pa_proyecto_finalizado'),
+            models.Index(fields=['proyecto', 'creacion'], name='idx_pa_proyecto_creacion'),
+        ]
 
     def __str__(self, max_length=60):
         return f'{self.descripcion}'
 
+    def save(self, *args, **kwargs):
+        # los acumulados de tarea, fase y proyecto se actualizan (signals.py) dentro de la misma transacción
+        self.proyecto_id = self.tarea.proyecto_id
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def get_full_name(self):
         return f'{self.tarea.fase} > {self.tarea}'
 
@@ -504,16 +588,16 @@ class Proyecto_Actividad(models.Model):
 
     def url_detail(self):
         return reverse_lazy('seguimiento:detail_proyecto', 
-            kwargs={'pk': self.tarea.fase.proyecto.id, 'faseactiva': self.tarea.fase.id}
+            kwargs={'pk': self.proyecto_id, 'faseactiva': self.tarea.fase_id}
             )
     
     def url_update(self):
-        if self.tarea.fase.proyecto.get_modificable():
+        if Proyecto.es_modificable(self.proyecto_id):
             return reverse_lazy('seguimiento:update_proyectoactividad', kwargs={'pk': self.id})
         return None
 
     def url_delete(self):
-        if self.tarea.fase.proyecto.get_modificable():
+        if Proyecto.es_modificable(self.proyecto_id):
             return reverse_lazy('seguimiento:delete_proyectoactividad', kwargs={'pk': self.id})
         return None
 
@@ -529,50 +613,228 @@ class Comentario(models.Model):
     creacion= models.DateTimeField(_('Creación'), auto_now_add=True)
     tipo    = models.CharField(_('Tipo'), max_length=1, choices=TIPO_COMENTARIO, default='P')
     obj_id  = models.CharField(_('Objeto'), max_length=36, default='', blank=True)
+    obj_uuid= models.UUIDField(_('Objeto'), blank=True, null=True, editable=False)
 
     usuario    = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name=_('Usuario'), on_delete=models.RESTRICT)
+    proyecto   = models.ForeignKey(Proyecto, verbose_name=_('Proyecto'), blank=True, null=True, editable=False, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tipo', 'obj_uuid'], name='idx_co_tipo_objeto'),
+            models.Index(fields=['proyecto', '-creacion'], name='idx_co_proyecto_creacion'),
+        ]
 
     def __str__(self, max_length=60):
         return f'({ self.get_objeto() }) { self.descripcion }'
 
-    def url_detail(self):
+    def save(self, *args, **kwargs):
+        '''
+            obj_uuid y proyecto se derivan de tipo y obj_id
+        '''
+        self.obj_uuid   = Comentario.convertir_uuid(self.obj_id)
+        self.proyecto_id= Comentario.buscar_proyecto_id(self.tipo, self.obj_uuid)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def convertir_uuid(obj_id):
+        '''
+            UUID del objeto comentado, o None si obj_id está vacío o no es un UUID
+        '''
+        try:
+            return uuid.UUID(str(obj_id)) if obj_id else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def buscar_proyecto_id(tipo, obj_uuid):
+        if obj_uuid is None:
+            return None
+        if tipo == 'P':
+            consulta = Proyecto.objects.filter(id = obj_uuid).values_list('id', flat=True)
+        elif tipo == 'F':
+            consulta = Proyecto_Fase.objects.filter(id = obj_uuid).values_list('proyecto_id', flat=True)
+        elif tipo == 'T':
+            consulta = Proyecto_Tarea.objects.filter(id = obj_uuid).values_list('proyecto_id', flat=True)
+        elif tipo == 'A':
+            consulta = Proyecto_Actividad.objects.filter(id = obj_uuid).values_list('proyecto_id', flat=True)
+        else:
+            return None
+        return consulta.first()
+
+    @staticmethod
+    def resolver_objetos(comentarios):
+        '''
+            Carga los objetos comentados agrupados por tipo (una consulta por tipo presente, con las
+            relaciones necesarias para la url) y asigna en cada comentario objeto, objeto_etiqueta
+            y objeto_url, de forma que get_objeto y url_detail no consultan la base de datos
+        '''
+        destinos = {
+            'P': (Proyecto, ()),
+            'F': (Proyecto_Fase, ()),
+            'T': (Proyecto_Tarea, ()),
+            'A': (Proyecto_Actividad, ('tarea', )),
+        }
+        por_tipo = {}
+        for comentario in comentarios:
+            if comentario.obj_uuid is None and comentario.obj_id:
+                comentario.obj_uuid = Comentario.convertir_uuid(comentario.obj_id)
+            if comentario.tipo in destinos and comentario.obj_uuid:
+                por_tipo.setdefault(comentario.tipo, set()).add(comentario.obj_uuid)
+
+        objetos = {}
+        for tipo, ids in por_tipo.items():
+            modelo, relaciones = destinos[tipo]
+            objetos[tipo] = modelo.objects.select_related(*relaciones).in_bulk(ids)
+
+        for comentario in comentarios:
+            comentario.objeto = objetos.get(comentario.tipo, {}).get(comentario.obj_uuid)
+            comentario.objeto_etiqueta = comentario.calcular_etiqueta()
+            comentario.objeto_url = comentario.calcular_url()
+        return comentarios
+
+    def get_objeto_destino(self):
+        if not hasattr(self, 'objeto'):
+            Comentario.resolver_objetos([self])
+        return self.objeto
+
+    def calcular_etiqueta(self):
+        etiquetas = {'P': _('Proyecto: '), 'F': _('Fase: '), 'T': _('Tarea: '), 'A': _('Actividad: ')}
+        if self.tipo not in etiquetas:
+            return None
+        return etiquetas[self.tipo] + f'{self.objeto}'
+
+    def calcular_url(self):
+        if self.objeto is None:
+            return None
         if self.tipo == 'P':
-            return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.obj_id})
+            return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.objeto.id})
         if self.tipo == 'F':
-            fase = Proyecto_Fase.objects.get(id = self.obj_id)
-            return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': fase.proyecto.id, 'faseactiva': fase.id})
-        if self.tipo == 'T':
-            fase = Proyecto_Tarea.objects.get(id = self.obj_id).fase
-            return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': fase.proyecto.id, 'faseactiva': fase.id})
-        if self.tipo == 'A':
-            fase = Proyecto_Actividad.objects.get(id = self.obj_id).tarea.fase
-            return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': fase.proyecto.id, 'faseactiva': fase.id})
-        return None
+            fase_id = self.objeto.id
+        elif self.tipo == 'T':
+            fase_id = self.objeto.fase_id
+        elif self.tipo == 'A':
+            fase_id = self.objeto.tarea.fase_id
+        else:
+            return None
+        return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.objeto.proyecto_id, 'faseactiva': fase_id})
+
+    def url_detail(self):
+        self.get_objeto_destino()
+        return self.objeto_url
 
     def url_delete(self):
         return reverse_lazy('seguimiento:delete_comentario', kwargs={'pk': self.id})
         
     def get_objeto(self):
-        if self.tipo == 'P':
-            return _('Proyecto: ') + f'{Proyecto.objects.get(id = self.obj_id)}'
-        elif self.tipo == 'F':
-            return _('Fase: ') + f'{Proyecto_Fase.objects.get(id = self.obj_id)}'
-        elif self.tipo == 'T':
-            return _('Tarea: ') + f'{Proyecto_Tarea.objects.get(id = self.obj_id)}'
-        elif self.tipo == 'A':
-            return _('Actividad: ') + f'{Proyecto_Actividad.objects.get(id = self.obj_id)}'
-        else:
-            return None
+        self.get_objeto_destino()
+        return self.objeto_etiqueta
 
     def get_proyecto_id(self):
-        if self.tipo == 'P':
-            return self.obj_id
-        elif self.tipo == 'F':
-            return Proyecto_Fase.objects.get(id = self.obj_id).proyecto_id
-        elif self.tipo == 'T':
-            return Proyecto_Tarea.objects.get(id = self.obj_id).fase__proyecto_id
-        elif self.tipo == 'A':
-            return Proyecto_Actividad.objects.get(id = self.obj_id).tarea__fase__proyecto__id
-        else:
+        if self.proyecto_id:
+            return self.proyecto_id
+        return Comentario.buscar_proyecto_id(self.tipo, Comentario.convertir_uuid(self.obj_id))
+
+class Reporte_Trabajo(models.Model):
+    '''
+        Solicitud de un reporte que se genera en segundo plano (ver reportes.py).
+        archivo es el nombre del archivo generado, compartido por las solicitudes con 
+        el mismo tipo, proyecto, rango de fechas y versión de los datos.
+    '''
+    TIPO_REPORTE = [
+        ('A', _('Avances')),
+        ('C', _('Actividades')),
+    ]
+    ESTADO_TRABAJO = [
+        ('P', _('Pendiente')),
+        ('E', _('En proceso')),
+        ('F', _('Finalizado')),
+        ('X', _('Error')),
+    ]
+    id      = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tipo    = models.CharField(_('Tipo'), max_length=1, choices=TIPO_REPORTE)
+    estado  = models.CharField(_('Estado'), max_length=1, choices=ESTADO_TRABAJO, default='P')
+    fini    = models.DateField(_('Fecha Inicio'), blank=True, null=True)
+    ffin    = models.DateField(_('Fecha Fin'), blank=True, null=True)
+    version = models.CharField(_('Versión de datos'), max_length=40, blank=True)
+    archivo = models.CharField(_('Archivo'), max_length=80, blank=True)
+    nombre  = models.CharField(_('Nombre'), max_length=150, blank=True)
+    error   = models.TextField(_('Error'), blank=True)
+    creacion= models.DateTimeField(_('Creación'), auto_now_add=True)
+    inicio  = models.DateTimeField(_('Inicio'), blank=True, null=True)
+    finalizacion    = models.DateTimeField(_('Finalización'), blank=True, null=True)
+
+    proyecto= models.ForeignKey(Proyecto, verbose_name=_('Proyecto'), on_delete=models.CASCADE)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name=_('Usuario'), on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'creacion'], name='idx_rt_estado_creacion'),
+        ]
+
+    def __str__(self):
+        return f'{self.nombre} ({self.get_estado_display()})'
+
+    def url_estado(self):
+        return reverse_lazy('seguimiento:estado_reportetrabajo', kwargs={'pk': self.id})
+
+    def url_descarga(self):
+        if self.estado != 'F':
             return None
+        return reverse_lazy('seguimiento:descarga_reportetrabajo', kwargs={'pk': self.id})
 
+class Busqueda_Documento(models.Model):
+    '''
+        Texto plano (normalizado, sin acentos) de un objeto buscable, ver busqueda.py
+    '''
+    TIPO_DOCUMENTO = [
+        ('P', _('Proyecto')),
+        ('F', _('Fase')),
+        ('T', _('Tarea')),
+        ('A', _('Actividad')),
+        ('C', _('Comentario')),
+    ]
+    id      = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tipo    = models.CharField(_('Tipo'), max_length=1, choices=TIPO_DOCUMENTO)
+    obj_uuid= models.UUIDField(_('Objeto'))
+    titulo  = models.CharField(_('Título'), max_length=180, blank=True)
+    titulo_normal   = models.CharField(_('Título normalizado'), max_length=180, blank=True)
+    texto_normal    = models.TextField(_('Texto normalizado'), blank=True)
+    actualizacion   = models.DateTimeField(_('Actualización'), auto_now=True)
+
+    proyecto= models.ForeignKey(Proyecto, verbose_name=_('Proyecto'), on_delete=models.CASCADE)
+    fase    = models.ForeignKey(Proyecto_Fase, verbose_name=_('Fase'), blank=True, null=True, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['tipo', 'obj_uuid'], name='unq_bd_tipo_objeto'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_tipo_display()}: {self.titulo}'
+
+    def url_detail(self):
+        if self.tipo == 'P':
+            return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.proyecto_id})
+        if self.tipo == 'C':
+            return reverse_lazy('seguimiento:list_comentario', kwargs={'pk': self.proyecto_id})
+        if self.fase_id:
+            return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.proyecto_id, 'faseactiva': self.fase_id})
+        return reverse_lazy('seguimiento:detail_proyecto', kwargs={'pk': self.proyecto_id})
+
+class Busqueda_Termino(models.Model):
+    '''
+        Índice invertido: términos de cada documento con su peso (frecuencia, el título pesa más)
+    '''
+    id      = models.BigAutoField(primary_key=True)
+    termino = models.CharField(_('Término'), max_length=60)
+    peso    = models.FloatField(_('Peso'), default=1)
+
+    documento   = models.ForeignKey(Busqueda_Documento, verbose_name=_('Documento'), on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['documento', 'termino'], name='unq_bt_documento_termino'),
+        ]
+        indexes = [
+            models.Index(fields=['termino', 'documento'], name='idx_bt_termino_documento'),
+        ]
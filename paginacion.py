@@ -0,0 +1,163 @@
+'''
+    Paginación por llave (keyset) para vistas de lista.
+
+    En lugar de OFFSET se recuerda, en un cursor, los valores del ordenamiento del último
+    (o primer) elemento mostrado y la siguiente página se obtiene con un WHERE sobre esos
+    valores, por lo que cualquier página cuesta lo mismo que la primera. El total se cuenta
+    una sola vez por consulta y se mantiene en cache SEGUIMIENTO_PAGINACION_CONTEO_TTL segundos.
+'''
+import base64, hashlib, json, uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Q
+
+
+def _serializar(valor):
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    if isinstance(valor, (uuid.UUID, Decimal)):
+        return str(valor)
+    raise TypeError(f'{type(valor)} no se puede utilizar en un cursor')
+
+def codificar_cursor(direccion, valores):
+    datos = json.dumps({'d': direccion, 'v': valores}, default=_serializar, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+def campo_orden(modelo, campo):
+    '''
+        Campo del modelo (siguiendo relaciones) de un elemento del ordenamiento
+    '''
+    partes = campo.lstrip('-').split('__')
+    for parte in partes[:-1]:
+        modelo = modelo._meta.get_field(parte).related_model
+    return modelo._meta.get_field(partes[-1])
+
+def decodificar_cursor(cursor, modelo=None, orden=None):
+    '''
+        (direccion, valores) del cursor, o None si no es válido. Con modelo y orden los valores
+        se convierten al tipo de cada campo; un cursor con otra cantidad de valores o con valores
+        que no corresponden a los campos tampoco es válido.
+    '''
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        direccion, valores = datos['d'], datos['v']
+        if direccion not in ('s', 'a') or not isinstance(valores, list):
+            return None
+        if orden is not None:
+            if len(valores) != len(orden):
+                return None
+            valores = [campo_orden(modelo, campo).to_python(valor) for campo, valor in zip(orden, valores)]
+            if None in valores:
+                return None
+        return direccion, valores
+    except Exception:
+        return None
+
+def filtro_posterior(orden, valores):
+    '''
+        Q de los registros que siguen a valores según el ordenamiento indicado
+        (comparación lexicográfica: a > x, o a = x y b > y, ...)
+    '''
+    filtro = Q(pk__in=[])
+    iguales = Q()
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        filtro |= iguales & Q(**{f'{nombre}__{operador}': valor})
+        iguales &= Q(**{nombre: valor})
+    return filtro
+
+def invertir(orden):
+    return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden]
+
+def valores_orden(objeto, orden):
+    valores = []
+    for campo in orden:
+        valor = objeto
+        for parte in campo.lstrip('-').split('__'):
+            valor = getattr(valor, parte)
+        valores.append(valor)
+    return valores
+
+
+class PaginaLlave:
+    def __init__(self, object_list, anterior, siguiente, total):
+        self.object_list    = object_list
+        self.cursor_anterior= anterior
+        self.cursor_siguiente = siguiente
+        self.total          = total
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+
+class PaginacionLlaveMixin:
+    '''
+        Habilita la paginación por llave en una ListView con paginacion_llave = True.
+        Utiliza el ordering de la vista (más 'id' como desempate); los campos del
+        ordenamiento no deben admitir nulos.
+    '''
+    paginacion_llave = False
+    parametro_cursor = 'cursor'
+
+    def get_orden_llave(self):
+        orden = list(self.get_ordering() or [])
+        return orden if 'id' in orden or '-id' in orden else orden + ['id']
+
+    def get_total(self, queryset):
+        try:
+            consulta = str(queryset.query)
+        except EmptyResultSet:
+            return 0
+        llave = 'seguimiento_conteo_' + hashlib.blake2b(consulta.encode(), digest_size=16).hexdigest()
+        total = cache.get(llave)
+        if total is None:
+            total = queryset.count()
+            cache.set(llave, total, getattr(settings, 'SEGUIMIENTO_PAGINACION_CONTEO_TTL', 60))
+        return total
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.paginacion_llave:
+            return super().paginate_queryset(queryset, page_size)
+
+        orden  = self.get_orden_llave()
+        # un cursor inválido (alterado o de otro ordenamiento) muestra la primera página
+        cursor = decodificar_cursor(self.request.GET.get(self.parametro_cursor, ''), queryset.model, orden)
+        total  = self.get_total(queryset)
+
+        direccion = cursor[0] if cursor else 's'
+        if direccion == 'a':
+            filas = list(queryset.filter(filtro_posterior(invertir(orden), cursor[1])).order_by(*invertir(orden))[:page_size+1])
+            hay_mas = len(filas) > page_size
+            filas = filas[:page_size][::-1]
+            anterior, siguiente = hay_mas, True
+        else:
+            if cursor:
+                queryset = queryset.filter(filtro_posterior(orden, cursor[1]))
+            filas = list(queryset.order_by(*orden)[:page_size+1])
+            hay_mas = len(filas) > page_size
+            filas = filas[:page_size]
+            anterior, siguiente = cursor is not None, hay_mas
+
+        pagina = PaginaLlave(filas,
+            codificar_cursor('a', valores_orden(filas[0], orden)) if filas and anterior else None,
+            codificar_cursor('s', valores_orden(filas[-1], orden)) if filas and siguiente else None,
+            total)
+        return (None, pagina, filas, False)
+
+    def get_context_data(self, *args, **kwargs):
+        context = super().get_context_data(*args, **kwargs)
+        if self.paginacion_llave:
+            context['pagina_llave'] = context['page_obj']
+            context['page_obj'] = None
+            parametros = self.request.GET.copy()
+            parametros.pop(self.parametro_cursor, None)
+            context['parametros_llave'] = parametros.urlencode()
+        return context
@@ -0,0 +1,52 @@
+'''
+    Cálculo del avance ponderado por complejidad para conjuntos de tareas, fases o proyectos.
+
+    Cada función ejecuta una sola consulta agrupada (el promedio de las actividades de
+    cada tarea se resuelve como subconsulta), sin importar la cantidad de elementos.
+'''
+from django.db.models import Avg, Sum, F, FloatField, OuterRef, Subquery
+
+from .models import Proyecto_Tarea, Proyecto_Actividad
+
+
+def _promedio_actividades():
+    return Subquery(
+        Proyecto_Actividad.objects.filter(tarea=OuterRef('pk')).order_by().values('tarea')\
+            .annotate(promedio=Avg('finalizado')).values('promedio'),
+        output_field=FloatField(),
+    )
+
+def _ponderado(tareas, agrupar):
+    '''
+        Suma de complejidad * avance por el campo indicado, excluyendo tareas sin actividades
+    '''
+    filas = tareas.annotate(avance=_promedio_actividades()).filter(avance__isnull=False)\
+        .order_by().values(agrupar).annotate(
+            complejidad = Sum('complejidad'),
+            completado  = Sum(F('complejidad') * F('avance'), output_field=FloatField()),
+        )
+    return {
+        fila[agrupar]: round(fila['completado']/fila['complejidad'], 4) if fila['complejidad'] else 0.0
+        for fila in filas
+    }
+
+def avance_tareas(tareas):
+    '''
+        {tarea_id: promedio de avance de sus actividades} para un queryset de tareas.
+        Las tareas sin actividades no se incluyen (su avance es 0).
+    '''
+    filas = Proyecto_Actividad.objects.filter(tarea__in=tareas).order_by().values('tarea_id')\
+        .annotate(promedio=Avg('finalizado'))
+    return {fila['tarea_id']: fila['promedio'] for fila in filas}
+
+def porcentaje_fases(fase_ids):
+    '''
+        {fase_id: porcentaje completado} para las fases indicadas
+    '''
+    return _ponderado(Proyecto_Tarea.objects.filter(fase_id__in=fase_ids), 'fase_id')
+
+def porcentaje_proyectos(proyecto_ids):
+    '''
+        {proyecto_id: porcentaje completado} para los proyectos indicados
+    '''
+    return _ponderado(Proyecto_Tarea.objects.filter(proyecto_id__in=proyecto_ids), 'proyecto_id')
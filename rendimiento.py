@@ -0,0 +1,177 @@
+'''
+    Mediciones de rendimiento de las vistas principales con datos sintéticos (comando medir_rendimiento).
+
+    ejecutar() trabaja sobre las bases de pruebas de Django (test_<NAME>, creadas y migradas
+    como en manage.py test), nunca sobre la base configurada. En cada escala (cantidad de proyectos) se generan los datos (datos_prueba.py) dentro de una
+    transacción que se revierte al finalizar, y cada vista se solicita con el cliente de pruebas
+    de Django como un usuario con permisos (no administrador) asignado a los proyectos medidos.
+    Por vista se registra el tiempo (mediana de las repeticiones), las consultas de la primera
+    solicitud (con el cache de fragmentos vacío) y la memoria máxima reservada (tracemalloc, en
+    una solicitud adicional para no afectar el tiempo). Los reportes se solicitan por formulario,
+    se generan en el mismo proceso y se descargan.
+'''
+import os, shutil, statistics, tempfile, time, tracemalloc
+from contextlib import contextmanager
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.urls import reverse
+from django.utils import timezone
+
+from . import datos_prueba, reportes
+from .models import Proyecto, Proyecto_Fase, Proyecto_Usuario, Reporte_Trabajo
+
+ESCALAS = (1, 10, 50)
+REPETICIONES = 3
+TOLERANCIA = 0.25
+CACHE_MEDICION = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'seguimiento-rendimiento'},
+}
+
+
+def medir(solicitud, repeticiones=REPETICIONES):
+    '''
+        Ejecuta solicitud() (devuelve la respuesta) y mide tiempo, consultas y memoria
+    '''
+    tiempos = []
+    for n in range(repeticiones):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            respuesta = solicitud()
+            tiempos.append(time.perf_counter() - inicio)
+        if n == 0:
+            cantidad, estado = len(consultas), respuesta.status_code
+
+    tracemalloc.start()
+    try:
+        solicitud()
+        memoria = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'estado':       estado,
+        'tiempo_ms':    round(statistics.median(tiempos) * 1000, 2),
+        'tiempo_max_ms':round(max(tiempos) * 1000, 2),
+        'consultas':    cantidad,
+        'memoria_kb':   round(memoria / 1024, 1),
+    }
+
+def _usuario_medicion(proyecto_ids):
+    usuario = get_user_model().objects.create(username=f'rendimiento_{timezone.now():%Y%m%d%H%M%S%f}')
+    usuario.user_permissions.set(Permission.objects.filter(content_type__app_label='seguimiento')\
+        .exclude(codename='proyect_admin'))
+    Proyecto_Usuario.objects.bulk_create([Proyecto_Usuario(proyecto_id=proyecto_id, usuario=usuario)
+        for proyecto_id in proyecto_ids])
+    return usuario
+
+def _reporte(cliente, usuario, tipo, url, datos):
+    '''
+        Solicita el reporte, lo genera (como lo haría procesar_reportes) y lo descarga
+    '''
+    def solicitud():
+        # sin archivos previos, para que cada solicitud genere el reporte
+        directorio = reportes.directorio_reportes()
+        for archivo in os.listdir(directorio):
+            os.remove(os.path.join(directorio, archivo))
+        cliente.post(url, datos)
+        trabajo = Reporte_Trabajo.objects.filter(usuario=usuario, tipo=tipo).order_by('-creacion').first()
+        reportes.procesar_trabajo(trabajo.id)
+        respuesta = cliente.get(reverse('seguimiento:descarga_reportetrabajo', kwargs={'pk': trabajo.id}))
+        b''.join(respuesta.streaming_content)    # al consumirlo el cliente cierra el archivo
+        return respuesta
+    return solicitud
+
+def solicitudes(cliente, usuario, proyecto):
+    '''
+        {nombre: solicitud} de las vistas medidas sobre un proyecto
+    '''
+    fase = Proyecto_Fase.objects.filter(proyecto=proyecto).order_by('correlativo').first()
+    get  = lambda url, **datos: lambda: cliente.get(url, datos)
+    return {
+        'proyecto_detalle':     get(reverse('seguimiento:detail_proyecto', kwargs={'pk': proyecto.id})),
+        'accordion_fase':       get(reverse('seguimiento:accordion_tareaactividad'), obj_id=str(fase.id)),
+        'lista_tareas':         get(reverse('seguimiento:list_proyectotarea')),
+        'lista_actividades':    get(reverse('seguimiento:list_proyectoactividad'), valor='estado:pendiente'),
+        'lista_comentarios':    get(reverse('seguimiento:list_comentario', kwargs={'pk': proyecto.id})),
+        'reporte_avances':      _reporte(cliente, usuario, 'A', reverse('seguimiento:reporte_avance_proyecto'),
+                                    {'proyecto': str(proyecto.id)}),
+        'reporte_actividades':  _reporte(cliente, usuario, 'C', reverse('seguimiento:reporte_actividades_proyecto'),
+                                    {'proyecto': str(proyecto.id), 'fini': proyecto.finicio, 'ffin': date.today()}),
+    }
+
+def medir_escala(proyectos, repeticiones=REPETICIONES, semilla=0, **escala):
+    '''
+        Genera proyectos (con las cantidades de escala), mide las vistas sobre el primero
+        y revierte todos los cambios
+    '''
+    resultado = {}
+    directorio = tempfile.mkdtemp(prefix='seguimiento_rendimiento_')
+    configuracion = override_settings(CACHES=CACHE_MEDICION, SEGUIMIENTO_REPORTES_HILOS=0,
+        SEGUIMIENTO_REPORTES_DIR=directorio, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+    try:
+        with configuracion, transaction.atomic():
+            inicio = time.perf_counter()
+            proyecto_ids, registros = datos_prueba.generar(semilla=semilla, proyectos=proyectos, **escala)
+            resultado['generacion_s'] = round(time.perf_counter() - inicio, 2)
+            resultado['registros'] = registros
+
+            usuario = _usuario_medicion(proyecto_ids)
+            cliente = Client()
+            cliente.force_login(usuario)
+            proyecto = Proyecto.objects.get(id=proyecto_ids[0])
+            resultado['vistas'] = {nombre: medir(solicitud, repeticiones)
+                for nombre, solicitud in solicitudes(cliente, usuario, proyecto).items()}
+            transaction.set_rollback(True)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    return resultado
+
+@contextmanager
+def base_pruebas(keepdb=False, verbosity=0):
+    '''
+        Crea las bases de pruebas y apunta las conexiones a ellas; al salir las elimina
+        (salvo keepdb) y restablece las conexiones
+    '''
+    configuracion = setup_databases(verbosity, interactive=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        teardown_databases(configuracion, verbosity, keepdb=keepdb)
+
+def ejecutar(escalas=ESCALAS, repeticiones=REPETICIONES, semilla=0, keepdb=False, **escala):
+    '''
+        Resumen (serializable como JSON) de las mediciones en cada escala, en las bases de pruebas
+    '''
+    with base_pruebas(keepdb):
+        return {
+            'fecha':        timezone.now().isoformat(),
+            'motor':        connection.vendor,
+            'repeticiones': repeticiones,
+            'escala':       {**datos_prueba.ESCALA, **escala},
+            'escalas':      {str(proyectos): medir_escala(proyectos, repeticiones, semilla, **escala) for proyectos in escalas},
+        }
+
+def comparar(resumen, base, tolerancia=TOLERANCIA):
+    '''
+        Regresiones respecto a la línea base: lista de (escala, vista, métrica, base, actual).
+        Cualquier consulta adicional es una regresión; tiempo y memoria se comparan con tolerancia.
+    '''
+    regresiones = []
+    for escala, medicion in resumen['escalas'].items():
+        vistas_base = base.get('escalas', {}).get(escala, {}).get('vistas', {})
+        for vista, metricas in medicion.get('vistas', {}).items():
+            anterior = vistas_base.get(vista)
+            if anterior is None:
+                continue
+            if metricas['consultas'] > anterior['consultas']:
+                regresiones.append((escala, vista, 'consultas', anterior['consultas'], metricas['consultas']))
+            for metrica in ('tiempo_ms', 'memoria_kb'):
+                if metricas[metrica] > anterior[metrica] * (1 + tolerancia):
+                    regresiones.append((escala, vista, metrica, anterior[metrica], metricas[metrica]))
+    return regresiones
@@ -0,0 +1,434 @@
+'''
+    Reportes XLSX de proyectos y su generación en segundo plano.
+
+    Las vistas registran un Reporte_Trabajo y un hilo del proceso (o el comando
+    procesar_reportes) genera el archivo. Los archivos terminados se guardan en
+    SEGUIMIENTO_REPORTES_DIR con un nombre derivado de (tipo, proyecto, rango de fechas,
+    versión de los datos), por lo que una solicitud sobre datos sin cambios reutiliza
+    el archivo existente sin volver a generarlo.
+'''
+# https://xlsxwriter.readthedocs.io/
+import hashlib, logging, os, tempfile, xlsxwriter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Prefetch, F, Window
+from django.db.models.functions import FirstValue
+from django.utils import timezone
+
+from usuarios.models import Usuario
+
+from .models import (Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, Proyecto_Usuario,
+    Proyecto_Etiqueta, Reporte_Trabajo)
+from .progreso import avance_tareas, porcentaje_proyectos
+from .texto import texto_plano
+
+REPORTE_CHUNK   = 2000                  # filas por lectura del cursor
+REPORTE_MEMORIA = 16 * 1024 * 1024      # bytes en memoria antes de pasar el archivo a disco
+
+logger          = logging.getLogger(__name__)
+_ejecutor       = None
+_ejecutor_lock  = Lock()
+
+
+def reporte_libro(buffer=None):
+    '''
+        Libro en modo constant_memory: cada fila se escribe a disco en cuanto se completa,
+        por lo que las filas deben generarse en orden. El archivo final se mantiene en memoria
+        hasta REPORTE_MEMORIA y luego pasa a un archivo temporal.
+    '''
+    buffer = buffer if buffer else tempfile.SpooledTemporaryFile(max_size=REPORTE_MEMORIA)
+    return xlsxwriter.Workbook(buffer, {'constant_memory': True}), buffer
+
+def nombre_reporte(tipo, proyecto):
+    if tipo == 'A':
+        return f'Avances - {proyecto.nombre}'
+    return f'Actividades - {proyecto.nombre}'
+
+def responsables_historial(actividades):
+    '''
+        {actividad_id: usuario} de quien registró cada actividad sin responsable (usuario del primer
+        registro de su historial). Dos consultas sin importar la cantidad de actividades.
+    '''
+    Historial = Proyecto_Actividad.history.model
+    primeros = Historial.objects.filter(id__in=actividades.filter(responsable__isnull=True).values('id'))\
+        .annotate(primero=Window(
+            expression  = FirstValue('history_user_id'),
+            partition_by= [F('id')],
+            order_by    = [F('history_date').asc(), F('history_id').asc()],
+        )).order_by().values_list('id', 'primero').distinct()
+    primeros = {actividad_id: usuario_id for actividad_id, usuario_id in primeros if usuario_id}
+    usuarios = Usuario.objects.in_bulk(set(primeros.values()))
+    return {actividad_id: usuarios.get(usuario_id) for actividad_id, usuario_id in primeros.items()}
+
+def nombre_responsable(actividad, registradores):
+    responsable = actividad.responsable or registradores.get(actividad.id)
+    return responsable.get_full_name() if responsable else ''
+
+def escribe_actividades(workbook, proyecto, fecha_ini, fecha_fin):
+    '''
+        REPORTE DE ACTIVIDADES (fecha_fin no incluida)
+    '''
+    actividades = Proyecto_Actividad.objects.select_related('tarea__fase', 'tarea', 'responsable')\
+            .filter(proyecto=proyecto)
+
+    if fecha_ini and fecha_fin:
+        actividades = actividades.filter(creacion__gte=fecha_ini, creacion__lt=fecha_fin)
+
+    actividades = actividades.order_by('descripcion')
+    registradores = responsables_historial(actividades)
+
+    worksheet = workbook.add_worksheet('Detalle')
+
+    archivo = {
+        'ancho_columnas':   [(0, 0, 15), (1, 1, 30), (2 , 2, 30), (3, 3, 90), (4, 6, 30)],
+        }
+    formatos = {
+        'titulo':   workbook.add_format(reporte_formato('titulo')),
+        'titulo%':  workbook.add_format(reporte_formato('titulo', 'porcentaje')),
+        'subtitulo':workbook.add_format(reporte_formato('subtitulo')),
+        '%':        workbook.add_format(reporte_formato('porcentaje')),
+        'fecha':    workbook.add_format(reporte_formato('fecha')),
+        'wrapping': workbook.add_format(reporte_formato('wrapping')),
+    }
+
+    #Ancho de columnas
+    for columna in archivo['ancho_columnas']:
+        worksheet.set_column(*columna)
+
+    def filas():
+        data  = []
+        data.append(reporte_data(0, 0, 'string', proyecto.nombre, formatos['titulo']))
+        data.append(reporte_data(None, 5, 'number', porcentaje_proyectos([proyecto.id]).get(proyecto.id, 0)/100, formatos['titulo%']))
+        yield data
+
+        #Titulos
+        data  = []
+        data.append(reporte_data(2, None, 'string', 'FECHA', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'FASE', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'TAREA', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'ACTIVIDAD', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'RESPONSABLE', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'RESOLUCIÓN', formatos['subtitulo']))
+        yield data
+
+        for actividad in actividades.iterator(chunk_size=REPORTE_CHUNK):
+            responsable = nombre_responsable(actividad, registradores)
+
+            data  = []
+            data.append(reporte_data(None, None, 'datetime', actividad.actualizacion, formatos['fecha']))
+            data.append(reporte_data(None, None, 'string', actividad.tarea.fase.descripcion, None))
+            data.append(reporte_data(None, None, 'string', actividad.tarea.descripcion, None))
+            data.append(reporte_data(None, None, 'string', actividad.descripcion, None))
+            data.append(reporte_data(None, None, 'string', responsable, None))
+            data.append(reporte_data(None, None, 'string', texto_plano(actividad.resolucion),  formatos['wrapping']))
+            yield data
+
+    repote_escribe(worksheet, filas())
+
+def escribe_avances(workbook, proyecto):
+    '''
+        REPORTE DE AVANCES
+    '''
+    worksheet = workbook.add_worksheet('General')
+
+    archivo = {
+        'ancho_columnas':   [(0, 0, 36), (1, 1, 120), (2 , 8, 15)],
+        }
+    formatos = {
+        'titulo':   workbook.add_format(reporte_formato('titulo')),
+        'titulo%':  workbook.add_format(reporte_formato('titulo', 'porcentaje')),
+        'subtitulo':workbook.add_format(reporte_formato('subtitulo')),
+        '%':        workbook.add_format(reporte_formato('porcentaje')),
+        'wrapping': workbook.add_format(reporte_formato('wrapping')),
+    }
+
+    #Ancho de columnas
+    for columna in archivo['ancho_columnas']:
+        worksheet.set_column(*columna)
+
+    def filas_general():
+        data  = []
+        data.append(reporte_data(0, 0, 'string', proyecto.nombre, formatos['titulo']))
+        data.append(reporte_data(None, 8, 'number', porcentaje_proyectos([proyecto.id]).get(proyecto.id, 0)/100, formatos['titulo%']))
+        yield data
+
+        data  = []
+        data.append(reporte_data(2, 0, 'string', 'FASE', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'TAREA', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'RESPONSABLE', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'ETIQUETAS', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', '# ACTIVIDADES', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'PRIORIDAD', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'COMPLEJIDAD', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'ESTADO', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', '% AVANCE', formatos['subtitulo']))
+        yield data
+
+        tareas  = Proyecto_Tarea.objects.filter(proyecto=proyecto)
+        avances = avance_tareas(tareas)
+        # responsables (usuarios del proyecto) de las actividades de cada tarea
+        usuarios = {pu.usuario_id: pu.usuario.get_full_name()
+            for pu in Proyecto_Usuario.objects.select_related('usuario').filter(proyecto=proyecto)}
+        responsables = {}
+        for tarea_id, usuario_id in Proyecto_Actividad.objects.filter(proyecto=proyecto, responsable__isnull=False)\
+                .values_list('tarea_id', 'responsable_id').distinct().order_by('responsable_id').iterator(chunk_size=REPORTE_CHUNK):
+            if usuario_id in usuarios:
+                responsables.setdefault(tarea_id, []).append(usuarios[usuario_id])
+
+        etiquetas = Prefetch('etiqueta', queryset=Proyecto_Etiqueta.objects.order_by('descripcion'))
+        for tarea in tareas.select_related('fase').prefetch_related(etiquetas)\
+                .order_by('fase__descripcion', 'descripcion').iterator(chunk_size=REPORTE_CHUNK):
+            avance = avances.get(tarea.id, 0)
+            data = []
+            data.append(reporte_data(None, None, 'string', tarea.fase.descripcion, None))
+            data.append(reporte_data(None, None, 'string', tarea.descripcion, None))
+            data.append(reporte_data(None, None, 'string', ', '.join(responsables.get(tarea.id, [])), None))
+            data.append(reporte_data(None, None, 'string', ', '.join([e.descripcion for e in tarea.etiqueta.all()]), formatos['wrapping']))
+            data.append(reporte_data(None, None, 'number', tarea.get_cantidad_actividades(), None))
+            data.append(reporte_data(None, None, 'string', tarea.get_prioridad_display(), None))
+            data.append(reporte_data(None, None, 'number', tarea.complejidad, None))
+            data.append(reporte_data(None, None, 'string', 'COMPLETADO' if avance==100 else 'PENDIENTE', None))
+            data.append(reporte_data(None, None, 'number', avance/100, formatos['%']))
+            yield data
+
+    repote_escribe(worksheet, filas_general())
+
+    worksheet = workbook.add_worksheet('Actividades')
+
+    for columna in [(0, 0, 30), (1, 2, 66), (3 , 6, 21), (7 , 6, 60)]:
+        worksheet.set_column(*columna)
+
+    def filas_actividades():
+        data  = []
+        data.append(reporte_data(0, 0, 'string', 'FASE', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'TAREA', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'ACTIVIDAD', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'RESPONSABLE', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'ESTADO', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', '% AVANCE', formatos['subtitulo']))
+        data.append(reporte_data(None, None, 'string', 'RESOLUCIÓN', formatos['subtitulo']))
+        yield data
+
+        actividades = Proyecto_Actividad.objects.select_related('tarea', 'tarea__fase', 'responsable')\
+            .filter(proyecto=proyecto).order_by('tarea__fase__descripcion', 'tarea__descripcion', 'descripcion')
+        registradores = responsables_historial(actividades)
+
+        for actividad in actividades.iterator(chunk_size=REPORTE_CHUNK):
+            data = []
+            responsable = nombre_responsable(actividad, registradores)
+
+            data.append(reporte_data(None, None, 'string', actividad.tarea.fase.descripcion, formatos['wrapping']))
+            data.append(reporte_data(None, None, 'string', actividad.tarea.descripcion, formatos['wrapping']))
+            data.append(reporte_data(None, None, 'string', actividad.descripcion, formatos['wrapping']))
+            data.append(reporte_data(None, None, 'string', responsable, None))
+            data.append(reporte_data(None, None, 'string', 'COMPLETADO' if actividad.finalizado==100 else 'PENDIENTE', None))
+            data.append(reporte_data(None, None, 'number', actividad.finalizado/100, formatos['%']))
+            data.append(reporte_data(None, None, 'string', texto_plano(actividad.resolucion),  formatos['wrapping']))
+            yield data
+
+    repote_escribe(worksheet, filas_actividades())
+
+def generar_reporte(tipo, proyecto_id, fecha_ini=None, fecha_fin=None, buffer=None):
+    '''
+        Escribe el reporte en buffer (ruta o archivo, por defecto un SpooledTemporaryFile).
+        fecha_fin se incluye completa. Devuelve (nombre, buffer).
+    '''
+    proyecto = Proyecto.objects.get(id = proyecto_id)
+    workbook, buffer = reporte_libro(buffer)
+    if tipo == 'A':
+        escribe_avances(workbook, proyecto)
+    else:
+        fecha_fin = fecha_fin + timedelta(days=1) if fecha_fin else None
+        escribe_actividades(workbook, proyecto, fecha_ini, fecha_fin)
+    workbook.close()
+    if hasattr(buffer, 'seek'):
+        buffer.seek(0)
+    return nombre_reporte(tipo, proyecto), buffer
+
+
+
+#TRABAJOS EN SEGUNDO PLANO
+def directorio_reportes():
+    directorio = getattr(settings, 'SEGUIMIENTO_REPORTES_DIR', None) or \
+        os.path.join(tempfile.gettempdir(), 'seguimiento_reportes')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+def ruta_reporte(archivo):
+    return os.path.join(directorio_reportes(), archivo)
+
+def archivo_reporte(tipo, proyecto_id, fecha_ini, fecha_fin, version):
+    llave = f'{tipo}|{proyecto_id}|{fecha_ini}|{fecha_fin}|{version}'
+    return hashlib.sha256(llave.encode()).hexdigest() + '.xlsx'
+
+def encolar(tipo, proyecto_id, usuario, fecha_ini=None, fecha_fin=None):
+    '''
+        Registra el trabajo; si el archivo para la versión actual de los datos ya existe
+        queda finalizado de inmediato, de lo contrario se envía a los hilos del proceso
+        (SEGUIMIENTO_REPORTES_HILOS, 2 por defecto; con 0 lo procesa el comando procesar_reportes).
+    '''
+    proyecto = Proyecto.objects.get(id=proyecto_id)
+    version  = str(proyecto.version)    # ver versiones.py
+    trabajo  = Reporte_Trabajo(tipo=tipo, proyecto=proyecto, usuario=usuario, fini=fecha_ini, ffin=fecha_fin,
+        version=version, nombre=nombre_reporte(tipo, proyecto),
+        archivo=archivo_reporte(tipo, proyecto.id, fecha_ini, fecha_fin, version))
+
+    if os.path.exists(ruta_reporte(trabajo.archivo)):
+        trabajo.estado      = 'F'
+        trabajo.finalizacion= timezone.now()
+        trabajo.save()
+        return trabajo
+
+    trabajo.save()
+    if get_hilos() > 0:
+        transaction.on_commit(lambda: get_ejecutor().submit(_procesar_en_hilo, trabajo.id))
+    return trabajo
+
+def get_hilos():
+    return getattr(settings, 'SEGUIMIENTO_REPORTES_HILOS', 2)
+
+def get_ejecutor():
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=get_hilos(), thread_name_prefix='seguimiento_reportes')
+        return _ejecutor
+
+def _procesar_en_hilo(trabajo_id):
+    try:
+        procesar_trabajo(trabajo_id)
+    finally:
+        connection.close()
+
+def procesar_trabajo(trabajo_id):
+    '''
+        Genera el archivo de un trabajo pendiente. El cambio de estado P -> E es atómico,
+        por lo que varios hilos o procesos pueden atender la misma cola.
+        Devuelve True si el trabajo fue tomado por este llamado.
+    '''
+    if not Reporte_Trabajo.objects.filter(id=trabajo_id, estado='P').update(estado='E', inicio=timezone.now()):
+        return False
+
+    trabajo = Reporte_Trabajo.objects.get(id=trabajo_id)
+    ruta    = ruta_reporte(trabajo.archivo)
+    try:
+        if not os.path.exists(ruta):
+            temporal = f'{ruta}.{trabajo.id}.tmp'
+            try:
+                generar_reporte(trabajo.tipo, trabajo.proyecto_id, trabajo.fini, trabajo.ffin, temporal)
+                os.replace(temporal, ruta)
+            finally:
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+        trabajo.estado = 'F'
+    except Exception as ex:
+        logger.exception('error en procesar_trabajo (%s)', trabajo.id)
+        trabajo.estado  = 'X'
+        trabajo.error   = str(ex)
+    trabajo.finalizacion = timezone.now()
+    trabajo.save(update_fields=['estado', 'error', 'finalizacion'])
+    return True
+
+def procesar_pendientes(limite=None):
+    '''
+        Procesa, en orden de creación, los trabajos pendientes. Devuelve la cantidad procesada.
+    '''
+    pendientes = Reporte_Trabajo.objects.filter(estado='P').order_by('creacion').values_list('id', flat=True)
+    if limite:
+        pendientes = pendientes[:limite]
+    return sum(1 for trabajo_id in list(pendientes) if procesar_trabajo(trabajo_id))
+
+def reiniciar_interrumpidos(minutos):
+    '''
+        Devuelve a pendiente los trabajos en proceso desde hace más de los minutos indicados
+        (por ejemplo, si el proceso que los atendía se detuvo). Se cuenta desde que el trabajo
+        fue tomado (inicio), no desde la solicitud: un trabajo que esperó en la cola no se reinicia.
+    '''
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return Reporte_Trabajo.objects.filter(estado='E', inicio__lt=limite).update(estado='P')
+
+def limpiar_archivos(dias):
+    '''
+        Elimina los archivos generados hace más de los días indicados
+    '''
+    limite = timezone.now().timestamp() - dias * 86400
+    eliminados = 0
+    with os.scandir(directorio_reportes()) as archivos:
+        for archivo in archivos:
+            if archivo.is_file() and archivo.stat().st_mtime < limite:
+                os.remove(archivo.path)
+                eliminados += 1
+    return eliminados
+
+
+
+def reporte_data(fila, columna, tipo, valor, formato):
+    d = {}
+    if fila:
+        d['fila'] = fila
+    if columna:
+        d['columna'] = columna
+    if tipo:
+        d['tipo'] = tipo
+    if valor is not None:
+        d['valor'] = valor
+    if formato:
+        d['formato'] = formato
+    return d
+
+def reporte_formato(*args, custom=None):
+    formato = {
+        'titulo'    : {'font_size': 18, 'bold': True},
+        'subtitulo' : {'font_size': 12, 'bold': True, 'italic': True},
+        'wrapping'  : {'text_wrap': True},
+        'porcentaje': {'num_format': '0.00%'},
+        'fecha'     : {'num_format': 'dd/mm/yyyy'},
+        'fecha_hora': {'num_format': 'dd/mm/yy hh:mm:ss'},
+        'hora'      : {'num_format': 'hh:mm:ss'},
+        'custom'    : {'custom': custom},
+    }
+    f = {}
+    for elemento in args:
+        f.update(formato[f'{elemento}'])
+    if custom:
+        f.update(formato[f'{custom}'])
+    return f
+
+def repote_escribe(hoja, arreglo_data = [], fila_inicial=0, columna_inicial=0):
+    fila, columna = fila_inicial, columna_inicial
+    for data in arreglo_data:
+        for registro in data:
+            if 'fila' in registro:
+                fila = registro['fila']
+
+            if 'columna' in registro:
+                columna = registro['columna']
+
+            try:
+                valor = registro['valor'] if 'valor' in registro else None
+                formato = registro['formato'] if 'formato' in registro else None
+
+                if registro['tipo']=='string':
+                    hoja.write_string(fila, columna, valor, formato)
+                elif registro['tipo']=='number':
+                    hoja.write_number(fila, columna, valor, formato)
+                elif registro['tipo']=='blank':
+                    hoja.write_blank(fila, columna, valor, formato)
+                elif registro['tipo']=='formula':
+                    hoja.write_formula(fila, columna, valor, formato)
+                elif registro['tipo']=='datetime':
+                    hoja.write_datetime(fila, columna, valor, formato)
+                elif registro['tipo']=='boolean':
+                    hoja.write_boolean(fila, columna, valor, formato)
+                elif registro['tipo']=='url':
+                    hoja.write_url(fila, columna, valor, formato)
+                else:
+                    hoja.write(fila, columna, valor)
+            except:
+                hoja.write(fila, columna, valor)
+            columna += 1
+        fila, columna = fila+1, 0
@@ -0,0 +1,232 @@
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import acumulados, busqueda, fragmentos, versiones
+from .memoizacion import invalidar_solicitud
+from .models import (Estado, Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, Proyecto_Etiqueta,
+    Proyecto_Objetivo, Proyecto_Meta, Proyecto_Usuario, Comentario)
+
+
+def valor_anterior(sender, instance, campo):
+    '''
+        Valor almacenado de un campo antes de guardar (None si el objeto es nuevo)
+    '''
+    if instance._state.adding:
+        return None
+    return sender.objects.filter(pk=instance.pk).values_list(campo, flat=True).first()
+
+def valores_anteriores(sender, instance, *campos):
+    '''
+        valor_anterior de varios campos en una consulta (tupla de None si el objeto es nuevo)
+    '''
+    valores = None
+    if not instance._state.adding:
+        valores = sender.objects.filter(pk=instance.pk).values_list(*campos).first()
+    return valores or (None, ) * len(campos)
+
+def mover_comentarios(proyecto_id, fases=(), tareas=(), actividades=()):
+    '''
+        Proyecto (desnormalizado) y documento de búsqueda de los comentarios de los objetos
+        que cambiaron de proyecto
+    '''
+    filtro = Q(tipo='F', obj_uuid__in=fases) | Q(tipo='T', obj_uuid__in=tareas) | Q(tipo='A', obj_uuid__in=actividades)
+    comentarios = list(Comentario.objects.filter(filtro).exclude(proyecto_id=proyecto_id))
+    if comentarios:
+        Comentario.objects.filter(id__in=[comentario.id for comentario in comentarios]).update(proyecto_id=proyecto_id)
+        for comentario in comentarios:
+            comentario.proyecto_id = proyecto_id
+        busqueda.indexar_lote('C', Comentario.resolver_objetos(comentarios))
+
+@receiver(pre_save, sender=Proyecto_Fase)
+def fase_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._proyecto_anterior_id = valor_anterior(sender, instance, 'proyecto_id')
+
+@receiver(post_save, sender=Proyecto_Fase)
+def fase_post_save(sender, instance, raw=False, **kwargs):
+    # al cambiar de proyecto: proyecto (desnormalizado) de tareas, actividades y comentarios,
+    # acumulados y versión de ambos proyectos y documentos de búsqueda
+    proyecto_anterior_id = getattr(instance, '_proyecto_anterior_id', None)
+    if not raw and proyecto_anterior_id and proyecto_anterior_id != instance.proyecto_id:
+        tareas = Proyecto_Tarea.objects.filter(fase=instance)
+        actividades = Proyecto_Actividad.objects.filter(tarea__fase=instance)
+        tareas.update(proyecto_id=instance.proyecto_id)
+        actividades.update(proyecto_id=instance.proyecto_id)
+        acumulados.reconstruir([proyecto_anterior_id, instance.proyecto_id])
+        versiones.incrementar(proyecto_anterior_id, instance.proyecto_id)
+        busqueda.reindexar_fase(instance)
+        mover_comentarios(instance.proyecto_id, fases=[instance.id], tareas=tareas.values('id'),
+            actividades=actividades.values('id'))
+
+@receiver(pre_save, sender=Proyecto_Tarea)
+def tarea_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._fase_anterior_id, instance._proyecto_anterior_id = \
+            valores_anteriores(sender, instance, 'fase_id', 'proyecto_id')
+
+@receiver(post_save, sender=Proyecto_Tarea)
+def tarea_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fase_anterior_id = getattr(instance, '_fase_anterior_id', None)
+        acumulados.actualizar_tarea(instance.id, fase_anterior_id)
+        if fase_anterior_id and fase_anterior_id != instance.fase_id:
+            Proyecto_Actividad.objects.filter(tarea=instance).exclude(proyecto_id=instance.proyecto_id)\
+                .update(proyecto_id=instance.proyecto_id)
+            busqueda.mover_actividades(instance)
+            mover_comentarios(instance.proyecto_id, tareas=[instance.id],
+                actividades=Proyecto_Actividad.objects.filter(tarea=instance).values('id'))
+
+@receiver(pre_delete, sender=Proyecto_Tarea)
+def tarea_pre_delete(sender, instance, **kwargs):
+    acumulados.descontar_tarea(instance.id)
+
+@receiver(pre_save, sender=Proyecto_Actividad)
+def actividad_pre_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._tarea_anterior_id, instance._proyecto_anterior_id = \
+            valores_anteriores(sender, instance, 'tarea_id', 'proyecto_id')
+
+@receiver(post_save, sender=Proyecto_Actividad)
+def actividad_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    acumulados.actualizar_tarea(instance.tarea_id)
+    tarea_anterior_id = getattr(instance, '_tarea_anterior_id', None)
+    if tarea_anterior_id and tarea_anterior_id != instance.tarea_id:
+        acumulados.actualizar_tarea(tarea_anterior_id)
+        mover_comentarios(instance.proyecto_id, actividades=[instance.id])
+
+@receiver(post_delete, sender=Proyecto_Actividad)
+def actividad_post_delete(sender, instance, **kwargs):
+    acumulados.actualizar_tarea(instance.tarea_id)
+
+@receiver(post_save, sender=Proyecto)
+def proyecto_post_save(sender, instance, **kwargs):
+    invalidar_solicitud(('modificable', instance.id))
+
+@receiver(post_save, sender=Estado)
+def estado_post_save(sender, instance, **kwargs):
+    invalidar_solicitud(espacio='modificable')
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def usuario_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # el nombre de usuario se muestra como líder y responsable (p.ej. arbol.py)
+    if not raw and (update_fields is None or 'username' in update_fields):
+        instance._username_anterior = valor_anterior(sender, instance, 'username')
+
+def usuario_renombrado(instance):
+    return getattr(instance, '_username_anterior', None) not in (None, instance.username)
+
+
+#BUSQUEDA
+TIPOS_BUSQUEDA = {modelo: tipo for tipo, modelo in busqueda.TIPOS.items()}
+
+@receiver(post_save, sender=Proyecto)
+@receiver(post_save, sender=Proyecto_Fase)
+@receiver(post_save, sender=Proyecto_Tarea)
+@receiver(post_save, sender=Proyecto_Actividad)
+@receiver(post_save, sender=Comentario)
+def busqueda_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busqueda.indexar(TIPOS_BUSQUEDA[sender], instance)
+
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_delete, sender=Proyecto_Fase)
+@receiver(post_delete, sender=Proyecto_Tarea)
+@receiver(post_delete, sender=Proyecto_Actividad)
+@receiver(post_delete, sender=Comentario)
+def busqueda_post_delete(sender, instance, **kwargs):
+    busqueda.eliminar(TIPOS_BUSQUEDA[sender], instance.id)
+
+
+#VERSIONES
+@receiver(post_save, sender=Proyecto)
+def version_proyecto_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        versiones.incrementar(instance.id)
+
+@receiver(post_save, sender=Proyecto_Fase)
+@receiver(post_save, sender=Proyecto_Etiqueta)
+@receiver(post_save, sender=Proyecto_Objetivo)
+@receiver(post_save, sender=Proyecto_Meta)
+@receiver(post_save, sender=Proyecto_Usuario)
+@receiver(post_save, sender=Comentario)
+@receiver(post_delete, sender=Proyecto_Fase)
+@receiver(post_delete, sender=Proyecto_Etiqueta)
+@receiver(post_delete, sender=Proyecto_Objetivo)
+@receiver(post_delete, sender=Proyecto_Meta)
+@receiver(post_delete, sender=Proyecto_Usuario)
+@receiver(post_delete, sender=Comentario)
+def version_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        versiones.incrementar(instance.proyecto_id)
+
+@receiver(post_save, sender=Proyecto_Tarea)
+@receiver(post_delete, sender=Proyecto_Tarea)
+def version_tarea(sender, instance, raw=False, **kwargs):
+    # al cambiar de fase también el proyecto anterior
+    if not raw:
+        versiones.incrementar(instance.proyecto_id, getattr(instance, '_proyecto_anterior_id', None))
+
+@receiver(post_save, sender=Proyecto_Actividad)
+@receiver(post_delete, sender=Proyecto_Actividad)
+def version_actividad(sender, instance, raw=False, **kwargs):
+    # al cambiar de tarea también el proyecto anterior
+    if not raw:
+        versiones.incrementar(instance.proyecto_id, getattr(instance, '_proyecto_anterior_id', None))
+
+@receiver(post_save, sender=Estado)
+def version_estado(sender, instance, raw=False, **kwargs):
+    # descripción y bloqueo del estado forman parte del detalle y del árbol de sus proyectos
+    if not raw:
+        versiones.incrementar(estado=instance.id)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def version_usuario(sender, instance, raw=False, **kwargs):
+    if not raw and usuario_renombrado(instance):
+        versiones.incrementar(lider=instance.pk)
+        versiones.incrementar(proyecto_actividad__responsable=instance.pk)
+
+@receiver(m2m_changed, sender=Proyecto_Tarea.etiqueta.through)
+def version_etiquetas_tarea(sender, instance, action, **kwargs):
+    # instance es la tarea o (reverse) la etiqueta, ambas del mismo proyecto
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        versiones.incrementar(instance.proyecto_id)
+
+
+#FRAGMENTOS
+@receiver(post_save, sender=Proyecto_Fase)
+@receiver(post_delete, sender=Proyecto_Fase)
+def fragmento_fase(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragmentos.invalidar(instance.id)
+
+@receiver(post_save, sender=Proyecto_Tarea)
+@receiver(post_delete, sender=Proyecto_Tarea)
+def fragmento_tarea(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragmentos.invalidar(instance.fase_id, getattr(instance, '_fase_anterior_id', None))
+
+@receiver(post_save, sender=Proyecto_Actividad)
+@receiver(post_delete, sender=Proyecto_Actividad)
+def fragmento_actividad(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragmentos.invalidar_tareas(instance.tarea_id, getattr(instance, '_tarea_anterior_id', None))
+
+@receiver(post_save, sender=Proyecto)
+def fragmento_proyecto(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragmentos.invalidar_proyecto(instance.id)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def fragmento_usuario(sender, instance, raw=False, **kwargs):
+    if not raw and usuario_renombrado(instance):
+        fragmentos.invalidar(*Proyecto_Actividad.objects.filter(responsable=instance.pk)\
+            .values_list('tarea__fase_id', flat=True).distinct())
+
+@receiver(post_save, sender=Estado)
+def fragmento_estado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragmentos.invalidar_todo()
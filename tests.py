@@ -1,3 +1,987 @@
-from django.test import TestCase
+import io, os, re, shutil, tempfile, uuid
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import acumulados, datos_prueba, fragmentos, rendimiento, reportes, texto, versiones
+from .arbol import arbol_proyecto, version_arbol
+from .busqueda import buscar
+from .consulta import filtrar, interpretar
+from .forms import Proyecto_Comentario_ModelForm
+from .importacion import importar
+from .instrumentacion import InstrumentacionMiddleware, huella, logger, presupuesto, presupuesto_consultas
+from .masivo import actualizar_actividades
+from .memoizacion import CacheSolicitudMiddleware, ConfiguracionCache
+from .paginacion import codificar_cursor, decodificar_cursor
+from .models import (Estado, Proyecto, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, Proyecto_Usuario,
+    Proyecto_Etiqueta, Comentario, Busqueda_Documento, Reporte_Trabajo, conf)
+from .progreso import avance_tareas, porcentaje_fases, porcentaje_proyectos
+from .views import accordion_tarea_actividad, arbol_proyecto_json
+
+
+def crear_proyecto(nombre, fases=0, tareas=0, finalizados=(), **campos):
+    '''
+        Proyecto vigente (estado 'En curso', 2024-01-01 a 2999-12-31 salvo otros campos) con las
+        fases 'Fase 1'.., tareas 'Tarea 0'.. por fase y una actividad por valor de finalizados en cada tarea
+    '''
+    estado = Estado.objects.get_or_create(descripcion='En curso')[0]
+    proyecto = Proyecto.objects.create(**{'nombre': nombre, 'estado': estado,
+        'finicio': date(2024, 1, 1), 'ffin': date(2999, 12, 31), **campos})
+    for f in range(1, fases + 1):
+        fase = Proyecto_Fase.objects.create(proyecto=proyecto, correlativo=f, descripcion=f'Fase {f}')
+        for t in range(tareas):
+            tarea = Proyecto_Tarea.objects.create(fase=fase, descripcion=f'Tarea {t}')
+            for finalizado in finalizados:
+                Proyecto_Actividad.objects.create(tarea=tarea, descripcion='Actividad', creacion=date(2024, 1, 1),
+                    finalizado=finalizado)
+    return proyecto
+
+
+class ProgresoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for p in range(15):
+            fase = Proyecto_Fase.objects.get(proyecto=crear_proyecto(f'Proyecto {p}', fases=1))
+            for t in range(3):
+                tarea = Proyecto_Tarea.objects.create(fase=fase, descripcion=f'Tarea {t}', complejidad=t+1)
+                for finalizado in (0, 50, 100)[:t+1]:
+                    Proyecto_Actividad.objects.create(tarea=tarea, descripcion=f'Actividad {finalizado}',
+                        creacion=date(2024, 1, 1), finalizado=finalizado)
+        Proyecto_Tarea.objects.create(fase=fase, descripcion='Sin actividades', complejidad=50)
+
+    def test_porcentaje_proyectos_consultas_constantes(self):
+        ids = list(Proyecto.objects.values_list('id', flat=True))
+        with self.assertNumQueries(1):
+            porcentajes = porcentaje_proyectos(ids)
+        self.assertEqual(len(porcentajes), 15)
+
+    def test_porcentaje_fases_consultas_constantes(self):
+        ids = list(Proyecto_Fase.objects.values_list('id', flat=True))
+        with self.assertNumQueries(1):
+            porcentajes = porcentaje_fases(ids)
+        self.assertEqual(len(porcentajes), 15)
+
+    def test_coincide_con_acumulados(self):
+        # (1*0 + 2*25 + 3*50) / 6, la tarea sin actividades no pondera
+        porcentajes = porcentaje_proyectos(Proyecto.objects.values_list('id', flat=True))
+        for proyecto in Proyecto.objects.all():
+            self.assertAlmostEqual(porcentajes[proyecto.id], 33.3333, places=4)
+            self.assertAlmostEqual(proyecto.get_porcentaje_completado, porcentajes[proyecto.id], places=4)
+
+    def test_avance_tareas(self):
+        tareas = Proyecto_Tarea.objects.filter(fase__proyecto__nombre='Proyecto 0')
+        with self.assertNumQueries(1):
+            avances = avance_tareas(tareas)
+        self.assertEqual(sorted(avances.values()), [0, 25, 50])
+
+
+class BusquedaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(username='busqueda', password='busqueda')
+        cls.publico = crear_proyecto('Migración de servidores')
+        cls.privado = crear_proyecto('Servidores confidenciales', publico=False)
+        fase = Proyecto_Fase.objects.create(proyecto=cls.publico, correlativo=1, descripcion='Preparación')
+        tarea = Proyecto_Tarea.objects.create(fase=fase, descripcion='Inventario')
+        cls.actividad = Proyecto_Actividad.objects.create(tarea=tarea, descripcion='Respaldo de base',
+            creacion=date(2024, 1, 1), resolucion='<p>Configurar <b>replicación</b></p>')
+
+    def titulos(self, consulta):
+        return [documento.titulo for documento in buscar(self.usuario, consulta)]
+
+    def test_prefijo_respeta_visibilidad(self):
+        self.assertEqual(self.titulos('servid'), ['Migración de servidores'])
+        Proyecto_Usuario.objects.create(proyecto=self.privado, usuario=self.usuario)
+        self.assertEqual(sorted(self.titulos('servid')), ['Migración de servidores', 'Servidores confidenciales'])
+
+    def test_texto_plano_sin_acentos(self):
+        self.assertEqual(self.titulos('REPLICACION'), ['Respaldo de base'])
+
+    def test_todos_los_terminos(self):
+        self.assertEqual(self.titulos('respaldo base'), ['Respaldo de base'])
+        self.assertEqual(self.titulos('respaldo inventario'), [])
+
+    def test_titulo_pesa_mas(self):
+        Proyecto_Actividad.objects.create(tarea=self.actividad.tarea, descripcion='Revisión',
+            creacion=date(2024, 1, 1), resolucion='<p>respaldo</p>')
+        self.assertEqual(self.titulos('respaldo')[0], 'Respaldo de base')
+
+    def test_eliminar_actualiza_indice(self):
+        self.actividad.delete()
+        self.assertEqual(self.titulos('replicacion'), [])
+
+
+class ConsultaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        proyecto = crear_proyecto('Consulta')
+        fase = Proyecto_Fase.objects.create(proyecto=proyecto, correlativo=1, descripcion='Fase de pruebas')
+        otra = Proyecto_Fase.objects.create(proyecto=proyecto, correlativo=2, descripcion='Cierre')
+        cls.alta = Proyecto_Tarea.objects.create(fase=fase, descripcion='Carga inicial', prioridad=30)
+        Proyecto_Tarea.objects.create(fase=fase, descripcion='Carga diaria', prioridad=10)
+        Proyecto_Tarea.objects.create(fase=otra, descripcion='Carga final', prioridad=30)
+
+    def test_interpretar(self):
+        self.assertEqual(interpretar('fase:"Fase de pruebas" -prioridad:baja carga'), [
+            (False, 'fase', 'Fase de pruebas'), (True, 'prioridad', 'baja'), (False, None, 'carga'),
+        ])
+
+    def test_filtros_combinados(self):
+        tareas, errores = filtrar(Proyecto_Tarea.objects.all(), 'fase:"de pruebas" prioridad:alta carga', 'tarea')
+        self.assertEqual(errores, [])
+        self.assertEqual(list(tareas), [self.alta])
+
+    def test_proyecto_nombre_o_descripcion(self):
+        otro = Proyecto_Fase.objects.create(proyecto=crear_proyecto('Otro', descripcion='<p>Migración de datos</p>'),
+            correlativo=1, descripcion='Fase')
+        migracion = Proyecto_Tarea.objects.create(fase=otro, descripcion='Carga de datos')
+        for consulta, esperadas in (('proyecto:consulta', 3), ('proyecto:migración', 1), ('-proyecto:migración', 3)):
+            with self.subTest(consulta):
+                tareas, errores = filtrar(Proyecto_Tarea.objects.all(), consulta, 'tarea')
+                self.assertEqual((tareas.count(), errores), (esperadas, []))
+        self.assertEqual(list(filtrar(Proyecto_Tarea.objects.all(), 'proyecto:migración', 'tarea')[0]), [migracion])
+
+    def test_errores(self):
+        tareas, errores = filtrar(Proyecto_Tarea.objects.all(), 'color:rojo creacion:2024-13-01', 'tarea')
+        self.assertEqual(len(errores), 2)
+        self.assertEqual(tareas.count(), 3)
+
+
+class ActualizacionMasivaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(username='masivo', password='masivo')
+        cls.proyecto = crear_proyecto('Masivo', fases=1)
+        Proyecto_Usuario.objects.create(proyecto=cls.proyecto, usuario=cls.usuario)
+        fase = Proyecto_Fase.objects.get(proyecto=cls.proyecto)
+        cls.tarea = Proyecto_Tarea.objects.create(fase=fase, descripcion='Tarea', complejidad=2)
+        cls.actividades = [Proyecto_Actividad.objects.create(tarea=cls.tarea, descripcion=f'Actividad {a}',
+            creacion=date(2024, 1, 1)) for a in range(3)]
+
+    def test_aplica_cambios_historial_y_acumulados(self):
+        historial = Proyecto_Actividad.history.count()
+        cambios = [{'id': str(a.id), 'finalizado': 100, 'responsable': self.usuario.id} for a in self.actividades]
+        actualizadas, errores = actualizar_actividades(cambios, self.usuario)
+        self.assertEqual((actualizadas, errores), (3, []))
+        self.assertEqual(Proyecto_Actividad.history.count(), historial + 3)
+        self.tarea.refresh_from_db()
+        self.proyecto.refresh_from_db()
+        self.assertEqual(self.tarea.acum_pendientes, 0)
+        self.assertEqual(self.proyecto.get_porcentaje_completado, 100)
+
+    def test_errores_no_aplican_cambios(self):
+        cambios = [
+            {'id': str(self.actividades[0].id), 'finalizado': 50},
+            {'id': str(self.actividades[1].id), 'finalizado': 150},
+        ]
+        actualizadas, errores = actualizar_actividades(cambios, self.usuario)
+        self.assertEqual(actualizadas, 0)
+        self.assertEqual(len(errores), 1)
+        self.assertFalse(Proyecto_Actividad.objects.filter(finalizado__gt=0).exists())
+
+
+class ImportacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(username='importa', password='importa')
+        cls.proyecto = crear_proyecto('Importado')
+        Proyecto_Usuario.objects.create(proyecto=cls.proyecto, usuario=cls.usuario)
+        Proyecto_Fase.objects.create(proyecto=cls.proyecto, correlativo=1, descripcion='Existente')
+        Proyecto_Etiqueta.objects.create(proyecto=cls.proyecto, descripcion='Backend')
+
+    def importar(self, texto):
+        return importar(self.proyecto, io.BytesIO(texto.encode()), 'datos.csv', self.usuario)
+
+    def test_importa_filas(self):
+        filas = ['Fase;Tarea;Complejidad;Etiquetas;Actividad;Finalizado;Responsable']
+        filas += [f'Nueva;Tarea {t};{t+1};backend, Nueva;Actividad {a};{a*50};importa' for t in range(3) for a in range(3)]
+        filas += ['Existente;Sin actividades;5;;;;']
+        resumen, errores = self.importar('\n'.join(filas))
+        self.assertEqual(errores, [])
+        self.assertEqual((resumen['fases'], resumen['tareas'], resumen['etiquetas'], resumen['actividades']), (1, 4, 1, 9))
+        self.assertEqual(Proyecto_Fase.objects.get(descripcion='Nueva').correlativo, 2)
+        self.assertEqual(Proyecto_Tarea.etiqueta.through.objects.count(), 6)
+        self.assertEqual(Proyecto_Actividad.history.count(), 9)
+        self.proyecto.refresh_from_db()
+        self.assertEqual(self.proyecto.acum_complejidad, 6)
+        self.assertEqual(self.proyecto.acum_pendientes, 6)
+
+    def test_errores_no_importan(self):
+        resumen, errores = self.importar('fase,correlativo,tarea,complejidad\nOtra,1,Tarea,1\nOtra,,Tarea,101')
+        self.assertIsNone(resumen)
+        self.assertEqual([error['fila'] for error in errores], [2, 3])
+        self.assertFalse(Proyecto_Tarea.objects.exists())
+
+
+class ClonacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(username='clona', password='clona')
+        cls.plantilla = crear_proyecto('Plantilla', ffin=date(2024, 3, 1))
+        etiqueta = Proyecto_Etiqueta.objects.create(proyecto=cls.plantilla, descripcion='Base')
+        for f in range(1, 4):
+            fase = Proyecto_Fase.objects.create(proyecto=cls.plantilla, correlativo=f, descripcion=f'Fase {f}')
+            for t in range(5):
+                tarea = Proyecto_Tarea.objects.create(fase=fase, descripcion=f'Tarea {t}', complejidad=t+1, prioridad=20)
+                tarea.etiqueta.add(etiqueta)
+                Proyecto_Actividad.objects.create(tarea=tarea, descripcion='Actividad', creacion=date(2024, 1, 1))
+
+    def test_clona_estructura(self):
+        proyecto = self.plantilla.clonar('Clon', self.usuario, date(2025, 1, 1))
+        self.assertEqual(proyecto.ffin, date(2025, 3, 1))
+        self.assertEqual(Proyecto_Fase.objects.filter(proyecto=proyecto).count(), 3)
+        tareas = Proyecto_Tarea.objects.filter(fase__proyecto=proyecto)
+        self.assertEqual(tareas.count(), 15)
+        self.assertEqual(tareas.filter(prioridad=20, etiqueta__proyecto=proyecto).count(), 15)
+        self.assertFalse(Proyecto_Actividad.objects.filter(tarea__fase__proyecto=proyecto).exists())
+        self.assertTrue(Proyecto_Usuario.objects.filter(proyecto=proyecto, usuario=self.usuario).exists())
+
+
+class ArbolTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.proyecto = crear_proyecto('Arbol', fases=2, tareas=4, finalizados=(0, 100))
+        etiqueta = Proyecto_Etiqueta.objects.create(proyecto=cls.proyecto, descripcion='Base')
+        for tarea in Proyecto_Tarea.objects.filter(proyecto=cls.proyecto):
+            tarea.etiqueta.add(etiqueta)
+
+    def test_arbol_consultas_constantes(self):
+        with self.assertNumQueries(5):
+            arbol = arbol_proyecto(self.proyecto.id)
+        self.assertEqual([fase['correlativo'] for fase in arbol['fases']], [1, 2])
+        tarea = arbol['fases'][0]['tareas'][0]
+        self.assertEqual((tarea['finalizado'], tarea['etiquetas'], len(tarea['actividades'])), (50, ['Base'], 2))
+        self.assertEqual(arbol['completado'], 50)
+
+    def test_version_estado_y_responsable(self):
+        anterior = version_arbol(self.proyecto.id)
+        estado = self.proyecto.estado
+        estado.descripcion = 'Renombrado'
+        estado.save()
+        self.assertNotEqual(version_arbol(self.proyecto.id), anterior)
+
+        usuario = get_user_model().objects.create_user(username='responsable')
+        Proyecto_Actividad.objects.filter(proyecto=self.proyecto).update(responsable=usuario)
+        anterior = version_arbol(self.proyecto.id)
+        usuario.save(update_fields=['last_login'])
+        self.assertEqual(version_arbol(self.proyecto.id), anterior)
+        usuario.username = 'renombrado'
+        usuario.save()
+        self.assertNotEqual(version_arbol(self.proyecto.id), anterior)
+
+
+class VersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(username='version', password='version')
+        cls.proyecto = crear_proyecto('Versionado', fases=1, tareas=1, finalizados=(0, ))
+        Proyecto_Usuario.objects.create(proyecto=cls.proyecto, usuario=cls.usuario)
+        cls.tarea = Proyecto_Tarea.objects.get(proyecto=cls.proyecto)
+        cls.actividad = Proyecto_Actividad.objects.get(proyecto=cls.proyecto)
+
+    def version(self):
+        self.proyecto.refresh_from_db()
+        return self.proyecto.version
+
+    def test_cambios_incrementan_version(self):
+        cambios = (
+            lambda: Proyecto_Fase.objects.create(proyecto=self.proyecto, correlativo=2, descripcion='Otra'),
+            lambda: self.tarea.etiqueta.add(Proyecto_Etiqueta.objects.create(proyecto=self.proyecto, descripcion='E')),
+            lambda: self.actividad.delete(),
+            lambda: actualizar_actividades([{'id': str(Proyecto_Actividad.objects.create(tarea=self.tarea,
+                descripcion='Nueva', creacion=date(2024, 1, 1)).id), 'finalizado': 100}], self.usuario),
+        )
+        for cambio in cambios:
+            anterior = self.version()
+            cambio()
+            self.assertGreater(self.version(), anterior)
+        self.assertIsNotNone(self.proyecto.version_fecha)
+
+    def test_guardar_no_sobrescribe_version(self):
+        anterior = Proyecto.objects.get(id=self.proyecto.id)
+        versiones.incrementar(self.proyecto.id)
+        vigente = self.version()
+        anterior.descripcion = 'Modificado'
+        anterior.save()
+        self.assertGreater(self.version(), vigente)
+        self.assertEqual(self.proyecto.descripcion, 'Modificado')
+
+    def test_mensajes_pendientes_sin_304(self):
+        self.usuario.user_permissions.set(Permission.objects.filter(content_type__app_label='seguimiento'))
+        self.client.force_login(self.usuario)
+        detalle = reverse('seguimiento:detail_proyecto', kwargs={'pk': self.proyecto.id})
+        etag = self.client.get(detalle)['ETag']
+        self.assertEqual(self.client.get(detalle, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # fase duplicada: form_invalid agrega el error y redirige al detalle sin modificar datos
+        response = self.client.post(f"{reverse('seguimiento:create_proyectofase')}?next={detalle}",
+            {'correlativo': 2, 'descripcion': 'Fase 1', 'proyecto': str(self.proyecto.id)})
+        self.assertRedirects(response, detalle, fetch_redirect_response=False)
+        response = self.client.get(detalle, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(list(response.context['messages']))
+        self.assertEqual(self.client.get(detalle, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class FragmentoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_superuser(username='fragmento', password='fragmento')
+        proyecto = crear_proyecto('Fragmento', fases=1, tareas=1)
+        cls.fase = Proyecto_Fase.objects.get(proyecto=proyecto)
+        cls.actividad = Proyecto_Actividad.objects.create(tarea=Proyecto_Tarea.objects.get(proyecto=proyecto),
+            descripcion='Original', creacion=date(2024, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+
+    def accordion(self):
+        request = RequestFactory().get('/', {'obj_id': str(self.fase.id)})
+        request.user = self.usuario
+        return accordion_tarea_actividad(request).content.decode()
+
+    def test_cache_e_invalidacion(self):
+        self.assertIn('Original', self.accordion())
+        with self.assertNumQueries(0):
+            self.assertIn('Original', self.accordion())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.actividad.descripcion = 'Modificada'
+            self.actividad.save()
+        self.assertIn('Modificada', self.accordion())
+
+    def test_consultas_fase_grande(self):
+        proyecto = crear_proyecto('Fragmento grande', fases=1, tareas=300, finalizados=(0, 50, 100))
+        fase = Proyecto_Fase.objects.get(proyecto=proyecto)
+        conf.get_value('seguimiento', 'proy_expira')     # vigente en el cache del proceso
+        request = RequestFactory().get('/', {'obj_id': str(fase.id)})
+        request.user = self.usuario
+        # fase, tareas, actividades (prefetch), avance de las tareas y porcentaje de la fase
+        with self.assertNumQueries(5):
+            response = accordion_tarea_actividad(request)
+        self.assertEqual(response.content.decode().count('tr id="actividad"'), 900)
+
+        # solicitud completa: sesión, usuario y sus permisos (usuario sin privilegios) dentro del presupuesto
+        cache.clear()
+        usuario = get_user_model().objects.create_user(username='fragmento_permisos')
+        usuario.user_permissions.set(Permission.objects.filter(content_type__app_label='seguimiento',
+            codename__in=('view_proyecto_tarea',) + fragmentos.PERMISOS_ACCORDION))
+        self.client.force_login(usuario)
+        with presupuesto_consultas() as registro:
+            response = self.client.get(reverse('seguimiento:accordion_tareaactividad'), {'obj_id': str(fase.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(registro.presupuesto, 9)
+
+
+class TareaPendienteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        fase = Proyecto_Fase.objects.get(proyecto=crear_proyecto('Pendientes', fases=1))
+        cls.sin_actividades = Proyecto_Tarea.objects.create(fase=fase, descripcion='Sin actividades')
+        cls.tarea = Proyecto_Tarea.objects.create(fase=fase, descripcion='Con actividades')
+        cls.actividad = Proyecto_Actividad.objects.create(tarea=cls.tarea, descripcion='Actividad',
+            creacion=date(2024, 1, 1), finalizado=50)
+
+    def pendientes(self):
+        return set(Proyecto_Tarea.objects.filter(pendiente=True).values_list('descripcion', flat=True))
+
+    def test_indicador_pendiente(self):
+        self.assertEqual(self.pendientes(), {'Sin actividades', 'Con actividades'})
+        self.actividad.finalizado = 100
+        self.actividad.save()
+        self.assertEqual(self.pendientes(), {'Sin actividades'})
+        self.actividad.delete()
+        self.assertEqual(self.pendientes(), {'Sin actividades', 'Con actividades'})
+
+    def valores_acumulados(self):
+        campos = ('acum_complejidad', 'acum_completado', 'acum_pendientes')
+        fase = Proyecto_Fase.objects.values_list(*campos, 'proyecto_id').get(id=self.tarea.fase_id)
+        return (
+            Proyecto_Tarea.objects.values_list('acum_actividades', 'acum_finalizado', *campos).get(id=self.tarea.id),
+            fase[:3],
+            Proyecto.objects.values_list(*campos).get(id=fase[3]),
+        )
+
+    def test_acumulados_actividad(self):
+        self.assertEqual(self.valores_acumulados(), ((1, 50, 1, 50.0, 1), (1, 50.0, 1), (1, 50.0, 1)))
+        otra = Proyecto_Actividad.objects.create(tarea=self.tarea, descripcion='Otra', creacion=date(2024, 1, 1),
+            finalizado=100)
+        self.assertEqual(self.valores_acumulados(), ((2, 150, 1, 75.0, 1), (1, 75.0, 1), (1, 75.0, 1)))
+        self.actividad.finalizado = 100
+        self.actividad.save()
+        self.assertEqual(self.valores_acumulados(), ((2, 200, 1, 100.0, 0), (1, 100.0, 0), (1, 100.0, 0)))
+        otra.delete()
+        self.actividad.delete()
+        self.assertEqual(self.valores_acumulados(), ((0, 0, 0, 0.0, 0), (0, 0.0, 0), (0, 0.0, 0)))
+        self.assertEqual(acumulados.verificar(), [])
+
+    def test_reconstruir(self):
+        Proyecto_Tarea.objects.update(pendiente=False)
+        acumulados.reconstruir()
+        self.assertEqual(self.pendientes(), {'Sin actividades', 'Con actividades'})
+
+
+class PaginacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_proyecto('Paginado', fases=1, tareas=1)
+        cls.usuario = get_user_model().objects.create_user(username='paginacion')
+        cls.usuario.user_permissions.set(Permission.objects.filter(content_type__app_label='seguimiento'))
+
+    def test_cursor_alterado(self):
+        orden = ['-prioridad', 'creacion', 'descripcion', 'id']
+        valido = codificar_cursor('s', [10, '2024-01-01', 'Tarea', str(uuid.uuid4())])
+        self.assertEqual(decodificar_cursor(valido, Proyecto_Tarea, orden)[1][1], date(2024, 1, 1))
+
+        alterados = [
+            'no es un cursor',
+            codificar_cursor('x', [10, '2024-01-01', 'Tarea', str(uuid.uuid4())]),
+            codificar_cursor('s', {'prioridad': 10}),
+            codificar_cursor('s', [10, '2024-01-01']),
+            codificar_cursor('s', ['alta', '2024-01-01', 'Tarea', str(uuid.uuid4())]),
+            codificar_cursor('s', [10, 'ayer', 'Tarea', 'no-uuid']),
+            codificar_cursor('a', [None, '2024-01-01', 'Tarea', str(uuid.uuid4())]),
+        ]
+        self.client.force_login(self.usuario)
+        for cursor in alterados:
+            self.assertIsNone(decodificar_cursor(cursor, Proyecto_Tarea, orden))
+            response = self.client.get(reverse('seguimiento:list_proyectotarea'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([tarea.descripcion for tarea in response.context['object_list']], ['Tarea 0'])
+
+    def test_lista_consultas_constantes(self):
+        self.client.force_login(self.usuario)
+        url = reverse('seguimiento:list_proyectotarea')
+        self.client.get(url)
+        cache.clear()       # el total se guarda en cache
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(url)
+
+        fase = Proyecto_Fase.objects.get()
+        for n in range(49):
+            Proyecto_Tarea.objects.create(fase=fase, descripcion=f'Tarea {n:02d}')
+        cache.clear()
+        with self.assertNumQueries(len(consultas)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['object_list']), 50)
+
+
+class PlanesConsultaTests(TestCase):
+    '''
+        Planes (EXPLAIN) de las consultas frecuentes. Cada consulta declara los índices que
+        puede utilizar (comprobado en SQLite, donde el plan no depende de estadísticas) y las
+        tablas que no debe recorrer completas; un cambio de plan hace fallar la prueba.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(username='planes', password='planes')
+        cls.proyecto = crear_proyecto('Planes', fases=3, tareas=3, finalizados=(0, 50, 100))
+        Proyecto_Actividad.objects.filter(proyecto=cls.proyecto).update(responsable=cls.usuario)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        elif connection.vendor != 'sqlite':
+            self.skipTest('Planes definidos para SQLite y PostgreSQL')
+
+    def consultas(self):
+        actividades = Proyecto_Actividad._meta.db_table
+        tareas = Proyecto_Tarea.objects.filter(proyecto=self.proyecto).values_list('id', flat=True)
+        return {
+            'pendientes_usuario': (
+                Proyecto_Actividad.objects.filter(proyecto=self.proyecto, finalizado__lt=100, responsable=self.usuario),
+                {'idx_pa_pendiente_responsable', 'idx_pa_responsable_finalizado', 'idx_pa_proyecto_finalizado'},
+                {actividades},
+            ),
+            'reporte_creacion': (
+                Proyecto_Actividad.objects.filter(proyecto=self.proyecto,
+                    creacion__gte=date(2024, 1, 1), creacion__lt=date(2024, 2, 1)),
+                {'idx_pa_proyecto_creacion', 'idx_pa_creacion'},
+                {actividades},
+            ),
+            'actividades_fase': (
+                Proyecto_Actividad.objects.filter(tarea_id__in=list(tareas)).order_by('finalizado', 'creacion'),
+                {'idx_pa_tarea_finalizado'},
+                {actividades},
+            ),
+            'fases_proyecto': (
+                Proyecto_Fase.objects.filter(proyecto=self.proyecto).order_by('descripcion'),
+                {'idx_pf_proyecto_descripcion'},
+                {Proyecto_Fase._meta.db_table},
+            ),
+            'tareas_proyecto': (
+                Proyecto_Tarea.objects.filter(proyecto=self.proyecto).order_by('-prioridad'),
+                {'idx_pt_proyecto_prioridad'},
+                {Proyecto_Tarea._meta.db_table},
+            ),
+            'tareas_pendientes': (
+                Proyecto_Tarea.objects.filter(pendiente=True).order_by('-prioridad', 'creacion'),
+                {'idx_pt_pendiente_prioridad'},
+                {Proyecto_Tarea._meta.db_table},
+            ),
+        }
+
+    def recorridos(self, plan):
+        '''
+            Tablas recorridas completas (sin índice) según el plan
+        '''
+        if connection.vendor == 'postgresql':
+            return set(re.findall(r'Seq Scan on (\w+)', plan))
+        return {tabla for tabla, indice in re.findall(r'SCAN (\w+)( USING)?', plan) if not indice}
+
+    def test_planes(self):
+        for nombre, (queryset, indices, tablas) in self.consultas().items():
+            with self.subTest(nombre):
+                plan = queryset.explain()
+                self.assertFalse(self.recorridos(plan) & tablas, plan)
+                if connection.vendor == 'sqlite':
+                    self.assertTrue(any(re.search(rf'\b{indice}\b', plan) for indice in indices), plan)
+
+
+class ProyectoDesnormalizadoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.origen = crear_proyecto('Origen', fases=1)
+        cls.destino = crear_proyecto('Destino', fases=1)
+        cls.fase = Proyecto_Fase.objects.get(proyecto=cls.origen)
+        cls.fase_destino = Proyecto_Fase.objects.get(proyecto=cls.destino)
+
+    def crear_tarea(self):
+        tarea = Proyecto_Tarea.objects.create(fase=self.fase, descripcion='Tarea')
+        for finalizado in (0, 100):
+            Proyecto_Actividad.objects.create(tarea=tarea, descripcion='Actividad', creacion=date(2024, 1, 1),
+                finalizado=finalizado)
+        return tarea
+
+    def test_asignado_al_crear(self):
+        tarea = self.crear_tarea()
+        self.assertEqual(tarea.proyecto_id, self.origen.id)
+        self.assertEqual(set(Proyecto_Actividad.objects.filter(tarea=tarea).values_list('proyecto_id', flat=True)),
+            {self.origen.id})
+
+    def versiones(self):
+        return dict(Proyecto.objects.filter(id__in=[self.origen.id, self.destino.id]).values_list('id', 'version'))
+
+    def comentar(self, tipo, objeto):
+        usuario = get_user_model().objects.get_or_create(username='comentarios')[0]
+        return Comentario.objects.create(descripcion='<p>Comentario</p>', tipo=tipo, obj_id=str(objeto.id), usuario=usuario)
+
+    def assertMovidos(self, objetos, comentarios, anteriores):
+        for proyecto_id, version in self.versiones().items():
+            self.assertGreater(version, anteriores[proyecto_id])
+        for tipo, objeto in objetos:
+            self.assertEqual(Busqueda_Documento.objects.get(tipo=tipo, obj_uuid=objeto.id).proyecto_id, self.destino.id)
+        for comentario in comentarios:
+            comentario.refresh_from_db()
+            self.assertEqual(comentario.proyecto_id, self.destino.id)
+            self.assertEqual(Busqueda_Documento.objects.get(tipo='C', obj_uuid=comentario.id).proyecto_id, self.destino.id)
+        self.assertEqual(acumulados.verificar([self.origen.id, self.destino.id]), [])
+
+    def test_tarea_cambia_de_fase(self):
+        tarea = self.crear_tarea()
+        actividad = Proyecto_Actividad.objects.filter(tarea=tarea).first()
+        comentarios = [self.comentar('T', tarea), self.comentar('A', actividad)]
+        anteriores = self.versiones()
+        tarea.fase = self.fase_destino
+        tarea.save()
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.proyecto_id, self.destino.id)
+        self.assertEqual(Proyecto_Actividad.objects.filter(proyecto=self.destino).count(), 2)
+        self.assertFalse(Proyecto_Actividad.objects.filter(proyecto=self.origen).exists())
+        self.assertMovidos([('T', tarea), ('A', actividad)], comentarios, anteriores)
+
+    def test_actividad_cambia_de_tarea(self):
+        actividad = Proyecto_Actividad.objects.filter(tarea=self.crear_tarea()).first()
+        comentarios = [self.comentar('A', actividad)]
+        anteriores = self.versiones()
+        actividad.tarea = Proyecto_Tarea.objects.create(fase=self.fase_destino, descripcion='Destino')
+        actividad.save()
+        self.assertEqual(actividad.proyecto_id, self.destino.id)
+        self.assertMovidos([('A', actividad)], comentarios, anteriores)
+
+    def test_fase_cambia_de_proyecto(self):
+        tarea = self.crear_tarea()
+        actividad = Proyecto_Actividad.objects.filter(tarea=tarea).first()
+        comentarios = [self.comentar('F', self.fase), self.comentar('T', tarea), self.comentar('A', actividad)]
+        anteriores = self.versiones()
+        self.fase.proyecto = self.destino
+        self.fase.correlativo = 2
+        self.fase.descripcion = 'Fase movida'
+        self.fase.save()
+        self.assertTrue(Proyecto_Tarea.objects.filter(id=tarea.id, proyecto=self.destino).exists())
+        self.assertEqual(Proyecto_Actividad.objects.filter(proyecto=self.destino).count(), 2)
+        self.assertMovidos([('F', self.fase), ('T', tarea), ('A', actividad)], comentarios, anteriores)
+
+    def test_resolver_objetos(self):
+        tarea = self.crear_tarea()
+        actividad = Proyecto_Actividad.objects.filter(tarea=tarea).first()
+        esperados = {
+            self.comentar('P', self.origen).id: ('Proyecto: Origen', {'pk': self.origen.id}),
+            self.comentar('P', self.origen).id: ('Proyecto: Origen', {'pk': self.origen.id}),
+            self.comentar('F', self.fase).id: ('Fase: Fase 1', {'pk': self.origen.id, 'faseactiva': self.fase.id}),
+            self.comentar('T', tarea).id: ('Tarea: Tarea', {'pk': self.origen.id, 'faseactiva': self.fase.id}),
+            self.comentar('A', actividad).id: ('Actividad: Actividad', {'pk': self.origen.id, 'faseactiva': self.fase.id}),
+        }
+        eliminado = self.comentar('T', Proyecto_Tarea.objects.create(fase=self.fase, descripcion='Eliminada'))
+        Proyecto_Tarea.objects.filter(descripcion='Eliminada').delete()
+
+        # la lista y una consulta por tipo presente
+        with self.assertNumQueries(5):
+            comentarios = Comentario.resolver_objetos(list(Comentario.objects.all()))
+        with self.assertNumQueries(0):
+            resueltos = {comentario.id: (str(comentario.get_objeto()), comentario.url_detail()) for comentario in comentarios}
+        self.assertEqual(resueltos.pop(eliminado.id)[1], None)
+        self.assertEqual(resueltos, {comentario_id: (etiqueta, reverse('seguimiento:detail_proyecto', kwargs=kwargs))
+            for comentario_id, (etiqueta, kwargs) in esperados.items()})
+
+    def test_comentario_obj_id_invalido(self):
+        usuario = get_user_model().objects.create_user(username='comentario')
+        comentario = Comentario.objects.create(descripcion='<p>x</p>', tipo='F', obj_id='no-es-uuid', usuario=usuario)
+        self.assertIsNone(comentario.obj_uuid)
+        self.assertIsNone(comentario.proyecto_id)
+        form = Proyecto_Comentario_ModelForm(data={'descripcion': '<p>x</p>', 'tipo': 'F', 'obj_id': 'no-es-uuid'})
+        self.assertIn('obj_id', form.errors)
+        form = Proyecto_Comentario_ModelForm(data={'descripcion': '<p>x</p>', 'tipo': 'F', 'obj_id': str(self.fase.id)})
+        self.assertTrue(form.is_valid())
+        inexistente = Comentario.objects.create(descripcion='<p>x</p>', tipo='P', obj_id=str(uuid.uuid4()), usuario=usuario)
+        self.assertIsNone(inexistente.proyecto_id)
+
+    def test_comentario_obj_id_invalido_redirige(self):
+        usuario = get_user_model().objects.create_user(username='comentario')
+        usuario.user_permissions.set(Permission.objects.filter(content_type__app_label='seguimiento'))
+        self.client.force_login(usuario)
+        detalle = reverse('seguimiento:detail_proyecto', kwargs={'pk': self.origen.id})
+        response = self.client.post(f"{reverse('seguimiento:create_comentario')}?next={detalle}",
+            {'descripcion': '<p>x</p>', 'tipo': 'F', 'obj_id': 'abc'})
+        self.assertRedirects(response, detalle, fetch_redirect_response=False)
+        self.assertFalse(Comentario.objects.exists())
+
+
+class ReporteTrabajoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(username='reportes')
+        cls.usuario.user_permissions.set(Permission.objects.filter(content_type__app_label='seguimiento',
+            codename='view_proyecto'))
+        cls.proyecto = crear_proyecto('Reportes', fases=1, tareas=2, finalizados=(0, 100))
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp(prefix='seguimiento_reportes_')
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        configuracion = override_settings(SEGUIMIENTO_REPORTES_DIR=directorio, SEGUIMIENTO_REPORTES_HILOS=0)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+    def test_procesar_y_reutilizar(self):
+        trabajo = reportes.encolar('A', self.proyecto.id, self.usuario)
+        self.assertEqual(trabajo.estado, 'P')
+        self.assertTrue(reportes.procesar_trabajo(trabajo.id))
+        self.assertFalse(reportes.procesar_trabajo(trabajo.id))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'F')
+        self.assertIsNotNone(trabajo.inicio)
+        self.assertIsNotNone(trabajo.finalizacion)
+        self.assertTrue(os.path.exists(reportes.ruta_reporte(trabajo.archivo)))
+
+        # misma versión de los datos: se reutiliza el archivo
+        repetido = reportes.encolar('A', self.proyecto.id, self.usuario)
+        self.assertEqual((repetido.estado, repetido.archivo), ('F', trabajo.archivo))
+
+        Proyecto_Fase.objects.create(proyecto=self.proyecto, correlativo=2, descripcion='Nueva')
+        nuevo = reportes.encolar('A', self.proyecto.id, self.usuario)
+        self.assertEqual(nuevo.estado, 'P')
+        self.assertNotEqual(nuevo.archivo, trabajo.archivo)
+
+    def test_error(self):
+        trabajo = reportes.encolar('C', self.proyecto.id, self.usuario, date(2024, 1, 1), date(2024, 12, 31))
+        with mock.patch.object(reportes, 'generar_reporte', side_effect=RuntimeError('sin espacio')), \
+                self.assertLogs(reportes.logger, 'ERROR'):
+            self.assertTrue(reportes.procesar_trabajo(trabajo.id))
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.error), ('X', 'sin espacio'))
+        self.assertFalse(os.listdir(reportes.directorio_reportes()))
+
+    def test_responsables_historial(self):
+        registrador = get_user_model().objects.create_user(username='registrador')
+        responsable = get_user_model().objects.create_user(username='responsable')
+        Historial = Proyecto_Actividad.history.model
+        actividades = list(Proyecto_Actividad.objects.filter(proyecto=self.proyecto).order_by('id'))
+        con_registro, sin_registro, asignada = actividades[0], actividades[1], actividades[2]
+        Historial.objects.filter(id__in=[a.id for a in actividades if a != sin_registro]).update(history_user=registrador)
+        for actividad in actividades:
+            # modificaciones posteriores de otro usuario
+            for avance in (10, 20):
+                actividad.finalizado = avance
+                actividad._history_user = self.usuario
+                actividad.save()
+        asignada.responsable = responsable
+        asignada.save()
+
+        with self.assertNumQueries(2):
+            registradores = reportes.responsables_historial(Proyecto_Actividad.objects.filter(proyecto=self.proyecto))
+        self.assertEqual(registradores[con_registro.id].id, registrador.id)
+        self.assertNotIn(sin_registro.id, registradores)
+        self.assertNotIn(asignada.id, registradores)
+        self.assertEqual(len(registradores), len(actividades) - 2)
+
+    def test_reiniciar_interrumpidos(self):
+        antes = timezone.now() - timedelta(hours=2)
+        detenido = reportes.encolar('A', self.proyecto.id, self.usuario)
+        en_cola = reportes.encolar('C', self.proyecto.id, self.usuario)
+        Reporte_Trabajo.objects.filter(id=detenido.id).update(estado='E', inicio=antes)
+        # esperó en la cola, pero fue tomado recién
+        Reporte_Trabajo.objects.filter(id=en_cola.id).update(estado='E', creacion=antes, inicio=timezone.now())
+        self.assertEqual(reportes.reiniciar_interrumpidos(30), 1)
+        self.assertEqual(dict(Reporte_Trabajo.objects.values_list('id', 'estado')), {detenido.id: 'P', en_cola.id: 'E'})
+
+    def test_estado_y_descarga(self):
+        trabajo = reportes.encolar('A', self.proyecto.id, self.usuario)
+        estado = reverse('seguimiento:estado_reportetrabajo', kwargs={'pk': trabajo.id})
+        descarga = reverse('seguimiento:descarga_reportetrabajo', kwargs={'pk': trabajo.id})
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(estado).json()['estado'], 'P')
+        self.assertEqual(self.client.get(descarga).status_code, 404)
+
+        reportes.procesar_trabajo(trabajo.id)
+        self.assertEqual(self.client.get(estado).json()['descarga'], descarga)
+        response = self.client.get(descarga)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))     # xlsx (zip)
+        response.close()
+        self.assertEqual(self.client.get(descarga, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        otro = get_user_model().objects.create_user(username='otro')
+        otro.user_permissions.set(self.usuario.user_permissions.all())
+        self.client.force_login(otro)
+        self.assertEqual(self.client.get(estado).status_code, 404)
+        self.assertEqual(self.client.get(descarga).status_code, 404)
+
+
+class DatosPruebaTests(TestCase):
+    def test_generar(self):
+        escala = dict(proyectos=2, fases=2, tareas=3, actividades=2, etiquetas=3, usuarios=2, comentarios=4, historial=2)
+        proyecto_ids, totales = datos_prueba.generar(semilla=1, **escala)
+        self.assertEqual(len(proyecto_ids), 2)
+        self.assertEqual(totales['actividades'], 2*2*3*2)
+        self.assertEqual(Proyecto_Actividad.objects.filter(proyecto_id__in=proyecto_ids).count(), 24)
+        # creación más dos modificaciones por actividad
+        tareas = Proyecto_Tarea.objects.filter(proyecto_id__in=proyecto_ids).values('id')
+        self.assertEqual(Proyecto_Actividad.history.filter(tarea_id__in=tareas).count(), 24 * 3)
+        self.assertEqual(acumulados.verificar(proyecto_ids), [])
+
+    def test_misma_semilla(self):
+        escala = dict(proyectos=2, fases=1, tareas=2, actividades=1, comentarios=2)
+        generados = []
+        for _ in range(2):
+            with transaction.atomic():
+                proyecto_ids, _ = datos_prueba.generar(semilla=7, **escala)
+                generados.append((proyecto_ids, list(Proyecto.objects.filter(id__in=proyecto_ids)
+                    .order_by('nombre').values_list('nombre', flat=True)), set(Proyecto_Actividad.objects
+                    .filter(proyecto_id__in=proyecto_ids).values_list('id', 'descripcion'))))
+                transaction.set_rollback(True)
+        self.assertEqual(generados[0], generados[1])
+
+    def test_escala_desconocida(self):
+        with self.assertRaises(ValueError):
+            datos_prueba.generar(paginas=1)
+
+
+class RendimientoTests(TestCase):
+    def test_medir_escala_revierte(self):
+        proyectos = Proyecto.objects.count()
+        resultado = rendimiento.medir_escala(1, repeticiones=1, fases=1, tareas=2, actividades=2, comentarios=2)
+        self.assertEqual(Proyecto.objects.count(), proyectos)
+        self.assertEqual(set(resultado['vistas']), {'proyecto_detalle', 'accordion_fase', 'lista_tareas',
+            'lista_actividades', 'lista_comentarios', 'reporte_avances', 'reporte_actividades'})
+        for vista, metricas in resultado['vistas'].items():
+            self.assertEqual(metricas['estado'], 200, vista)
+
+    def test_comparar(self):
+        base = {'escalas': {'10': {'vistas': {'lista_tareas': {'consultas': 5, 'tiempo_ms': 100, 'memoria_kb': 500}}}}}
+        actual = {'escalas': {'10': {'vistas': {
+            'lista_tareas': {'consultas': 6, 'tiempo_ms': 120, 'memoria_kb': 800},
+            'lista_actividades': {'consultas': 50, 'tiempo_ms': 900, 'memoria_kb': 900},
+        }}}}
+        self.assertEqual(rendimiento.comparar(actual, base, tolerancia=0.25), [
+            ('10', 'lista_tareas', 'consultas', 5, 6),
+            ('10', 'lista_tareas', 'memoria_kb', 500, 800),
+        ])
+
+
+class InstrumentacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_superuser(username='instrumentacion', password='instrumentacion')
+        for p in range(3):
+            crear_proyecto(f'Instrumentado {p}', fases=2, tareas=5, finalizados=(0, 100))
+
+    def test_huella(self):
+        self.assertEqual(huella("SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 'a' AND y = 3"),
+            'SELECT * FROM t WHERE id IN (...) AND x = ? AND y = ?')
+
+    def test_presupuesto_excedido(self):
+        with self.assertRaises(AssertionError):
+            with presupuesto_consultas(1):
+                list(Estado.objects.all())
+                list(Estado.objects.all())
+
+    def test_consultas_repetidas_y_origen(self):
+        with presupuesto_consultas() as registro:
+            for proyecto in Proyecto.objects.all():
+                proyecto.estado.descripcion
+        grupos = list(registro.duplicadas().values())
+        self.assertEqual([len(grupo) for grupo in grupos], [3])
+        self.assertTrue(grupos[0][0]['codigo'].startswith('tests.py:'))
+        with self.assertRaises(AssertionError):
+            registro.verificar(duplicadas=0)
+
+    def test_presupuesto_declarado(self):
+        proyecto = Proyecto.objects.first()
+        request = RequestFactory().get(f'/seguimiento/proyecto/arbol/{proyecto.id}')
+        request.user = self.usuario
+        with presupuesto_consultas() as registro:
+            response = arbol_proyecto_json(request, pk=proyecto.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(registro.presupuesto, 10)
+
+    def test_presupuesto_vistas(self):
+        proyecto = Proyecto.objects.first()
+        fase = Proyecto_Fase.objects.filter(proyecto=proyecto).first()
+        solicitudes = {
+            'detalle':      (reverse('seguimiento:detail_proyecto', kwargs={'pk': proyecto.id}), {}),
+            'accordion':    (reverse('seguimiento:accordion_tareaactividad'), {'obj_id': str(fase.id)}),
+            'tareas':       (reverse('seguimiento:list_proyectotarea'), {}),
+            'actividades':  (reverse('seguimiento:list_proyectoactividad'), {'valor': 'estado:pendiente'}),
+            'comentarios':  (reverse('seguimiento:list_comentario', kwargs={'pk': proyecto.id}), {}),
+        }
+        self.client.force_login(self.usuario)
+        for nombre, (url, datos) in solicitudes.items():
+            cache.clear()       # sin fragmentos ni totales de paginación
+            with self.subTest(nombre):
+                with presupuesto_consultas() as registro:
+                    response = self.client.get(url, datos)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNotNone(registro.presupuesto)
+
+    @override_settings(SEGUIMIENTO_INSTRUMENTACION=True)
+    def test_middleware_registra(self):
+        @presupuesto(1)
+        def vista(request):
+            list(Estado.objects.all())
+            list(Estado.objects.all())
+            return HttpResponse()
+
+        with self.assertLogs(logger, 'WARNING') as registros:
+            response = InstrumentacionMiddleware(vista)(RequestFactory().get('/'))
+        self.assertEqual((response['X-Seguimiento-Consultas'], response['X-Seguimiento-Presupuesto']), ('2', '1'))
+        self.assertIn('EXCEDIDO', registros.output[0])
+
+
+class MemoizacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.proyecto = crear_proyecto('Memorizado')
+
+    def setUp(self):
+        # proy_expira fijo: las consultas contadas son sólo las del proyecto
+        configuracion = mock.patch.object(conf, 'configuracion', mock.Mock(**{'get_value.return_value': '1'}))
+        configuracion.start()
+        self.addCleanup(configuracion.stop)
+        conf.invalidar()
+        self.addCleanup(conf.invalidar)
+
+    def en_solicitud(self, funcion):
+        resultado = []
+        CacheSolicitudMiddleware(lambda request: resultado.append(funcion()))(RequestFactory().get('/'))
+        return resultado[0]
+
+    def test_modificable_una_consulta_por_solicitud(self):
+        def evaluar():
+            with self.assertNumQueries(1):
+                valores = [Proyecto.es_modificable(self.proyecto.id) for _ in range(3)]
+                valores.append(self.proyecto.get_modificable())
+            return valores
+
+        self.assertEqual(self.en_solicitud(evaluar), [True] * 4)
+        # fuera de una solicitud no se memoriza
+        with self.assertNumQueries(2):
+            Proyecto.es_modificable(self.proyecto.id)
+            Proyecto.es_modificable(self.proyecto.id)
+
+    def test_modificable_invalidado(self):
+        def evaluar():
+            valores = [Proyecto.es_modificable(self.proyecto.id)]
+            estado = Estado.objects.get(id=self.proyecto.estado_id)
+            estado.bloquea = True
+            estado.save()
+            valores.append(Proyecto.es_modificable(self.proyecto.id))
+
+            self.proyecto.estado = Estado.objects.create(descripcion='Abierto')
+            self.proyecto.save()
+            with self.assertNumQueries(1):
+                valores.append(Proyecto.es_modificable(self.proyecto.id))
+                valores.append(Proyecto.es_modificable(self.proyecto.id))
+            return valores
+
+        self.assertEqual(self.en_solicitud(evaluar), [True, False, True, True])
+
+    def test_configuracion_ttl(self):
+        reloj = [100.0]
+        cache_conf = ConfiguracionCache(ttl=60)
+        cache_conf.configuracion = mock.Mock(**{'get_value.side_effect': ['a', 'b', 'c', 'd', 'e', 'f', 'g']})
+        with mock.patch('time.monotonic', side_effect=lambda: reloj[0]):
+            self.assertEqual([cache_conf.get_value('s', 'x'), cache_conf.get_value('s', 'x')], ['a', 'a'])
+            reloj[0] += 61
+            self.assertEqual(cache_conf.get_value('s', 'x'), 'b')
+
+            cache_conf.invalidar('s', 'x')
+            self.assertEqual(cache_conf.get_value('s', 'x'), 'c')
+            self.assertEqual([cache_conf.get_value('s', 'y'), cache_conf.get_value('t', 'x')], ['d', 'e'])
+            cache_conf.invalidar('s')
+            self.assertEqual([cache_conf.get_value('s', 'x'), cache_conf.get_value('s', 'y'),
+                cache_conf.get_value('t', 'x')], ['f', 'g', 'e'])
+            cache_conf.invalidar()
+            with self.assertRaises(StopIteration):
+                cache_conf.get_value('t', 'x')
+        self.assertEqual(cache_conf.configuracion.get_value.call_count, 8)
+
+        with override_settings(SEGUIMIENTO_CONFIGURACION_TTL=5):
+            self.assertEqual(ConfiguracionCache().get_ttl(), 5)
+
+
+class TextoTests(TestCase):
+    def setUp(self):
+        conversion = mock.patch.object(texto.html2text, 'html2text', wraps=texto.html2text.html2text)
+        self.html2text = conversion.start()
+        self.addCleanup(conversion.stop)
+
+    def test_reutiliza_html_identico(self):
+        texto._cache.limpiar()
+        self.addCleanup(texto._cache.limpiar)
+        resultados = {texto.texto_plano('<p>Comentario</p>') for _ in range(3)}
+        self.assertEqual([resultado.strip() for resultado in resultados], ['Comentario'])
+        self.assertEqual(self.html2text.call_count, 1)
+        self.assertEqual(texto.texto_plano(''), '')
+        self.assertEqual(self.html2text.call_count, 1)
+
+    @override_settings(SEGUIMIENTO_TEXTO_CACHE=2)
+    def test_descarta_menos_utilizado(self):
+        cache_texto = texto.TextoCache()
+        for html in ('<p>a</p>', '<p>b</p>', '<p>a</p>', '<p>c</p>'):    # c descarta b (a se utilizó después)
+            cache_texto.convertir(html)
+        self.assertEqual(self.html2text.call_count, 3)
+        cache_texto.convertir('<p>a</p>')
+        self.assertEqual(self.html2text.call_count, 3)
+        cache_texto.convertir('<p>b</p>')
+        self.assertEqual(self.html2text.call_count, 4)
+        self.assertEqual(len(cache_texto._valores), 2)
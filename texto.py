@@ -0,0 +1,53 @@
+'''
+    Conversión de HTML (campos CKEditor) a texto plano con cache por contenido.
+
+    La llave es el hash del HTML, por lo que un registro sin cambios reutiliza la conversión
+    sin importar el objeto de donde provenga. El cache es por proceso, con un máximo de
+    SEGUIMIENTO_TEXTO_CACHE entradas (5000 por defecto) y descarte de la menos utilizada.
+'''
+import hashlib, html2text
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+
+class TextoCache:
+    def __init__(self, maximo=None):
+        self.maximo = maximo
+        self._valores = OrderedDict()
+        self._lock = Lock()
+
+    def get_maximo(self):
+        if self.maximo is not None:
+            return self.maximo
+        return getattr(settings, 'SEGUIMIENTO_TEXTO_CACHE', 5000)
+
+    def convertir(self, html):
+        if not html:
+            return ''
+        llave = hashlib.blake2b(html.encode(), digest_size=16).digest()
+        with self._lock:
+            if llave in self._valores:
+                self._valores.move_to_end(llave)
+                return self._valores[llave]
+
+        texto = html2text.html2text(html)
+        with self._lock:
+            self._valores[llave] = texto
+            while len(self._valores) > self.get_maximo():
+                self._valores.popitem(last=False)
+        return texto
+
+    def limpiar(self):
+        with self._lock:
+            self._valores.clear()
+
+_cache = TextoCache()
+
+
+def texto_plano(html):
+    '''
+        Texto plano (markdown de html2text) del HTML indicado
+    '''
+    return _cache.convertir(html)
@@ -37,6 +37,8 @@ urlpatterns = [
     path('proyecto/ver/<uuid:pk>/<uuid:faseactiva>', views.ProyectoDetailView.as_view(), name='detail_proyecto'),
     path('proyecto/ver/<uuid:pk>/<str:opcion>', views.ProyectoDetailView.as_view(), name='detail_proyecto'),
     path('proyecto/actualizar/<uuid:pk>', views.ProyectoUpdateView.as_view(), name='update_proyecto'),
+    path('proyecto/clonar/<uuid:pk>', views.ProyectoClonacionFormView.as_view(), name='clonar_proyecto'),
+    path('proyecto/arbol/<uuid:pk>', views.arbol_proyecto_json, name='arbol_proyecto'),
     path('proyecto/eliminar/<uuid:pk>', views.ProyectoDeleteView.as_view(), name='delete_proyecto'),
 
     path('usuario/nuevo/', views.Proyecto_UsuarioFormView.as_view(), name='create_proyectousuario'),
@@ -70,6 +72,7 @@ urlpatterns = [
     path('actividad/ver/hist/<uuid:pk>', views.Proyecto_ActividadHistDetailView.as_view(), name='histdetail_proyectoactividad'),
     path('actividad/actualizar/<uuid:pk>', views.Proyecto_ActividadUpdateView.as_view(), name='update_proyectoactividad'),
     path('actividad/eliminar/<uuid:pk>', views.Proyecto_ActividadDeleteView.as_view(), name='delete_proyectoactividad'),
+    path('actividad/masiva/', views.actualizacion_masiva_actividad, name='masiva_proyectoactividad'),
     path('fase/tarea/', views.combo_fase_tarea, name='combo_fasetarea'),
     path('accordion/tarea/actividad/', views.accordion_tarea_actividad, name='accordion_tareaactividad'),
     path('pendiente/pendiente/', views.tabla_pendiente, name='tabla_pendiente'),
@@ -81,5 +84,9 @@ urlpatterns = [
 
     path('reporte/avance/proyecto', views.ReporteAvancesFormView.as_view(), name='reporte_avance_proyecto'),
     path('reporte/actividades', views.ReporteActividadesFormView.as_view(), name='reporte_actividades_proyecto'),
+    path('importacion/', views.Proyecto_ImportacionFormView.as_view(), name='importacion_proyecto'),
+    path('reporte/trabajo/<uuid:pk>/estado', views.estado_reporte_trabajo, name='estado_reportetrabajo'),
+    path('reporte/trabajo/<uuid:pk>/descarga', views.descarga_reporte_trabajo, name='descarga_reportetrabajo'),
     path('proyecto/usuario/', views.combo_proyecto_usuario, name='combo_proyectousuario'),
+    path('busqueda/', views.busqueda_general, name='busqueda'),
 ]
@@ -0,0 +1,102 @@
+'''
+    Versión de los datos de cada proyecto, para invalidar caches y responder GET condicionales.
+
+    Proyecto.version se incrementa con F() (en la misma transacción del cambio) al crear,
+    modificar o eliminar el proyecto o sus fases, tareas, actividades, etiquetas, objetivos,
+    metas, usuarios o comentarios, y al modificar su estado o renombrar a su líder o a un
+    responsable de sus actividades (ver signals.py). Las operaciones masivas, que no emiten
+    señales, la incrementan explícitamente. version_fecha es el momento del último cambio.
+'''
+import hashlib, uuid
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .memoizacion import memo_solicitud, invalidar_solicitud
+from .models import Proyecto
+
+
+def incrementar(*proyecto_ids, **filtro):
+    '''
+        Incrementa la versión de los proyectos indicados por id o por un filtro sobre Proyecto
+        (p.ej. proyecto_fase=fase_id), en una sola consulta
+    '''
+    proyecto_ids = [proyecto_id for proyecto_id in proyecto_ids if proyecto_id]
+    if proyecto_ids:
+        filtro['id__in'] = proyecto_ids
+    elif not filtro:
+        return
+    Proyecto.objects.filter(**filtro).update(version=F('version') + 1, version_fecha=timezone.now())
+    invalidar_solicitud(espacio='version')
+
+def version_proyecto(proyecto_id):
+    '''
+        (version, version_fecha) del proyecto, consultada una vez por solicitud; None si no existe
+    '''
+    try:
+        proyecto_id = uuid.UUID(str(proyecto_id))
+    except ValueError:
+        return None
+    return memo_solicitud(('version', proyecto_id),
+        lambda: Proyecto.objects.filter(id=proyecto_id).values_list('version', 'version_fecha').first())
+
+def etag_usuario(request, proyecto_id):
+    '''
+        ETag de una página generada para el usuario: además de la versión del proyecto
+        depende del usuario (permisos), del token CSRF de sus formularios y de la fecha
+        (los proyectos dejan de ser modificables al expirar)
+    '''
+    datos = version_proyecto(proyecto_id)
+    if datos is None:
+        return None
+    llave = repr((str(proyecto_id), datos[0], request.user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+        date.today()))
+    return hashlib.blake2b(llave.encode(), digest_size=16).hexdigest()
+
+def ultima_modificacion(proyecto_id):
+    datos = version_proyecto(proyecto_id)
+    return datos[1] if datos else None
+
+def mensajes_pendientes(request):
+    '''
+        True si hay mensajes (django.contrib.messages) por mostrar: la página no es la que el
+        cliente tiene en cache aunque los datos no hayan cambiado (p.ej. errores de un formulario
+        que redirige al detalle). len() no marca los mensajes como leídos.
+    '''
+    return len(messages.get_messages(request)) > 0
+
+def condicional(proyecto_de):
+    '''
+        Decorador de vistas que dependen de un proyecto: responde 304 si el cliente ya tiene la
+        versión vigente (If-None-Match / If-Modified-Since). proyecto_de(request, *args, **kwargs)
+        devuelve el id del proyecto, o None para responder sin condiciones. Con mensajes
+        pendientes se responde sin condiciones.
+    '''
+    def proyecto(request, *args, **kwargs):
+        return None if mensajes_pendientes(request) else proyecto_de(request, *args, **kwargs)
+
+    def etag(request, *args, **kwargs):
+        proyecto_id = proyecto(request, *args, **kwargs)
+        return etag_usuario(request, proyecto_id) if proyecto_id else None
+
+    def modificacion(request, *args, **kwargs):
+        proyecto_id = proyecto(request, *args, **kwargs)
+        return ultima_modificacion(proyecto_id) if proyecto_id else None
+
+    def decorador(vista):
+        vista_condicional = condition(etag_func=etag, last_modified_func=modificacion)(vista)
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            response = vista_condicional(request, *args, **kwargs)
+            if response is not None and response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return envoltura
+    return decorador
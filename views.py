@@ -1,16 +1,19 @@
-# https://xlsxwriter.readthedocs.io/
-import io, xlsxwriter, html2text
-from datetime import date, timedelta
-from itertools import chain
+import json, os, uuid
+from datetime import date
 
 from django.apps import apps
 from django.contrib import messages
-from django.db.models import Q, Count, Case, When, BooleanField
-from django.http import FileResponse, HttpResponseRedirect #, HttpResponse
-from django.shortcuts import redirect, render
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, JsonResponse, Http404
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.utils.safestring import mark_safe
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext as _
+from django.views.decorators.http import condition
 from django.views.generic.base import TemplateView
 
 from usuarios.models import Usuario
@@ -20,11 +23,23 @@ from usuarios.personal_views import (PersonalContextMixin, PersonalCreateView,
 
 from .models import (Estado, Tipo_Proyecto, Origen_Proyecto, PM_Proyecto, Proyecto, Proyecto_Objetivo, 
     Proyecto_Meta, Proyecto_Fase, Proyecto_Tarea, Proyecto_Actividad, Proyecto_Usuario, 
-    Proyecto_Etiqueta, Comentario)
+    Proyecto_Etiqueta, Comentario, Reporte_Trabajo)
 from .forms import (ProyectoForm, Proyecto_Objetivo_ModelForm, Proyecto_Meta_ModelForm,
     Proyecto_Fase_ModelForm, Proyecto_Tarea_ModelForm, Proyecto_Usuario_ModelForm, 
     Proyecto_Etiqueta_ModelForm, Proyecto_Comentario_ModelForm, Proyecto_Actividad_ModelForm, 
-    Proyecto_Reporte_Avances, Proyecto_Reportes_Actividades)
+    Proyecto_Reporte_Avances, Proyecto_Reportes_Actividades, Proyecto_Importacion_Form, Proyecto_Clonacion_Form)
+from .progreso import avance_tareas, porcentaje_fases, porcentaje_proyectos
+from .reportes import encolar, ruta_reporte
+from .busqueda import buscar
+from .consulta import filtrar
+from .masivo import actualizar_actividades
+from .arbol import arbol_proyecto, version_arbol
+from .importacion import importar
+from .paginacion import PaginacionLlaveMixin
+from .fragmentos import llave_accordion, get_ttl as fragmentos_ttl
+from .instrumentacion import presupuesto
+from .versiones import condicional
+from .visibilidad import filtro_visible
 
 #gConfiguracion = Configuracion()
 
@@ -49,6 +64,15 @@ DISPLAYS = {
     'tabla_vacia': _('No hay elementos para mostrar'),
 }
 
+def aplicar_busqueda(request, queryset, esquema):
+    '''
+        Filtra el queryset con la consulta del parámetro valor (ver consulta.py)
+    '''
+    queryset, errores = filtrar(queryset, request.GET.get('valor', ''), esquema)
+    for error in errores:
+        messages.warning(request, error)
+    return queryset
+
 class SeguimientoContextMixin(PersonalContextMixin):
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
@@ -574,6 +598,7 @@ class ProyectoListView(PersonalListView, SeguimientoContextMixin):
         'campos_extra': [
             { 'nombre': _('Periodo'), 'funcion': 'get_periodo', },
             { 'nombre':   _('Resumen'), 'funcion': 'get_resumen', },
+            { 'nombre': _('% Completado'), 'porcentaje': 'porcentaje_completado', },
         ],
         'opciones': DISPLAYS['opciones'],
         'mensaje': {
@@ -583,13 +608,15 @@ class ProyectoListView(PersonalListView, SeguimientoContextMixin):
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        if self.request.user.has_perm('seguimiento.proyect_admin'):
-            return queryset.select_related('estado')
-        proys = Proyecto_Usuario.objects.filter(usuario=self.request.user.id).values_list('proyecto')
-        return queryset.select_related('estado').filter(Q(publico=True)|Q(id__in=proys))
+        return queryset.select_related('estado').filter(filtro_visible(self.request.user))
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
+        proyectos = context['object_list']
+        porcentajes = porcentaje_proyectos([proyecto.id for proyecto in proyectos])
+        for proyecto in proyectos:
+            proyecto.porcentaje_completado = porcentajes.get(proyecto.id, 0.0)
+
         context['permisos'] = {
             'create': self.request.user.has_perm('seguimiento.add_proyecto'),
             'update': self.request.user.has_perm('seguimiento.change_proyecto'),
@@ -614,6 +641,29 @@ class ProyectoCreateView(PersonalCreateView, SeguimientoContextMixin):
         Proyecto_Usuario(proyecto=self.object, usuario=self.request.user).save()
         return redirect('seguimiento:detail_proyecto', pk=self.object.id)
 
+class ProyectoClonacionFormView(PersonalFormView, SeguimientoContextMixin):
+    permission_required = 'seguimiento.add_proyecto'
+    template_name = 'template/forms.html'
+    form_class = Proyecto_Clonacion_Form
+    extra_context = {
+        'title': _('Clonar proyecto'),
+        'opciones': DISPLAYS['forms'],
+    }
+
+    def get_origen(self):
+        return get_object_or_404(Proyecto.objects.filter(filtro_visible(self.request.user)), id=self.kwargs['pk'])
+
+    def get_initial(self):
+        return {'nombre': _('Copia de ') + self.get_origen().nombre}
+
+    def form_valid(self, form, *args, **kwargs):
+        data = form.cleaned_data
+        proyecto = self.get_origen().clonar(data['nombre'], self.request.user, data['finicio'])
+        messages.success(self.request, _('Proyecto clonado'))
+        return redirect('seguimiento:detail_proyecto', pk=proyecto.id)
+
+@method_decorator(presupuesto(60), name='dispatch')
+@method_decorator(condicional(lambda request, pk, **kwargs: pk), name='get')
 class ProyectoDetailView(PersonalDetailView, SeguimientoContextMixin):
     permission_required = 'seguimiento.view_proyecto'
     template_name = 'seguimiento/detail.html'
@@ -636,11 +686,8 @@ class ProyectoDetailView(PersonalDetailView, SeguimientoContextMixin):
         queryset = super().get_queryset()
         queryset = queryset.select_related('estado').select_related('tipo')\
             .select_related('lider').select_related('origen').select_related('pm')\
-            .filter(id = self.kwargs['pk'])
-        if self.request.user.has_perm('seguimiento.proyect_admin') or queryset.filter(publico=True) or \
-            Proyecto_Usuario.objects.filter(usuario=self.request.user, proyecto_id=self.kwargs['pk']).count():
-            return queryset
-        return None
+            .filter(filtro_visible(self.request.user), id = self.kwargs['pk'])
+        return queryset
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
@@ -676,6 +723,22 @@ class ProyectoDetailView(PersonalDetailView, SeguimientoContextMixin):
                 'img': 'seguimiento_comentario.png',
                 'target': '_blank',
             })
+        if not estado_bloqueado and self.request.user.has_perm('seguimiento.add_proyecto_actividad'):
+            botones.append({
+                'permiso': self.request.user.has_perm('seguimiento.add_proyecto_actividad'),
+                'url': reverse_lazy('seguimiento:importacion_proyecto')+'?proyecto='+str(self.object.id),
+                'display': 'Importar',
+                'img': 'seguimiento_add.png',
+                'target': '_self',
+            })
+        if self.request.user.has_perm('seguimiento.add_proyecto'):
+            botones.append({
+                'permiso': self.request.user.has_perm('seguimiento.add_proyecto'),
+                'url': self.object.url_clonar(),
+                'display': 'Clonar',
+                'img': 'seguimiento_proyecto.png',
+                'target': '_self',
+            })
         context['botones_extra'] = botones
         
         formularios = []
@@ -1184,12 +1247,14 @@ class Proyecto_FaseDeleteView(PersonalDeleteView, SeguimientoContextMixin):
 
 
 
-class Proyecto_TareaListView(PersonalListView, SeguimientoContextMixin):
+@method_decorator(presupuesto(25), name='dispatch')
+class Proyecto_TareaListView(PaginacionLlaveMixin, PersonalListView, SeguimientoContextMixin):
     permission_required = 'seguimiento.view_proyecto_tarea'
-    template_name = 'template/list.html'
+    template_name = 'seguimiento/list.html'
     model = Proyecto_Tarea
     ordering = ['-prioridad', 'creacion', 'descripcion']
     paginate_by = 50
+    paginacion_llave = True
     extra_context = {
         'title': _('Tareas pendientes'),
         'campos': {
@@ -1213,31 +1278,14 @@ class Proyecto_TareaListView(PersonalListView, SeguimientoContextMixin):
     }
 
     def get_queryset(self):
-        try:
-            valor_busqueda = self.request.GET.get('valor').lower()
-        except:
-            valor_busqueda = None
-
-        tareas = Proyecto_Actividad.objects.filter(finalizado__lt = 100).values_list('tarea_id').distinct()
-        queryset = super().get_queryset().filter(proyecto_actividad__isnull=True) | Proyecto_Tarea.objects.filter(id__in = tareas)
-        
-        if valor_busqueda:
-            if 'fase:' in valor_busqueda:
-                fases = Proyecto_Fase.objects.filter(descripcion__icontains=valor_busqueda[5:].replace(' ', ''))
-                queryset = queryset.filter(fase__in=fases)
-            elif 'proyecto:' in valor_busqueda:
-                proyectos = Proyecto.objects.filter(Q(nombre__icontains=valor_busqueda[9:])|Q(descripcion__icontains=valor_busqueda[9:]))
-                queryset = queryset.filter(fase__proyecto__in=proyectos)
-            else:
-                queryset = queryset.filter(descripcion__icontains=valor_busqueda)
-
-        if self.request.user.has_perm('seguimiento.proyect_admin'):
-            return queryset
-        asignados = Proyecto_Usuario.objects.filter(usuario = self.request.user).values_list('proyecto', flat=True) 
-        publicos = Proyecto.objects.filter(publico=True).values_list('id', flat=True)
-
-        queryset = queryset.filter(fase__proyecto__in = chain(asignados, publicos))
-        return queryset
+        '''
+            Una sola consulta: el indicador pendiente y el avance se leen de los acumulados
+            de la tarea, y la fase, proyecto (get_full_parent) y estado (url_update, url_delete)
+            se obtienen con select_related
+        '''
+        queryset = super().get_queryset().select_related('fase__proyecto__estado').filter(pendiente=True)
+        queryset = aplicar_busqueda(self.request, queryset, 'tarea')
+        return queryset.filter(filtro_visible(self.request.user, 'proyecto'))
 
 class Proyecto_TareaFormView(PersonalFormView, SeguimientoContextMixin):
     permission_required = 'seguimiento.add_proyecto_tarea'
@@ -1286,7 +1334,7 @@ class Proyecto_TareaUpdateView(PersonalUpdateView, SeguimientoContextMixin):
 
     def get_success_url(self):
         return reverse_lazy('seguimiento:detail_proyecto', 
-            kwargs={'pk': self.object.fase.proyecto.id, 'faseactiva': self.object.fase.id})
+            kwargs={'pk': self.object.proyecto_id, 'faseactiva': self.object.fase_id})
 
 class Proyecto_TareaDeleteView(PersonalDeleteView, SeguimientoContextMixin):
     permission_required = 'seguimiento.delete_proyecto_tarea'
@@ -1301,15 +1349,17 @@ class Proyecto_TareaDeleteView(PersonalDeleteView, SeguimientoContextMixin):
 
     def get_success_url(self):
         return reverse_lazy('seguimiento:detail_proyecto', 
-            kwargs={'pk': self.object.fase.proyecto.id, 'faseactiva': self.object.fase.id})
+            kwargs={'pk': self.object.proyecto_id, 'faseactiva': self.object.fase_id})
 
 
-class Proyecto_ActividadListView(PersonalListView, SeguimientoContextMixin):
+@method_decorator(presupuesto(25), name='dispatch')
+class Proyecto_ActividadListView(PaginacionLlaveMixin, PersonalListView, SeguimientoContextMixin):
     permission_required = 'seguimiento.view_proyecto_actividad'
-    template_name = 'template/list.html'
+    template_name = 'seguimiento/list.html'
     model = Proyecto_Actividad
     ordering = ['descripcion', '-finalizado', 'creacion']
     paginate_by = 50
+    paginacion_llave = True
     extra_context = {
         'title': _('Buscar actividades'),
         'campos': {
@@ -1332,31 +1382,11 @@ class Proyecto_ActividadListView(PersonalListView, SeguimientoContextMixin):
     }
 
     def get_queryset(self):
-        try:
-            valor_busqueda = self.request.GET.get('valor').lower().strip()
-            queryset = super().get_queryset().select_related('tarea', 'tarea__fase')
-        except:
-            valor_busqueda = ''
-            queryset = super().get_queryset().none()
-
-        
-        if 'tarea:' in valor_busqueda:
-            tareas = Proyecto_Tarea.objects.filter(descripcion__icontains=valor_busqueda[6:].replace(' ', ''))
-            queryset = queryset.filter(tarea__in=tareas)
-        elif 'fase:' in valor_busqueda:
-            fases = Proyecto_Fase.objects.filter(descripcion__icontains=valor_busqueda[5:].replace(' ', ''))
-            queryset = queryset.filter(tarea__fase__in=fases)
-        elif 'proyecto:' in valor_busqueda:
-            proyectos = Proyecto.objects.filter(Q(nombre__icontains=valor_busqueda[9:])|Q(descripcion__icontains=valor_busqueda[9:]))
-            queryset = queryset.filter(tarea__fase__proyecto__in=proyectos)
-        else:
-            queryset = queryset.filter(descripcion__icontains=valor_busqueda)
-
-        asignados = Proyecto_Usuario.objects.filter(usuario = self.request.user).values_list('proyecto', flat=True) 
-        publicos = Proyecto.objects.filter(publico=True).values_list('id', flat=True)
-
-        queryset = queryset.filter(tarea__fase__proyecto__in = chain(asignados, publicos))
-        return queryset
+        if self.request.GET.get('valor') is None:
+            return super().get_queryset().none()
+        queryset = super().get_queryset().select_related('tarea', 'tarea__fase', 'tarea__fase__proyecto')
+        queryset = aplicar_busqueda(self.request, queryset, 'actividad')
+        return queryset.filter(filtro_visible(self.request.user, 'proyecto'))
 
 class Proyecto_ActividadFormView(PersonalFormView, SeguimientoContextMixin):
     permission_required = 'seguimiento.add_proyecto_actividad'
@@ -1431,9 +1461,8 @@ class Proyecto_ActividadUpdateView(PersonalUpdateView, SeguimientoContextMixin):
     }
 
     def get_success_url(self):
-        fase = self.object.tarea.fase
         return reverse_lazy('seguimiento:detail_proyecto', 
-            kwargs={'pk': fase.proyecto.id, 'faseactiva': fase.id})
+            kwargs={'pk': self.object.proyecto_id, 'faseactiva': self.object.tarea.fase_id})
 
 class Proyecto_ActividadDeleteView(PersonalDeleteView, SeguimientoContextMixin):
     permission_required = 'seguimiento.delete_proyecto_actividad'
@@ -1446,49 +1475,128 @@ class Proyecto_ActividadDeleteView(PersonalDeleteView, SeguimientoContextMixin):
     }
 
     def get_success_url(self):
-        fase = self.object.tarea.fase
         return reverse_lazy('seguimiento:detail_proyecto', 
-            kwargs={'pk': fase.proyecto.id, 'faseactiva': fase.id})
+            kwargs={'pk': self.object.proyecto_id, 'faseactiva': self.object.tarea.fase_id})
+
+def actualizacion_masiva_actividad(request):
+    '''
+        POST (JSON): {"actividades": [{"id": ..., "finalizado": 0-100, "responsable": id, "resolucion": html}, ...]}
+        Aplica todos los cambios o ninguno (ver masivo.py)
+    '''
+    if request.method != 'POST' or not request.user.has_perm('seguimiento.change_proyecto_actividad'):
+        raise Http404
+    try:
+        cambios = json.loads(request.body)['actividades']
+        if not isinstance(cambios, list):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'errores': [{'id': None, 'error': _('Formato no válido')}]}, status=400)
+
+    actualizadas, errores = actualizar_actividades(cambios, request.user)
+    if errores:
+        return JsonResponse({'errores': errores}, status=400)
+    return JsonResponse({'actualizadas': actualizadas})
+
+def _proyecto_visible(request, pk):
+    '''
+        Permiso y visibilidad del proyecto solicitado, una vez por solicitud (ETag y vista)
+    '''
+    if not hasattr(request, '_proyecto_visible'):
+        request._proyecto_visible = request.user.has_perm('seguimiento.view_proyecto') and \
+            Proyecto.objects.filter(filtro_visible(request.user), id=pk).exists()
+    return request._proyecto_visible
+
+def _etag_arbol(request, pk):
+    return version_arbol(pk) if _proyecto_visible(request, pk) else None
+
+@presupuesto(10)
+@condition(etag_func=_etag_arbol)
+def arbol_proyecto_json(request, pk):
+    '''
+        Fases, tareas y actividades del proyecto (ver arbol.py). Responde 304 si el cliente
+        envía If-None-Match con la versión vigente de los datos.
+    '''
+    if not _proyecto_visible(request, pk):
+        raise Http404
+    arbol = arbol_proyecto(pk)
+    response = JsonResponse(arbol, json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+    patch_cache_control(response, no_cache=True, private=not arbol['publico'])
+    return response
 
 def combo_fase_tarea(request):
     if request.user.has_perm('seguimiento.add_proyecto_actividad'):
         tareas = Proyecto_Tarea.objects.filter(fase_id=request.GET.get('fase_id')).order_by('descripcion')
         return render(request, 'template/ajax_combo.html', {'options': tareas})
         
+def _llave_accordion(request):
+    '''
+        Llave del fragmento de la fase solicitada (ver fragmentos.py), una vez por solicitud
+    '''
+    if not hasattr(request, '_llave_accordion'):
+        request._llave_accordion = None
+        if request.user.has_perm('seguimiento.view_proyecto_tarea'):
+            try:
+                request._llave_accordion = llave_accordion(request.user, uuid.UUID(request.GET.get('obj_id', '')))
+            except ValueError:
+                pass
+    return request._llave_accordion
+
+@presupuesto(9)
+@condition(etag_func=lambda request: _llave_accordion(request))
 def accordion_tarea_actividad(request):
-    if request.user.has_perm('seguimiento.view_proyecto_tarea'):
-        fase = Proyecto_Fase.objects.get(id=request.GET.get('obj_id'))
-        campos_actividad = ['creacion', 'descripcion', 'finalizado_porcentaje_prop', 'responsable']
-        tareas = Proyecto_Tarea.objects.filter(fase=fase)\
-            .alias(
-                pendiente = Count('proyecto_actividad', filter=Q(proyecto_actividad__finalizado__lt = 100)),
-                sin_act = Count('proyecto_actividad'),
-            ).annotate(
-                fin=Case(
-                    When(pendiente__gt=0, then=False),
-                    When(sin_act = 0, then=False),
-                    default = True, 
-                    output_field=BooleanField()
-                ),
-            ).order_by('fin', 'descripcion') #'-prioridad', 
-    
-        context = {'fase': fase, 'tareas': tareas, 'campos': campos_actividad}
-        return render(request, 'seguimiento/accordion_for_fase.html', context)
+    '''
+        Tareas y actividades de una fase. El HTML se mantiene en cache por versión de la fase y
+        permisos del usuario; al generarlo, las actividades (con su responsable) se obtienen en una
+        sola consulta y la modificabilidad del proyecto se evalúa una vez para toda la fase.
+    '''
+    llave = _llave_accordion(request)
+    if llave is None:
+        raise Http404
+    html = cache.get(llave)
+    if html is None:
+        html = _render_accordion(request, request.GET.get('obj_id'))
+        cache.set(llave, html, fragmentos_ttl())
+    response = HttpResponse(html)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def _render_accordion(request, fase_id):
+    fase = Proyecto_Fase.objects.select_related('proyecto', 'proyecto__estado').get(id=fase_id)
+    campos_actividad = ['creacion', 'descripcion', 'finalizado_porcentaje_prop', 'responsable']
+    actividades = Proyecto_Actividad.objects.select_related('responsable').order_by('finalizado', 'creacion')
+    tareas = fase.proyecto_tarea_set\
+        .prefetch_related(Prefetch('proyecto_actividad_set', queryset=actividades, to_attr='actividades'))\
+        .order_by('-pendiente', 'descripcion') #'-prioridad', 
+
+    avances = avance_tareas(Proyecto_Tarea.objects.filter(fase=fase))
+    for tarea in tareas:
+        tarea.avance = avances.get(tarea.id, 0)
+
+    context = {
+        'fase':         fase, 
+        'porcentaje':   porcentaje_fases([fase.id]).get(fase.id, 0.0), 
+        'modificable':  fase.proyecto.get_modificable(),
+        'tareas':       tareas, 
+        'campos':       campos_actividad,
+    }
+    return render_to_string('seguimiento/accordion_for_fase.html', context, request=request)
 
+@presupuesto(20)
+@condicional(lambda request: None if request.GET.get('valor') else request.GET.get('obj_id'))
 def tabla_pendiente(request):
     '''
         Tabla con información de las actividades pendientes
     '''
     if request.user.has_perm('seguimiento.view_proyecto_pendiente'):
         valor = request.GET.get('valor');
-        print(valor)
         if valor:
-            tareas = Proyecto_Tarea.objects.filter(descripcion__icontains=valor)
-            pendientes = Proyecto_Actividad.objects.filter(tarea__in=tareas)
+            pendientes = Proyecto_Actividad.objects.select_related('tarea', 'tarea__fase')\
+                .filter(filtro_visible(request.user, 'proyecto'))
+            pendientes = aplicar_busqueda(request, pendientes, 'actividad').order_by('tarea__descripcion', 'descripcion')
             titulo = _('Busqueda')
         else:
             pendientes = Proyecto_Actividad.objects.select_related('tarea', 'tarea__fase')\
-                .filter(tarea__fase__proyecto=request.GET.get('obj_id'), finalizado__lt=100,
+                .filter(proyecto=request.GET.get('obj_id'), finalizado__lt=100,
                 responsable = request.user).order_by('tarea__descripcion', 'descripcion')
             titulo = _('Pendientes')
 
@@ -1552,10 +1660,13 @@ class ComentarioFormView(PersonalFormView, SeguimientoContextMixin):
         return super().form_valid(form)
 
     def form_invalid(self, form):
-        for error in form.errors.get("__all__"):
-            messages.error(self.request, error)
+        # los campos son ocultos: se informan también los errores de campo (p.ej. obj_id)
+        for errores in form.errors.values():
+            for error in errores:
+                messages.error(self.request, error)
         return redirect(self.success_url)
 
+@method_decorator(presupuesto(25), name='dispatch')
 class ComentarioListView(PersonalListView, SeguimientoContextMixin):
     permission_required = 'seguimiento.view_comentario'
     template_name = 'template/list.html'
@@ -1589,42 +1700,12 @@ class ComentarioListView(PersonalListView, SeguimientoContextMixin):
         context['permisos'] = {
                 'delete': self.request.user.has_perm('seguimiento.delete_comentario'),
         }
+        Comentario.resolver_objetos(context['object_list'])
         return context
 
     def get_queryset(self):
-        try:
-            valor_busqueda = self.request.GET.get('valor').lower()
-        except:
-            valor_busqueda = None
-        
-        proy = Proyecto.objects.filter(pk=self.kwargs['pk'])
-        fases= Proyecto_Fase.objects.filter(proyecto__in = proy).values_list('id')
-        tareas = Proyecto_Tarea.objects.filter(fase__in=fases).values_list('id')
-        actividades = Proyecto_Actividad.objects.filter(tarea__in=tareas).values_list('id')
-        data = {'proyecto': proy, 'fases': fases, 'tareas': tareas, 'actividades': actividades}
-        
-        if valor_busqueda:
-            if 'usuario:' in valor_busqueda:
-                usuario = Usuario.objects.get(username=valor_busqueda[8:].replace(' ', ''))
-                return self.special_queryset(**data).filter(usuario=usuario)
-            elif 'objeto:' in valor_busqueda:
-                objeto = valor_busqueda[7:]
-                proy    = proy.filter(Q(nombre__icontains=objeto)|Q(descripcion__icontains=objeto))
-                fases   = fases.filter(descripcion__icontains=objeto)
-                tareas  = tareas.filter(descripcion__icontains=objeto)
-                actividades = actividades.filter(descripcion__icontains=objeto)
-                data = {'proyecto': proy, 'fases': fases, 'tareas': tareas, 'actividades': actividades}
-                return self.special_queryset(**data)
-            else:
-                return self.special_queryset(**data).filter(descripcion__icontains = valor_busqueda)
-        return self.special_queryset(**data)
-
-    def special_queryset(self, *args, **kwargs):
-        queryset = Comentario.objects.filter(tipo='P', obj_id__in=kwargs['proyecto']) |\
-            Comentario.objects.filter(tipo='F', obj_id__in=kwargs['fases']) |\
-            Comentario.objects.filter(tipo='T', obj_id__in=kwargs['tareas']) |\
-            Comentario.objects.filter(tipo='A', obj_id__in=kwargs['actividades'])
-
+        queryset = Comentario.objects.select_related('usuario').filter(proyecto_id=self.kwargs['pk'])
+        queryset = aplicar_busqueda(self.request, queryset, 'comentario')
         return queryset.order_by('-creacion')
 
 class ComentarioDeleteView(PersonalDeleteView, SeguimientoContextMixin):
@@ -1646,7 +1727,7 @@ class ComentarioDeleteView(PersonalDeleteView, SeguimientoContextMixin):
 
 class ReporteAvancesFormView(PersonalFormView, SeguimientoContextMixin):
     permission_required = 'seguimiento.view_proyecto'
-    template_name = 'template/forms.html'
+    template_name = 'seguimiento/reporte_trabajo.html'
     form_class = Proyecto_Reporte_Avances
     extra_context = {
         'title': _('Reporte de avances'),
@@ -1655,16 +1736,17 @@ class ReporteAvancesFormView(PersonalFormView, SeguimientoContextMixin):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['usuario'] = self.request.user.id
+        kwargs['usuario'] = self.request.user
         return kwargs
 
     def form_valid(self, form, *args, **kwargs):
         data = form.cleaned_data
-        return reporte_avance_proyecto(data['proyecto'])
+        trabajo = encolar('A', data['proyecto'], self.request.user)
+        return self.render_to_response(self.get_context_data(form=form, trabajo=trabajo))
 
 class ReporteActividadesFormView(PersonalFormView, SeguimientoContextMixin):
     permission_required = 'seguimiento.view_proyecto'
-    template_name = 'seguimiento/forms.html'
+    template_name = 'seguimiento/reporte_trabajo.html'
     form_class = Proyecto_Reportes_Actividades
     extra_context = {
         'title': _('Reporte de actividades (por creación)'),
@@ -1673,13 +1755,51 @@ class ReporteActividadesFormView(PersonalFormView, SeguimientoContextMixin):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['usuario'] = self.request.user.id
+        kwargs['usuario'] = self.request.user
         return kwargs
 
     def form_valid(self, form, *args, **kwargs):
         data = form.cleaned_data
-        ffin = data['ffin'] + timedelta(days=1) ### para tomar todo el último día
-        return reporte_actividades_proyecto(data['proyecto'], data['fini'], ffin)
+        trabajo = encolar('C', data['proyecto'], self.request.user, data['fini'], data['ffin'])
+        return self.render_to_response(self.get_context_data(form=form, trabajo=trabajo))
+
+class Proyecto_ImportacionFormView(PersonalFormView, SeguimientoContextMixin):
+    permission_required = 'seguimiento.add_proyecto_actividad'
+    template_name = 'seguimiento/importacion.html'
+    form_class = Proyecto_Importacion_Form
+    max_errores = 50
+    extra_context = {
+        'title': _('Importar fases, tareas y actividades'),
+        'opciones': DISPLAYS['forms'],
+    }
+
+    def get_initial(self):
+        return {'proyecto': self.request.GET.get('proyecto')}
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['usuario'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form, *args, **kwargs):
+        if not self.request.user.has_perms(('seguimiento.add_proyecto_fase', 'seguimiento.add_proyecto_tarea')):
+            messages.error(self.request, _('No tiene permiso para crear fases y tareas'))
+            return self.render_to_response(self.get_context_data(form=form))
+        data = form.cleaned_data
+        proyecto = get_object_or_404(Proyecto.objects.select_related('estado'), id=data['proyecto'])
+        archivo = data['archivo']
+        resumen, errores = importar(proyecto, archivo, archivo.name, self.request.user, data['crear_etiquetas'])
+        if errores:
+            for error in errores[:self.max_errores]:
+                fila = _('Fila %(fila)s: ') % {'fila': error['fila']} if error['fila'] else ''
+                messages.error(self.request, fila + error['error'])
+            if len(errores) > self.max_errores:
+                messages.warning(self.request, _('%(cantidad)s errores adicionales') % {'cantidad': len(errores) - self.max_errores})
+            return self.render_to_response(self.get_context_data(form=form))
+
+        messages.success(self.request, _('Importación completada: %(fases)s fases, %(tareas)s tareas, '
+            '%(etiquetas)s etiquetas y %(actividades)s actividades') % resumen)
+        return HttpResponseRedirect(proyecto.url_detail())
 
 def combo_proyecto_usuario(request):
     if request.user.has_perm('seguimiento.view_proyecto'):
@@ -1687,256 +1807,57 @@ def combo_proyecto_usuario(request):
         usuarios = Usuario.objects.filter(id__in=usuarios)
         return render(request, 'template/ajax_combo.html', {'options': usuarios})
 
-
-
-#REPORTES
-def reporte_actividades_proyecto(proyecto_id, fecha_ini, fecha_fin, workbook=None, buffer=None):
+def get_reporte_trabajo(request, pk):
     '''
-        REPORTE DE ACTIVIDADES
+        Trabajo de reporte visible únicamente para quien lo solicitó (o un administrador de proyectos)
     '''
-    proyecto    = Proyecto.objects.get(id = proyecto_id)
-
-    actividades = Proyecto_Actividad.objects.select_related('tarea__fase', 'tarea')\
-            .filter(tarea__fase__proyecto=proyecto)
+    trabajo = get_object_or_404(Reporte_Trabajo, pk=pk)
+    if trabajo.usuario_id != request.user.id and not request.user.has_perm('seguimiento.proyect_admin'):
+        raise Http404
+    return trabajo
 
-    if fecha_ini and fecha_fin:
-        actividades = actividades.filter(creacion__gte=fecha_ini, creacion__lt=fecha_fin)
-            
-    actividades = actividades.order_by('descripcion')
-
-    if not workbook:
-        buffer = io.BytesIO()
-        workbook = xlsxwriter.Workbook(buffer)
-    worksheet = workbook.add_worksheet('Detalle')
-
-    archivo = {
-        'nombre': f'Actividades - {proyecto.nombre}', 
-        'ancho_columnas':   [(0, 0, 15), (1, 1, 30), (2 , 2, 30), (3, 3, 90), (4, 6, 30)],
-        }
-    formatos = {
-        'titulo':   workbook.add_format(reporte_formato('titulo')),
-        'titulo%':  workbook.add_format(reporte_formato('titulo', 'porcentaje')),
-        'subtitulo':workbook.add_format(reporte_formato('subtitulo')),
-        '%':        workbook.add_format(reporte_formato('porcentaje')),
-        'fecha':    workbook.add_format(reporte_formato('fecha')),
-        'wrapping': workbook.add_format(reporte_formato('wrapping')),
-    }
-    
-    #Ancho de columnas
-    for columna in archivo['ancho_columnas']:
-        worksheet.set_column(*columna)
-
-    arreglo_data = []
-    data  = []
-    data.append(reporte_data(0, 0, 'string', proyecto.nombre, formatos['titulo']))
-    data.append(reporte_data(None, 5, 'number', proyecto.get_porcentaje_completado/100, formatos['titulo%']))
-    arreglo_data.append(data)
-
-    #Titulos
-    data  = []
-    data.append(reporte_data(2, None, 'string', 'FECHA', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'FASE', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'TAREA', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'ACTIVIDAD', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'RESPONSABLE', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'RESOLUCIÓN', formatos['subtitulo']))
-    arreglo_data.append(data)
-
-    for actividad in actividades:
-        responsable = actividad.responsable
-        responsable = actividad.history.all().last().history_user if not responsable else responsable
-        responsable = '' if not responsable else responsable.get_full_name()
-
-        data  = []
-        data.append(reporte_data(None, None, 'datetime', actividad.actualizacion, formatos['fecha']))
-        data.append(reporte_data(None, None, 'string', actividad.tarea.fase.descripcion, None))
-        data.append(reporte_data(None, None, 'string', actividad.tarea.descripcion, None))
-        data.append(reporte_data(None, None, 'string', actividad.descripcion, None))
-        data.append(reporte_data(None, None, 'string', responsable, None))
-        data.append(reporte_data(None, None, 'string', html2text.html2text(actividad.resolucion),  formatos['wrapping']))
-        arreglo_data.append(data)
-
-    repote_escribe(worksheet, arreglo_data)
-
-    if workbook:
-        workbook.close()
-        buffer.seek(0)
-
-    return FileResponse(buffer, as_attachment=True, filename=f'{archivo["nombre"]}.xlsx')
-
-def reporte_avance_proyecto(proyecto_id):
+def estado_reporte_trabajo(request, pk):
+    if request.user.has_perm('seguimiento.view_proyecto'):
+        trabajo = get_reporte_trabajo(request, pk)
+        return JsonResponse({
+            'estado':       trabajo.estado,
+            'descripcion':  trabajo.get_estado_display(),
+            'descarga':     trabajo.url_descarga(),
+            'error':        trabajo.error,
+        })
+    raise Http404
+
+def _etag_reporte(request, pk):
     '''
-        REPORTE DE AVANCES
+        El nombre del archivo se deriva de la versión de los datos, por lo que identifica su contenido
     '''
-    proyecto= Proyecto.objects.get(id = proyecto_id)
-    fases   = Proyecto_Fase.objects.filter(proyecto=proyecto).order_by('descripcion')
-    proy_usr= Proyecto_Usuario.objects.filter(proyecto=proyecto)
-    
-    buffer = io.BytesIO()
-    workbook = xlsxwriter.Workbook(buffer)
-    worksheet = workbook.add_worksheet('General')
-
-    archivo = {
-        'nombre': f'Avances - {proyecto.nombre}', 
-        'ancho_columnas':   [(0, 0, 36), (1, 1, 120), (2 , 8, 15)],
-        }
-    formatos = {
-        'titulo':   workbook.add_format(reporte_formato('titulo')),
-        'titulo%':  workbook.add_format(reporte_formato('titulo', 'porcentaje')),
-        'subtitulo':workbook.add_format(reporte_formato('subtitulo')),
-        '%':        workbook.add_format(reporte_formato('porcentaje')),
-        'wrapping': workbook.add_format(reporte_formato('wrapping')),
-    }
+    return Reporte_Trabajo.objects.filter(id=pk, estado='F', usuario=request.user).values_list('archivo', flat=True).first()
 
-    #Ancho de columnas
-    for columna in archivo['ancho_columnas']:
-        worksheet.set_column(*columna)
-    
-    arreglo_data = []
-    data  = []
-    
-    data.append(reporte_data(0, 0, 'string', proyecto.nombre, formatos['titulo']))
-    data.append(reporte_data(None, 8, 'number', proyecto.get_porcentaje_completado/100, formatos['titulo%']))
-    arreglo_data.append(data)
-
-    data  = []
-    data.append(reporte_data(2, 0, 'string', 'FASE', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'TAREA', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'RESPONSABLE', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'ETIQUETAS', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', '# ACTIVIDADES', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'PRIORIDAD', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'COMPLEJIDAD', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'ESTADO', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', '% AVANCE', formatos['subtitulo']))
-    arreglo_data.append(data)
-
-    for fase in fases:
-        data  = []
-        for tarea in Proyecto_Tarea.objects.filter(fase=fase).order_by('descripcion'):
-            data = []
-            usr_id = Proyecto_Actividad.objects.filter(tarea = tarea).values_list('responsable_id', flat=True).distinct()
-            data.append(reporte_data(None, None, 'string', fase.descripcion, None))
-            data.append(reporte_data(None, None, 'string', tarea.descripcion, None))
-            data.append(reporte_data(None, None, 'string', ', '.join([u.usuario.get_full_name() for u in proy_usr.filter(usuario_id__in=usr_id)]), None))
-            data.append(reporte_data(None, None, 'string', ', '.join([e.descripcion for e in tarea.etiqueta.all().order_by('descripcion')]), formatos['wrapping']))
-            data.append(reporte_data(None, None, 'number', tarea.get_cantidad_actividades(), None))
-            data.append(reporte_data(None, None, 'string', tarea.get_prioridad_display(), None))
-            data.append(reporte_data(None, None, 'number', tarea.complejidad, None))
-            data.append(reporte_data(None, None, 'string', 'COMPLETADO' if tarea.finalizado==100 else 'PENDIENTE', None))
-            data.append(reporte_data(None, None, 'number', tarea.finalizado/100, formatos['%']))
-            arreglo_data.append(data)
-
-    repote_escribe(worksheet, arreglo_data)
-
-    worksheet = workbook.add_worksheet('Actividades')
-    
-    for columna in [(0, 0, 30), (1, 2, 66), (3 , 6, 21), (7 , 6, 60)]:
-        worksheet.set_column(*columna)
-
-    arreglo_data = []
-    data  = []
-    data.append(reporte_data(0, 0, 'string', 'FASE', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'TAREA', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'ACTIVIDAD', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'RESPONSABLE', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'ESTADO', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', '% AVANCE', formatos['subtitulo']))
-    data.append(reporte_data(None, None, 'string', 'RESOLUCIÓN', formatos['subtitulo']))
-    arreglo_data.append(data)
-
-    actividades = Proyecto_Actividad.objects.select_related('tarea', 'tarea__fase')\
-        .filter(tarea__fase__proyecto=proyecto).order_by('tarea__fase__descripcion', 'tarea__descripcion', 'descripcion')
-
-    for actividad in actividades:
-        data = []
-        responsable = actividad.responsable
-        responsable = actividad.history.all().last().history_user if not responsable else responsable
-        responsable = '' if not responsable else responsable.get_full_name()
-
-        data.append(reporte_data(None, None, 'string', actividad.tarea.fase.descripcion, formatos['wrapping']))
-        data.append(reporte_data(None, None, 'string', actividad.tarea.descripcion, formatos['wrapping']))
-        data.append(reporte_data(None, None, 'string', actividad.descripcion, formatos['wrapping']))
-        data.append(reporte_data(None, None, 'string', responsable, None))
-        data.append(reporte_data(None, None, 'string', 'COMPLETADO' if actividad.finalizado==100 else 'PENDIENTE', None))
-        data.append(reporte_data(None, None, 'number', actividad.finalizado/100, formatos['%']))
-        data.append(reporte_data(None, None, 'string', html2text.html2text(actividad.resolucion),  formatos['wrapping']))
-        arreglo_data.append(data)
-
-    repote_escribe(worksheet, arreglo_data)
-
-    if workbook:
-        workbook.close()
-        buffer.seek(0)
-
-    return FileResponse(buffer, as_attachment=True, filename=f'{archivo["nombre"]}.xlsx')
-
-
-
-def reporte_data(fila, columna, tipo, valor, formato):
-    d = {}
-    if fila:
-        d['fila'] = fila
-    if columna:
-        d['columna'] = columna
-    if tipo:
-        d['tipo'] = tipo
-    if valor is not None:
-        d['valor'] = valor
-    if formato:
-        d['formato'] = formato
-    return d
-
-def reporte_formato(*args, custom=None):
-    formato = {
-        'titulo'    : {'font_size': 18, 'bold': True},
-        'subtitulo' : {'font_size': 12, 'bold': True, 'italic': True},
-        'wrapping'  : {'text_wrap': True},
-        'porcentaje': {'num_format': '0.00%'},
-        'fecha'     : {'num_format': 'dd/mm/yyyy'},
-        'fecha_hora': {'num_format': 'dd/mm/yy hh:mm:ss'},
-        'hora'      : {'num_format': 'hh:mm:ss'},
-        'custom'    : {'custom': custom},
-    }
-    f = {} 
-    for elemento in args:
-        f.update(formato[f'{elemento}'])
-    if custom:
-        f.update(formato[f'{custom}'])
-    return f
-    
-def repote_escribe(hoja, arreglo_data = [], fila_inicial=0, columna_inicial=0):
-    fila, columna = fila_inicial, columna_inicial
-    for data in arreglo_data:
-        for registro in data:
-            #print(registro)
-            if 'fila' in registro:
-                fila = registro['fila']
-
-            if 'columna' in registro:
-                columna = registro['columna']
-
-            try:
-                valor = registro['valor'] if 'valor' in registro else None
-                formato = registro['formato'] if 'formato' in registro else None
-
-                if registro['tipo']=='string':
-                    hoja.write_string(fila, columna, valor, formato)
-                elif registro['tipo']=='number':
-                    hoja.write_number(fila, columna, valor, formato)
-                elif registro['tipo']=='blank':
-                    hoja.write_blank(fila, columna, valor, formato)
-                elif registro['tipo']=='formula':
-                    hoja.write_formula(fila, columna, valor, formato)
-                elif registro['tipo']=='datetime':
-                    hoja.write_datetime(fila, columna, valor, formato)
-                elif registro['tipo']=='boolean':
-                    hoja.write_boolean(fila, columna, valor, formato)
-                elif registro['tipo']=='url':
-                    hoja.write_url(fila, columna, valor, formato)
-                else:
-                    hoja.write(fila, columna, valor)
-            except:
-                hoja.write(fila, columna, valor)
-            columna += 1
-        fila, columna = fila+1, 0
+@condition(etag_func=_etag_reporte)
+def descarga_reporte_trabajo(request, pk):
+    if request.user.has_perm('seguimiento.view_proyecto'):
+        trabajo = get_reporte_trabajo(request, pk)
+        ruta = ruta_reporte(trabajo.archivo)
+        if trabajo.estado != 'F' or not os.path.exists(ruta):
+            raise Http404
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=f'{trabajo.nombre}.xlsx')
+    raise Http404
+
+def busqueda_general(request):
+    '''
+        Búsqueda en proyectos, fases, tareas, actividades y comentarios visibles por el usuario.
+        Parámetros: q (texto, cada término se busca como prefijo) y tipo (P, F, T, A o C; se puede repetir)
+    '''
+    if request.user.has_perm('seguimiento.view_proyecto'):
+        resultados = buscar(request.user, request.GET.get('q', ''), request.GET.getlist('tipo'))
+        return JsonResponse({'resultados': [
+            {
+                'tipo':     documento.tipo,
+                'tipo_display': documento.get_tipo_display(),
+                'titulo':   documento.titulo,
+                'proyecto': documento.proyecto.nombre,
+                'url':      str(documento.url_detail()),
+                'puntaje':  documento.puntaje,
+            } for documento in resultados
+        ]})
+    raise Http404
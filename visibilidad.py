@@ -0,0 +1,32 @@
+'''
+    Alcance de los proyectos visibles por un usuario: proyectos públicos o en los que
+    está asignado (Proyecto_Usuario). Con el permiso proyect_admin se ven todos.
+
+    La asignación se evalúa como subconsulta EXISTS sobre el índice (usuario, proyecto),
+    sin traer a Python los ids de proyectos públicos o asignados.
+'''
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Proyecto, Proyecto_Usuario
+
+
+def es_admin(usuario):
+    return usuario.has_perm('seguimiento.proyect_admin')
+
+def filtro_visible(usuario, ruta=''):
+    '''
+        Q que restringe un queryset a los proyectos visibles por el usuario.
+        ruta es el camino desde el modelo consultado hasta el proyecto,
+        p.ej. 'proyecto' para tareas, actividades o comentarios.
+    '''
+    if es_admin(usuario):
+        return Q()
+    prefijo  = f'{ruta}__' if ruta else ''
+    asignado = Proyecto_Usuario.objects.filter(usuario_id=usuario.id, proyecto_id=OuterRef(ruta or 'pk'))
+    return Q(**{f'{prefijo}publico': True}) | Exists(asignado)
+
+def proyectos_visibles(usuario):
+    return Proyecto.objects.filter(filtro_visible(usuario))
+
+def es_visible(usuario, proyecto_id):
+    return proyectos_visibles(usuario).filter(id=proyecto_id).exists()